@@ -1,8 +1,40 @@
+import os
+import sys
+from collections import Counter
+
 import pytest
-from csp.read_lengths import get_data
 
-def test_get_data():
-    infile = "infile.txt"
-    nrs = get_data(infile)
-    print(nrs)
-    assert nrs[0][1] == 38
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+import instances
+
+
+def test_instances_are_reproducible():
+    assert instances.suite((1, 2)) == instances.suite((1, 2))
+    assert instances.uniform(60, 1) != instances.uniform(60, 2)
+
+
+def test_triplets_fill_the_stock_exactly():
+    instance = instances.triplet(20, 7)
+    lengths = instances.flatten(instance)
+    assert len(lengths) == 60
+    assert sum(lengths) == 20 * instance['stock_length']
+    assert all(instance['stock_length'] / 4 <= length < instance['stock_length'] / 2 for length in lengths)
+
+
+def test_demands_are_distinct_and_sorted():
+    for instance in instances.suite():
+        lengths = [length for _, length in instance['demands']]
+        assert lengths == sorted(set(lengths), reverse=True)
+
+
+@pytest.mark.parametrize('engine', ['small_model', 'large_model', 'exact', 'alns', 'greedy', 'auto'])
+def test_engines_cover_demand(engine):
+    pytest.importorskip('ortools')
+    pytest.importorskip('alns')
+    import bench_engines
+
+    instance = instances.shop(3, 1234, maxQuantity=12)
+    result = bench_engines.measure(engine, instance, 1234, 5)
+    assert result['solved'] and result['valid']
+    assert result['sticks'] >= result['lower_bound']
@@ -0,0 +1,62 @@
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+pytest.importorskip('ortools')
+from branch_and_price import branchAndPrice
+from metrics import Metrics
+from solver_handler import CuttingParameters
+from stock_cutter_1d import solve_model
+
+
+def covers(solution, demands, stock_length):
+    cuts = Counter(length for stick in solution for length in stick)
+    return all(cuts[length] >= quantity for quantity, length in demands) and \
+        all(sum(stick) <= stock_length for stick in solution)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_proves_the_small_model_optimum(seed):
+    rng = random.Random(seed)
+    stock_length = rng.randint(60, 120)
+    demands = [[rng.randint(1, 4), length] for length in {rng.randint(10, 60) for _ in range(rng.randint(2, 5))}]
+    solution, bound = branchAndPrice(demands, stock_length)
+    assert covers(solution, demands, stock_length)
+    assert len(solution) == bound == solve_model(demands, stock_length)[1]
+
+
+def test_branches_when_the_root_bound_is_not_met():
+    demands = [[2, 224], [2, 407], [2, 258], [1, 483], [3, 229], [1, 457], [3, 462], [1, 274], [2, 470], [1, 406],
+               [3, 445], [3, 447]]
+    metrics = Metrics()
+    solution, bound = branchAndPrice(demands, 1000, metrics=metrics)
+    assert covers(solution, demands, 1000)
+    assert len(solution) == bound == 10
+    assert metrics.counters['branch_and_price_nodes'] > 1 and metrics.counters['branch_and_price_proven'] == 1
+
+
+def test_time_limit_returns_the_gap_proven_so_far():
+    demands = [[2, 224], [2, 407], [2, 258], [1, 483], [3, 229], [1, 457], [3, 462], [1, 274], [2, 470], [1, 406],
+               [3, 445], [3, 447]]
+    metrics = Metrics()
+    solution, bound = branchAndPrice(demands, 1000, time_limit=0, metrics=metrics)
+    assert covers(solution, demands, 1000)
+    # Only first fit decreasing and the material bound are in by then
+    assert bound == 10 and len(solution) == 11
+    assert 'branch_and_price_proven' not in metrics.counters
+
+
+def test_exact_solver_reports_the_proven_gap():
+    cutParams = CuttingParameters(240, 0.125, 2, ['100', '60', '45.5'], [7, 11, 5])
+    cutParams.setSolver('Exact')
+    cutParams.solve()
+    cuts = Counter(length for stick in cutParams.getSolution() for length in stick)
+    assert cuts[100000] >= 7 and cuts[60000] >= 11 and cuts[45500] >= 5
+    assert cutParams.getLowerBound() == len(cutParams.getSolution()) and cutParams.getProvenGap() == 0
+    cutParams.setStocks([(240, None, None), (192, None, None)])
+    with pytest.raises(ValueError):
+        cutParams.solve()
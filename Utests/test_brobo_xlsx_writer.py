@@ -0,0 +1,87 @@
+import os
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from brobo_xlsx_writer import buildProgramRows, writeProgramFile
+
+NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+STICK = [94125, -20000, -20000, -15500, -10250]
+
+
+def read_rows(path):
+    with zipfile.ZipFile(path) as package:
+        assert package.testzip() is None
+        strings = [si.find('m:t', NS).text for si in ET.fromstring(package.read('xl/sharedStrings.xml')).findall('m:si', NS)]
+        sheet = ET.fromstring(package.read('xl/worksheets/sheet1.xml'))
+    rows = []
+    for row in sheet.iter('{%s}row' % NS['m']):
+        values = []
+        for cell in row.findall('m:c', NS):
+            value = cell.find('m:v', NS).text
+            values.append(strings[int(value)] if cell.get('t') == 's' else int(value))
+        rows.append(values)
+    return rows
+
+
+def test_round_trip(tmp_path):
+    rows = buildProgramRows(STICK, 4, 'Dylan', 3)
+    path = str(tmp_path / 'program.xlsx')
+    writeProgramFile(path, rows)
+    assert read_rows(path) == rows
+    assert rows[0][-1] == ';Program Author: Dylan'
+    assert [row[3] for row in rows[2:-1]] == [3] * len(STICK)
+
+
+def test_matches_xlsxwriter(tmp_path):
+    pytest.importorskip('xlsxwriter')
+    from build_xlsx_file import buildXFile
+
+    for writer in ('xlsxwriter', 'direct'):
+        xlsFile = buildXFile(STICK, 4, writer, str(tmp_path), 'program', 3, writer=writer)
+        xlsFile.setAuthor('Dylan')
+        xlsFile.buildSheet()
+    with zipfile.ZipFile(str(tmp_path / 'xlsxwriter' / '001-program.xlsx')) as reference, \
+            zipfile.ZipFile(str(tmp_path / 'direct' / '001-program.xlsx')) as direct:
+        for part in ('xl/worksheets/sheet1.xml', 'xl/sharedStrings.xml', 'xl/workbook.xml', 'docProps/app.xml'):
+            assert direct.read(part) == reference.read(part)
+
+
+def test_openpyxl_reads_direct_file(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    rows = buildProgramRows(STICK, 7)
+    path = str(tmp_path / 'program.xlsx')
+    writeProgramFile(path, rows)
+    sheet = openpyxl.load_workbook(path).active
+    assert [list(row) for row in sheet.iter_rows(values_only=True)] == \
+        [row + [None] * (6 - len(row)) for row in rows]
+
+
+def test_failed_write_leaves_no_program_file(tmp_path, monkeypatch):
+    import build_xlsx_file
+
+    def failing(path, rows):
+        with open(path, 'w') as file:
+            file.write('partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(build_xlsx_file, 'writeProgramFile', failing)
+    program = build_xlsx_file.buildXFile(STICK, 1, 7, str(tmp_path), writer='direct')
+    programs = lambda: sorted(set(os.listdir(str(tmp_path / '7'))) - {build_xlsx_file.PREFIX_LOCK_DIR})
+    assert programs() == [program.fileName]
+    with pytest.raises(OSError):
+        program.buildSheet()
+    assert programs() == []
+
+
+def test_job_directories_sharing_a_folder_never_share_a_prefix(tmp_path):
+    from build_xlsx_file import JobDirectory
+
+    first, second = JobDirectory(str(tmp_path), 7), JobDirectory(str(tmp_path), 7)
+    names = [first.allocate('-Program_Num_1_3_parts.xlsx'), second.allocate('-Program_Num_1_5_parts.xlsx'),
+             second.allocate('-Program_Num_2_5_parts.xlsx'), first.allocate('-Program_Num_2_3_parts.xlsx')]
+    assert sorted(name[:3] for name in names) == ['001', '002', '003', '004']
+    assert JobDirectory(str(tmp_path), 7).allocate('-Program_Num_3_1_parts.xlsx').startswith('005')
@@ -0,0 +1,71 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+pytest.importorskip('ortools')
+import instances
+from metrics import Metrics
+from stock_cutter_1d import get_diverse_patterns, get_new_pattern, get_pattern_ladder, solve_large_model
+
+
+def covers(solution, demands):
+    cuts = Counter(length for stick in solution for length in stick)
+    return all(cuts[length] >= quantity for quantity, length in demands)
+
+
+def test_diverse_patterns_are_improving_and_non_dominated():
+    duals, widths = [0.5, 0.4, 0.3, 0.2], [45, 38, 27, 21]
+    best, value = get_new_pattern(duals, widths, parent_width=100)
+    patterns = get_diverse_patterns(duals, widths, 100, best, 5, 0.9)
+    assert patterns[0] == [int(round(count)) for count in best] and len(patterns) > 1
+    for pattern in patterns:
+        assert sum(w * count for w, count in zip(widths, pattern)) <= 100
+        assert 0.9 < sum(d * count for d, count in zip(duals, pattern)) <= value + 1e-9
+    for a in patterns:
+        for b in patterns:
+            assert a is b or not all(x >= y for x, y in zip(a, b))
+    assert get_diverse_patterns(duals, widths, 100, best, 1, 0.9) == [patterns[0]]
+
+
+def test_multiple_columns_need_fewer_master_solves():
+    # Exact pricing costs more than the master, so runners-up are added
+    instance = instances.uniform(60, 1234)
+    iterations = []
+    for max_columns in (1, 8):
+        metrics = Metrics()
+        solution = solve_large_model(instance['demands'], instance['stock_length'], iterAccuracy=500,
+                                     metrics=metrics, max_columns=max_columns, pricing_ladder=False)[3]
+        assert covers(solution, instance['demands'])
+        iterations.append(metrics.counters['column_generation_iterations'])
+    assert iterations[1] < iterations[0]
+
+
+@pytest.mark.parametrize('stabilization', [False, True])
+def test_column_generation_converges(stabilization):
+    instance = instances.shop(8, 1234, maxQuantity=40)
+    metrics = Metrics()
+    solution = solve_large_model(instance['demands'], instance['stock_length'], iterAccuracy=500, metrics=metrics,
+                                 stabilization=stabilization)[3]
+    assert covers(solution, instance['demands'])
+    assert metrics.counters['column_generation_converged'] == 1
+
+
+def test_pricing_ladder_stops_at_the_first_improving_level():
+    duals, widths = [0.5, 0.4, 0.3, 0.2], [45, 38, 27, 21]
+    value = lambda pattern: sum(d * count for d, count in zip(duals, pattern))
+    metrics = Metrics()
+    pattern, _, level = get_pattern_ladder(duals, widths, 100, lambda pattern: value(pattern) > 0.9, metrics=metrics)
+    assert level == 'greedy' and value(pattern) > 0.9
+    # Nothing beats the exact value, so the heuristics miss and the exact level answers
+    _, exact_value = get_new_pattern(duals, widths, parent_width=100)
+    pattern, found, level = get_pattern_ladder(duals, widths, 100, lambda pattern: value(pattern) > exact_value,
+                                               metrics=metrics)
+    assert level == 'exact' and found == pytest.approx(exact_value)
+    assert metrics.counters['pricing_greedy_calls'] == 2 and metrics.counters['pricing_greedy_hits'] == 1
+    assert metrics.counters['pricing_local_search_calls'] == 1 and 'pricing_local_search_hits' not in metrics.counters
+    assert metrics.counters['pricing_exact_calls'] == 1
+    assert get_pattern_ladder(duals, widths, 100, lambda pattern: True, ladder=False)[2] == 'exact'
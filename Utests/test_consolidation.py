@@ -0,0 +1,77 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+pytest.importorskip('alns')
+from consolidation import JobConsolidator, combineJobs
+from solver_handler import CuttingParameters
+from units import toThou
+
+CUT_LISTS = {
+    'A': (['100', '50'], [3, 1]),
+    'B': (['100', '70'], [1, 2]),
+    'C': (['30'], [3]),
+}
+
+
+def makeJobs(dirPath):
+    jobs = []
+    for jobNumber, (lengths, quantities) in CUT_LISTS.items():
+        job = CuttingParameters(240, 0.125, 0, lengths, quantities)
+        job.setJobNumber(jobNumber)
+        job.setSolver('ALNS')
+        job.setDirPath(str(dirPath))
+        job.setWriter('direct')
+        job.setWorkers(1)
+        jobs.append(job)
+    return jobs
+
+
+def received(job, shared):
+    # Cuts a job gets: those on its own sticks that are not handed to other jobs, plus its share of mixed sticks
+    cuts = Counter(length for stick in job.getSolution() for length in stick)
+    for stick in shared:
+        for jobNumber, lengths in stick['jobs'].items():
+            thou = Counter(toThou(length) for length in lengths)
+            for _ in range(stick['count']):
+                if jobNumber == job.getJobNumber():
+                    cuts += thou
+                if stick['owner'] == job.getJobNumber():
+                    cuts -= thou
+    return cuts
+
+
+def test_combined_solve_splits_back_per_job(tmp_path):
+    jobs = makeJobs(tmp_path)
+    combined = combineJobs(jobs)
+    assert sorted(zip(combined.cut_lengths, combined.cut_quantities)) == [('100', 4), ('30', 3), ('50', 1), ('70', 2)]
+
+    consolidator = JobConsolidator(jobs)
+    consolidator.solve()
+    assert sum(len(job.getSolution()) for job in jobs) == len(consolidator.getCombined().getSolution())
+    for job in jobs:
+        demand = Counter({toThou(length): quantity for length, quantity in zip(job.cut_lengths, job.cut_quantities)})
+        assert not demand - received(job, consolidator.getShared())
+
+    paths = consolidator.buildPrograms()
+    for job, jobPaths in zip(jobs, paths):
+        assert len(jobPaths) == job.getSolution().numPatterns()
+        assert all(os.sep + job.getJobNumber() + os.sep in path for path in jobPaths)
+
+
+def test_forbidding_mixed_sticks_solves_each_job(tmp_path):
+    jobs = makeJobs(tmp_path)
+    consolidator = JobConsolidator(jobs, allowMixed=False)
+    consolidator.solve()
+    assert consolidator.getShared() == []
+    assert [len(job.getSolution()) for job in jobs] == [2, 2, 1]
+
+
+def test_rejects_jobs_on_different_stock():
+    jobs = makeJobs('.')
+    jobs[1].stock_length = 288
+    with pytest.raises(ValueError, match='share stock'):
+        JobConsolidator(jobs)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from cut_list_bounds import CutListBounds
+
+
+def test_bounds_follow_edits():
+    bounds = CutListBounds(100, 0, 0)
+    bounds.add(40, 0)
+    assert bounds.counts == {} and bounds.lowerBound() == 0 and bounds.upperBound() == 0
+    bounds.add(60, 2)
+    bounds.add('40', 2)
+    assert bounds.lowerBound() == 2 and bounds.upperBound() == 2
+    bounds.add(30, 3)
+    assert bounds.lowerBound() == 3 and bounds.upperBound() == 3
+    bounds.remove(30, 3)
+    assert bounds.upperBound() == 2 and 30000 not in bounds.counts
+    bounds.add(101)
+    assert bounds.lowerBound() is None and bounds.upperBound() is None
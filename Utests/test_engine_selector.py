@@ -0,0 +1,39 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from engine_selector import instanceFeatures, selectEngine
+from solver_handler import CuttingParameters
+
+
+def test_features_of_a_cut_list():
+    features = instanceFeatures([[60000, 3], [30000, 1]], 100000)
+    assert features['distinct'] == 2 and features['pieces'] == 4
+    assert features['piecesPerLength'] == 2
+    assert features['maxRatio'] == 0.6 and features['minRatio'] == 0.3
+    assert features['lowerBound'] == 3 and features['upperBound'] == 3 and features['gap'] == 0
+    assert instanceFeatures([[60000, 3]], 100000, [[None, 100000], [None, 80000]])['gap'] is None
+
+
+def test_decision_table():
+    # Exact fit: greedy is provably optimal
+    assert selectEngine(instanceFeatures([[50000, 10]], 100000))[0] == 'Greedy'
+    # Many copies of few lengths suit column generation
+    assert selectEngine(instanceFeatures([[45000, 30], [35000, 30], [25000, 31]], 100000))[0] == 'OR-Tools'
+    # Triplets of distinct lengths that greedy packs badly suit ALNS
+    lengths = [26000, 27000, 47000, 28000, 29000, 43000, 30000, 31000, 39000, 32000, 33000, 35000]
+    engine, parameters, _ = selectEngine(instanceFeatures([[length, 1] for length in lengths], 100000))
+    assert engine == 'ALNS' and parameters['iterations'] > 0
+
+
+def test_auto_solver_runs_the_selected_engine():
+    pytest.importorskip('ortools')
+    cutParams = CuttingParameters(100, 0, 0, ['45', '35', '25'], [30, 30, 31])
+    cutParams.setSolver('Auto')
+    cutParams.solve()
+    assert cutParams.getMetrics().counters['auto_or_tools'] == 1
+    cuts = Counter(length for stick in cutParams.getSolution() for length in stick)
+    assert cuts[45000] >= 30 and cuts[35000] >= 30 and cuts[25000] >= 31
@@ -0,0 +1,66 @@
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from greedy_cutter import firstFitDecreasing, solutionCost
+from solver_handler import CuttingParameters
+
+
+def referenceFFD(lengths, stock_length):
+    sticks = []
+    for length in sorted(lengths, reverse=True):
+        stick = next((stick for stick in sticks if stock_length - sum(stick) >= length), None)
+        if stick is None:
+            sticks.append([length])
+        else:
+            stick.append(length)
+    return sorted(sticks)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_matches_first_fit_decreasing_per_cut(seed):
+    rng = random.Random(seed)
+    stock_length = rng.choice([150, 1000, 288000])
+    sizes = [rng.randint(stock_length // 20, stock_length) for _ in range(rng.randint(1, 30))]
+    lengths = [rng.choice(sizes) for _ in range(rng.randint(1, 150))]
+    demands = [[quantity, length] for length, quantity in Counter(lengths).items()]
+    assert sorted(firstFitDecreasing(demands, stock_length)) == referenceFFD(lengths, stock_length)
+
+
+def test_packs_a_hundred_thousand_cuts_quickly():
+    rng = random.Random(1)
+    demands = [[rng.randint(500, 3000), rng.randint(12000, 120000)] for _ in range(60)]
+    start = time.perf_counter()
+    solution = firstFitDecreasing(demands, 288000)
+    elapsed = time.perf_counter() - start
+    assert sum(quantity for quantity, _ in demands) > 100000
+    assert elapsed < 2
+    assert Counter(length for stick in solution for length in stick) == {length: quantity for quantity, length in demands}
+    assert all(sum(stick) <= 288000 for stick in solution)
+
+
+def test_several_stock_types_respect_availability():
+    stocks = [[2, 100, 100], [None, 80, 90]]
+    solution = firstFitDecreasing([[4, 50], [3, 30]], 100, stocks)
+    assert solution.stockCounts()[100] <= 2
+    assert all(sum(solution.pattern(idx)) <= solution.stockLength(idx) for idx in range(solution.numPatterns()))
+    assert solutionCost(solution, stocks) == sum({100: 100, 80: 90}[stock] * count for stock, count in solution.stockCounts().items())
+    with pytest.raises(ValueError, match='longer'):
+        firstFitDecreasing([[1, 120]], 100, stocks)
+    with pytest.raises(ValueError, match='Not enough stock'):
+        firstFitDecreasing([[5, 90]], 100, stocks)
+
+
+def test_greedy_solver_covers_the_cut_list():
+    cutParams = CuttingParameters(240, 0.125, 2, ['100', '60', '30.5'], [3, 5, 4])
+    cutParams.setSolver('Greedy')
+    events = []
+    cutParams.solve(events.append)
+    cuts = Counter(length for stick in cutParams.getSolution() for length in stick)
+    assert cuts == {100000: 3, 60000: 5, 30500: 4}
+    assert events[-1]['engine'] == 'Greedy' and events[-1]['sticks'] == len(cutParams.getSolution())
@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+CSP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csp')
+HEAVY = ('tkinter', 'matplotlib', 'ortools', 'alns', 'xlsxwriter')
+
+
+def test_headless_import_loads_no_engines_or_gui():
+    script = ('import sys; import solver_handler, brobo_preprocessor, cut_list_bounds, build_xlsx_file; '
+              f'print(sorted({{name.split(".")[0] for name in sys.modules}} & {set(HEAVY)!r}))')
+    output = subprocess.run([sys.executable, '-c', script], cwd=CSP, check=True, capture_output=True, text=True)
+    assert output.stdout.strip() == '[]'
@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from job_io import buildCuttingParameters, findJobFiles, parseCut, parseCutList, parseJob, readJob
+
+
+def test_parse_cut_list():
+    text = "Length, Qty\n50.5, 10\n\n33.125\t7\n12.0625;20\n24\n"
+    assert parseCutList(text) == [('50.5', 10), ('33.125', 7), ('12.0625', 20), ('24', 1)]
+    with pytest.raises(ValueError, match='Line 3'):
+        parseCutList("10,1\n20,2\nabc,3\n")
+
+
+@pytest.mark.parametrize('length, quantity', [('10', 2.7), ('10', '2.5'), ('nan', 1), ('inf', 1), (None, 1),
+                                              ('10', None), ('10', True)])
+def test_parse_cut_rejects_invalid_values(length, quantity):
+    with pytest.raises(ValueError):
+        parseCut(length, quantity)
+    assert parseCut(10.5, 3.0) == ('10.5', 3)
+
+
+@pytest.mark.parametrize('settings, field', [({'cuts': 5}, 'cuts'), ({'cuts': [[10, 1]], 'timeLimit': '5'}, 'timeLimit'),
+                                             ({'cuts': [[10, 1]], 'workers': True}, 'workers'),
+                                             ({'cuts': [[10, 1]], 'stocks': 240}, 'stocks')])
+def test_parse_job_checks_setting_types(settings, field):
+    with pytest.raises(ValueError, match=field):
+        parseJob(dict(settings, stockLength=240, bladeWidth=0.1))
+    with pytest.raises(ValueError, match='Invalid cut'):
+        parseJob({'stockLength': 240, 'bladeWidth': 0.1, 'cuts': [{'quantity': 2}]})
+
+
+def test_read_csv_job_uses_defaults(tmp_path):
+    path = tmp_path / '4471.csv'
+    path.write_text("50.5,10\n33.125,7\n")
+    job = readJob(str(path), {'stockLength': 288, 'bladeWidth': 0.125, 'solver': None})
+    assert job['jobNumber'] == '4471'
+    assert job['solver'] == 'OR-Tools'
+    cutParams = buildCuttingParameters(job)
+    assert cutParams.cut_lengths == ['50.5', '33.125']
+    assert cutParams.cut_quantities == [10, 7]
+    assert cutParams.getStaringProgramNumber() == 1
+
+
+def test_read_json_job(tmp_path):
+    (tmp_path / 'cuts.csv').write_text("40,2\n")
+    path = tmp_path / 'job.json'
+    path.write_text(json.dumps({'jobNumber': 12, 'stockLength': 240, 'bladeWidth': 0.1, 'solver': 'ALNS',
+                                'timeLimit': 2, 'cutFile': 'cuts.csv'}))
+    job = readJob(str(path), {'stockLength': 288, 'bladeWidth': 0.125})
+    assert (job['jobNumber'], job['stockLength'], job['cuts']) == (12, 240, [('40', 2)])
+    assert buildCuttingParameters(job).getTimeLimit() == 2
+    path.write_text(json.dumps({'stockLength': 240, 'bladeWidth': 0.1}))
+    with pytest.raises(ValueError, match='no cuts'):
+        readJob(str(path))
+
+
+def test_find_job_files(tmp_path):
+    for name in ('b.json', 'a.csv', 'notes.md'):
+        (tmp_path / name).write_text('')
+    assert findJobFiles([str(tmp_path)]) == [str(tmp_path / 'a.csv'), str(tmp_path / 'b.json')]
+
+
+def test_cli_summary(tmp_path, capsys):
+    pytest.importorskip('alns')
+    import cli
+
+    (tmp_path / '7.csv').write_text("50.5,10\n33.125,7\n")
+    (tmp_path / '8.csv').write_text("oops\n1,x\n")
+    (tmp_path / '9.json').write_text(json.dumps({'cuts': 5}))
+    status = cli.main([str(tmp_path), '--stock-length', '288', '--blade-width', '0.125', '--solver', 'ALNS',
+                       '--out-dir', str(tmp_path / 'out'), '--writer', 'direct', '--time-limit', '5'])
+    report = json.loads(capsys.readouterr().out)
+    assert status == 1
+    assert (report['ok'], report['failed']) == (1, 2)
+    solved = report['jobs'][0]
+    assert solved['sticks'] >= 3 and len(solved['programs']) == solved['patterns']
+    assert all(os.path.exists(path) for path in solved['programs'])
+
+
+def test_unexpected_job_errors_are_reported(tmp_path, monkeypatch):
+    import cli
+
+    def broken(job):
+        raise TypeError('broken')
+
+    (tmp_path / '7.csv').write_text("50.5,10\n")
+    monkeypatch.setattr(cli, 'buildCuttingParameters', broken)
+    summary = cli.runJob(str(tmp_path / '7.csv'), {'stockLength': 288, 'bladeWidth': 0.125}, buildPrograms=False)
+    assert summary['status'] == 'error' and summary['error'] == 'TypeError: broken'
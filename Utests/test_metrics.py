@@ -0,0 +1,33 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from metrics import Metrics
+
+
+def test_timers_and_counters():
+    metrics = Metrics()
+    metrics.observe('pricing', 0.5)
+    metrics.observe('pricing', 1.5)
+    with metrics.timer('master_lp'):
+        pass
+    metrics.increment('patterns_added')
+    metrics.increment('patterns_added', 2)
+    snapshot = json.loads(metrics.toJSON())
+    assert snapshot['timers']['pricing'] == {'count': 2, 'total': 2.0, 'max': 1.5}
+    assert snapshot['timers']['master_lp']['count'] == 1
+    assert snapshot['counters'] == {'patterns_added': 3}
+    metrics.reset()
+    assert metrics.toDict() == {'timers': {}, 'counters': {}}
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    metrics.observe('xlsx_write', 0.25)
+    metrics.increment('alns_destroy_random-removal_best', 4)
+    lines = metrics.toPrometheus().splitlines()
+    assert '# TYPE brobo_phase_seconds summary' in lines
+    assert 'brobo_phase_seconds_sum{phase="xlsx_write"} 0.25' in lines
+    assert 'brobo_phase_seconds_count{phase="xlsx_write"} 1' in lines
+    assert 'brobo_alns_destroy_random_removal_best_total 4' in lines
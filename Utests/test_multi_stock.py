@@ -0,0 +1,75 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from cut_solution import CutSolution
+
+DEMANDS = [[10, 100], [7, 60], [20, 45]]
+
+
+def covers(solution, demands):
+    produced = Counter()
+    for idx, (pattern, count) in enumerate(solution.patterns()):
+        assert sum(pattern) <= solution.stockLength(idx)
+        for length in pattern:
+            produced[length] += count
+    return all(produced[length] >= quantity for quantity, length in demands)
+
+
+def test_solution_records_stock_per_pattern():
+    solution = CutSolution.fromSticks([[100, 100], [45, 45], [100, 100]], stocks=[240, 200, 240])
+    assert solution.stock_length == 240
+    assert solution.stockCounts() == {240: 2, 200: 1}
+    assert [stick[0] for stick in solution.sticks()] == [40, 40, 110]
+    assert solution.map(lambda length: length - 1).stockCounts() == {240: 2, 200: 1}
+    assert not CutSolution.fromSticks([[100]], 240).hasMixedStock()
+
+
+def test_column_generation_picks_stock_by_cost():
+    pytest.importorskip('ortools')
+    from stock_cutter_1d import solve_large_model
+
+    stocks = [[None, 240, 240], [None, 200, 200]]
+    solution = solve_large_model(DEMANDS, 240, iterAccuracy=100, stocks=stocks)[3]
+    assert covers(solution, DEMANDS)
+    single = solve_large_model(DEMANDS, 240, iterAccuracy=100)[3]
+    used = sum(stock * count for stock, count in solution.stockCounts().items())
+    assert used <= 240 * len(single)
+
+    limited = solve_large_model(DEMANDS, 240, iterAccuracy=100, stocks=[[3, 240, 240], [None, 200, 200]])[3]
+    assert covers(limited, DEMANDS) and limited.stockCounts().get(240, 0) <= 3
+    with pytest.raises(ValueError, match='Not enough stock'):
+        solve_large_model(DEMANDS, 240, iterAccuracy=100, stocks=[[3, 240], [2, 200]])
+
+
+def test_alns_chooses_bar_type_per_beam():
+    pytest.importorskip('alns')
+    from alns_stock_cutter import alnsSolver
+
+    beams = [length for quantity, length in DEMANDS for _ in range(quantity)]
+    solution = alnsSolver(240, beams, iterations=300, stocks=[[3, 240, 240], [None, 200, 200]])
+    assert covers(solution, DEMANDS) and solution.stockCounts().get(240, 0) <= 3
+    with pytest.raises(ValueError, match='Not enough stock'):
+        alnsSolver(240, beams, stocks=[[3, 240], [2, 200]])
+
+
+@pytest.mark.parametrize('solver', ['OR-Tools', 'ALNS'])
+def test_cutting_parameters_with_stocks(solver, tmp_path):
+    pytest.importorskip('ortools' if solver == 'OR-Tools' else 'alns')
+    from job_io import parseJob, buildCuttingParameters, summarizeSolution
+    from brobo_preprocessor import buildBroboProgram
+
+    job = parseJob({'bladeWidth': 0.125, 'deadZone': 2, 'solver': solver, 'writer': 'direct', 'workers': 1,
+                    'dirPath': str(tmp_path), 'stocks': [[242, 4], {'length': 202}],
+                    'cuts': [[99.875, 10], [59.875, 7], [44.875, 20]]})
+    assert job['stockLength'] == 242
+    cutParams = buildCuttingParameters(job)
+    cutParams.solve()
+    summary = summarizeSolution(cutParams)
+    assert summary['stock'].get('242', 0) <= 4
+    assert sum(summary['stock'].values()) == summary['sticks']
+    paths = buildBroboProgram(cutParams)
+    assert all(path.endswith(('_on_242in.xlsx', '_on_202in.xlsx')) for path in paths)
@@ -0,0 +1,90 @@
+import itertools
+import json
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from pattern_catalog import PatternCatalog, catalogKey, enumerateMaximalPatterns
+from solver_handler import CuttingParameters
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_enumerates_exactly_the_maximal_patterns(seed):
+    rng = random.Random(seed)
+    stock_length = rng.randint(50, 120)
+    widths = sorted({rng.randint(10, 60) for _ in range(rng.randint(1, 5))}, reverse=True)
+    fitting = itertools.product(*[range(stock_length // width + 1) for width in widths])
+    expected = [list(counts) for counts in fitting
+                if 0 <= stock_length - sum(c * w for c, w in zip(counts, widths)) < min(widths)]
+    assert sorted(enumerateMaximalPatterns(widths, stock_length)) == sorted(expected)
+    assert enumerateMaximalPatterns(widths, stock_length, limit=len(expected) - 1) is None
+
+
+def test_catalog_is_saved_and_follows_the_caller_length_order(tmp_path):
+    path = str(tmp_path / 'catalog.json')
+    catalog = PatternCatalog(path)
+    patterns = catalog.patterns(100000, 125, [30000, 45000])
+    assert [45000, 30000] == json.load(open(path))['entries'][catalogKey(100000, 125, [30000, 45000])]['lengths']
+    for thirties, fortyFives in patterns:
+        room = 100000 - thirties * 30125 - fortyFives * 45125
+        assert 0 <= room < 30125
+    assert PatternCatalog(path).patterns(100000, 125, [45000, 30000]) == [pattern[::-1] for pattern in patterns]
+
+    small = PatternCatalog(maxPatterns=3)
+    assert small.patterns(100000, 0, [10000, 11000, 12000, 13000]) is None
+    assert len(small) == 1
+    with open(path, 'w') as file:
+        file.write('[]')
+    with pytest.raises(ValueError):
+        PatternCatalog(path)
+
+
+def test_job_is_solved_over_the_catalog(tmp_path):
+    pytest.importorskip('ortools')
+    catalog = PatternCatalog(str(tmp_path / 'catalog.json'))
+    for attempt in range(2):
+        cutParams = CuttingParameters(240, 0.125, 2, ['100', '60', '45.5'], [7, 11, 5])
+        cutParams.setSolver('OR-Tools')
+        cutParams.setPatternCatalog(catalog)
+        cutParams.solve()
+        metrics = cutParams.getMetrics()
+        assert metrics.counters['catalog_hits'] == 1 and metrics.timers['catalog_model'][0] == 1
+        cuts = Counter(length for stick in cutParams.getSolution() for length in stick)
+        assert cuts[100000] >= 7 and cuts[60000] >= 11 and cuts[45500] >= 5
+    assert len(PatternCatalog(catalog.path)) == 1
+
+
+def test_duplicate_lengths_are_merged_before_the_catalog_solve():
+    pytest.importorskip('ortools')
+    cutParams = CuttingParameters(100, 0, 0, [40, 40, 30], [1, 2, 2])
+    cutParams.setSolver('OR-Tools')
+    cutParams.setPatternCatalog(PatternCatalog())
+    cutParams.solve()
+    sticks = list(cutParams.getSolution())
+    assert all(sum(stick) <= 100000 for stick in sticks)
+    cuts = Counter(length for stick in sticks for length in stick)
+    assert cuts[40000] >= 3 and cuts[30000] >= 2 and len(sticks) == 2
+
+
+def test_catalog_solve_reports_progress_and_can_be_cancelled():
+    pytest.importorskip('ortools')
+    import threading
+    from metrics import Metrics
+    from stock_cutter_1d import solve_catalog_model
+
+    demands = [[7, 100125], [11, 60125], [5, 45625]]
+    patterns = PatternCatalog().patterns(238000, 0, [length for _, length in demands])
+    events = []
+    status, _, _, solution = solve_catalog_model(demands, 238000, patterns, progress=events.append)
+    assert status == 0 and events[-1]['sticks'] == events[-1]['bound'] == len(solution)
+
+    cancel = threading.Event()
+    cancel.set()
+    metrics = Metrics()
+    status, _, _, solution = solve_catalog_model(demands, 238000, patterns, metrics=metrics, cancel=cancel)
+    cuts = Counter(length for stick in solution for length in stick)
+    assert status == 1 and cuts[100125] >= 7 and cuts[60125] >= 11 and cuts[45625] >= 5
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from remnant_inventory import RemnantInventory
+
+
+def test_best_fit_and_counts():
+    inventory = RemnantInventory(minimum=10)
+    inventory.add(48, 2)
+    inventory.add('30.5')
+    inventory.add(100)
+    assert inventory.bestFit(30) == 30.5
+    assert inventory.bestFit(31) == 48
+    assert inventory.bestFit(101) is None
+    inventory.remove(48)
+    assert inventory.remnants() == [(30.5, 1), (48, 1), (100, 1)]
+    with pytest.raises(ValueError):
+        inventory.remove(48, 2)
+
+
+def test_plan_fills_shortest_remnants_first():
+    inventory = RemnantInventory()
+    for length in (50000, 62000, 200000):
+        inventory.add(length / 1000)
+    sticks, remaining = inventory.plan([[60000, 1], [40000, 2], [30000, 3]], 2000)
+    # The 60 goes on the 62 remnant, a 40 opens the 50, the next 40 and the 30s share the 200
+    assert sticks == [[60000, [60000]], [48000, [40000]], [198000, [40000, 30000, 30000, 30000]]]
+    assert remaining == []
+    assert len(inventory) == 3
+
+
+def test_update_keeps_long_offcuts_and_saves(tmp_path):
+    path = str(tmp_path / 'rack.json')
+    inventory = RemnantInventory(path, minimum=12)
+    inventory.add(62)
+    assert inventory.update([62000], [11999, 12000, 40000]) == 2
+    assert json.loads(open(path).read()) == {'remnants': [[12.0, 1], [40.0, 1]]}
+    assert RemnantInventory(path).remnants() == [(12.0, 1), (40.0, 1)]
+
+
+def test_job_cuts_remnants_before_new_stock(tmp_path):
+    pytest.importorskip('alns')
+    from job_io import buildCuttingParameters, parseJob, summarizeSolution
+
+    rack = tmp_path / 'rack.json'
+    rack.write_text(json.dumps({'remnants': [[100, 2]]}))
+    job = parseJob({'stockLength': 240, 'bladeWidth': 0.125, 'deadZone': 2, 'solver': 'ALNS', 'minRemnant': 24,
+                    'remnantFile': 'rack.json', 'cuts': [[97, 2], [60, 6]]}, baseDir=str(tmp_path))
+    cutParams = buildCuttingParameters(job)
+    cutParams.solve()
+    summary = summarizeSolution(cutParams)
+    assert summary['stock']['100'] == 2 and summary['stock']['240'] == 2
+    assert cutParams.getMetrics().counters['remnants_used'] == 2
+    # Each 240 stick holds three 60s and their kerf, leaving 59.625 in
+    assert RemnantInventory(str(rack)).remnants() == [(59.625, 2)]
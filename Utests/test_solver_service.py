@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+pytest.importorskip('alns')
+from solver_service import ServiceClient, SolverService, createServer
+
+JOB = {'jobNumber': 'svc', 'stockLength': 288, 'bladeWidth': 0.125, 'deadZone': 6, 'solver': 'ALNS',
+       'timeLimit': 5, 'cuts': [[50.5, 10], [33.125, 7]]}
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    service = SolverService(workers=1, outDir=str(tmp_path_factory.mktemp('programs')))
+    server = createServer(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield ServiceClient(f'http://127.0.0.1:{server.server_address[1]}')
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def test_solves_and_deduplicates(client):
+    job = client.submit(dict(JOB, buildPrograms=True))
+    assert job['status'] in ('queued', 'running')
+    assert client.submit(dict(JOB, buildPrograms=True))['id'] == job['id']
+
+    status = client.wait(job['id'], interval=0.1, timeout=60)
+    assert status['status'] == 'done', status['error']
+    result = status['result']
+    assert result['cuts'] == 17
+    assert sum(pattern['count'] * pattern['lengths'].count(50.5) for pattern in result['solution']) >= 10
+    assert result['files']
+    assert client.download(job['id'], result['files'][0])[:2] == b'PK'
+
+
+def test_rejects_invalid_and_unknown_jobs(client):
+    with pytest.raises(ValueError, match='stockLength'):
+        client.submit({'bladeWidth': 0.125, 'cuts': [[10, 1]]})
+    with pytest.raises(ValueError, match='cuts'):
+        client.submit({'stockLength': 100, 'bladeWidth': 1, 'cuts': 5})
+    with pytest.raises(ValueError, match='JSON object'):
+        client.submit([1, 2])
+    with pytest.raises(ValueError, match='Unknown job'):
+        client.status('nope')
+
+
+def test_clients_cannot_pick_server_paths(client, tmp_path):
+    for jobNumber in ('../escaped', 'a/b', 'a\\b', '..'):
+        with pytest.raises(ValueError, match='jobNumber'):
+            client.submit(dict(JOB, jobNumber=jobNumber, buildPrograms=True))
+    # A cut file on the server is never read, so the job is solved from its own cuts
+    job = client.submit(dict(JOB, jobNumber='svc-file', cutFile=str(tmp_path / 'missing.csv')))
+    status = client.wait(job['id'], interval=0.1, timeout=60)
+    assert status['status'] == 'done', status['error']
+    assert status['result']['cuts'] == 17
+
+
+def test_identical_concurrent_jobs_are_solved_once(client):
+    job = dict(JOB, jobNumber='svc-race', timeLimit=1)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def post():
+        barrier.wait()
+        results.append(client.submit(job))
+
+    threads = [threading.Thread(target=post) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({status['id'] for status in results}) == 1
+    assert sum(status['submitted'] == results[0]['submitted'] for status in results) == 8
+    client.wait(results[0]['id'], interval=0.1, timeout=60)
@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from units import THOU, _VECTORIZE_MIN, fromThou, toThou, toThouArray
+
+
+def test_round_trip():
+    rng = random.Random(1234)
+    for _ in range(10000):
+        thou = rng.randint(-10 ** 7, 10 ** 7)
+        assert toThou(fromThou(thou)) == thou
+        assert toThou(str(fromThou(thou))) == thou
+
+
+def test_rounds_half_up():
+    assert toThou('1.0005') == 1001
+    assert toThou(1.0005) == 1001
+    assert toThou('0.0004') == 0
+    assert toThou(' 240 ') == 240 * THOU
+    assert toThou('-2.0005') == -2001
+
+
+@pytest.mark.parametrize('bad', ['', 'abc', 'nan', 'inf', None])
+def test_invalid(bad):
+    with pytest.raises(ValueError):
+        toThou(bad)
+
+
+@pytest.mark.parametrize('count', [10, 1000])
+def test_array_matches_scalar(count):
+    rng = random.Random(count)
+    values = [round(rng.uniform(0, 500), 4) for _ in range(count)]
+    values += [round(n / THOU + 0.0005, 4) for n in range(count)]
+    assert toThouArray(values) == [toThou(value) for value in values]
+
+
+def test_array_rounds_exactly_near_half():
+    values = ['1.0004999999999', 1.0004999999999, '1.0005', 1.0005, '-2.0005', '0.0004999'] * _VECTORIZE_MIN
+    assert toThouArray(values) == [toThou(value) for value in values]
+    assert toThouArray(values)[:6] == [1000, 1000, 1001, 1001, -2001, 0]
+
+
+def test_no_drift_through_solver_units():
+    pytest.importorskip('ortools')
+    pytest.importorskip('alns')
+    from solver_handler import CuttingParameters, _postProcessor
+    from cut_solution import CutSolution
+
+    rng = random.Random(99)
+    # Enough lengths that _solverPreProcess converts them with NumPy
+    lengths = [round(rng.uniform(1, 100), 3) for _ in range(2 * _VECTORIZE_MIN)]
+    lengths += ['1.0004999999999', '2.0005']
+    params = CuttingParameters(288, 0.125, 6, lengths, [1] * len(lengths))
+    stock, zipped, blade = params._solverPreProcess()
+    assert stock == 282000 and blade == 125
+    solution = _postProcessor(CutSolution.fromSticks([[length] for length, _ in zipped], stock), blade)
+    assert sorted(length for stick in solution for length in stick) == sorted(toThou(length) for length in lengths)
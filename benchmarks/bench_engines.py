@@ -0,0 +1,237 @@
+"""Runs every solver engine on the generated benchmark instances and writes a comparable report.
+
+Each engine runs on each instance under a fixed seed and time limit. The report records the runtime, the sticks
+used, the gap to a lower bound, the peak Python heap (tracemalloc, which does not see memory allocated inside the
+OR-Tools C++ solvers) and whether the packing covers the demand without overfilling a stick. Column generation
+engines also report their iterations and, when the LP converged, the time it took; ``stabilized`` is the large
+model with dual stabilization and ``exact`` is branch-and-price. An engine that finds no solution within the time
+limit is reported as unsolved. Comparing two reports flags instances where an engine got worse.
+
+Usage:
+    python benchmarks/bench_engines.py [--quick] [--seeds N] [--time-limit SECONDS] [--engines NAME ...]
+                                       [--output report.json] [--compare baseline.json]
+
+The exit status is 1 if ``--compare`` found a regression or a packing was invalid.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+sys.path.insert(0, os.path.dirname(__file__))
+from alns_stock_cutter import alnsSolver
+from branch_and_price import branchAndPrice
+from cut_list_bounds import CutListBounds
+from cut_solution import CutSolution
+from engine_selector import instanceFeatures, selectEngine
+from metrics import Metrics
+from greedy_cutter import firstFitDecreasing
+from stock_cutter_1d import solve_large_model, solve_model
+from units import fromThou
+import instances
+
+# The small model grows with items times sticks, so larger instances only measure the time limit
+SMALL_MODEL_MAX_ITEMS = 60
+# A runtime counts as a regression when it is this much slower than the baseline and at least this many seconds
+RUNTIME_TOLERANCE = 0.25
+RUNTIME_MIN_DELTA = 0.05
+# Returned by an engine that found no solution within the time limit
+UNSOLVED = object()
+
+
+def run_small_model(instance, seed, time_limit, metrics):
+    if sum(quantity for quantity, _ in instance['demands']) > SMALL_MODEL_MAX_ITEMS:
+        return None
+    status, numSticksUsed, consumed, _, _ = solve_model(instance['demands'], instance['stock_length'], metrics=metrics, time_limit=time_limit)
+    if status > 1:
+        return UNSOLVED
+    sticks = []
+    for stick in consumed:
+        cuts = [length for group in stick[1:] for length in group]
+        if cuts:
+            sticks.append(cuts)
+    return CutSolution.fromSticks(sticks, instance['stock_length'])
+
+
+def run_large_model(instance, seed, time_limit, metrics):
+    return solve_large_model(instance['demands'], instance['stock_length'], iterAccuracy=500, metrics=metrics,
+                             time_limit=time_limit)[3]
+
+
+def run_stabilized(instance, seed, time_limit, metrics):
+    return solve_large_model(instance['demands'], instance['stock_length'], iterAccuracy=500, metrics=metrics,
+                             time_limit=time_limit, stabilization=True)[3]
+
+
+def run_exact(instance, seed, time_limit, metrics):
+    return branchAndPrice(instance['demands'], instance['stock_length'], time_limit=time_limit, metrics=metrics)[0]
+
+
+def run_alns(instance, seed, time_limit, metrics):
+    return alnsSolver(instance['stock_length'], instances.flatten(instance), iterations=1000, seed=seed, metrics=metrics,
+                      time_limit=time_limit)
+
+
+def run_greedy(instance, seed, time_limit, metrics):
+    return firstFitDecreasing(instance['demands'], instance['stock_length'])
+
+
+def run_auto(instance, seed, time_limit, metrics):
+    cutData = [[length, quantity] for quantity, length in instance['demands']]
+    engine, _, _ = selectEngine(instanceFeatures(cutData, instance['stock_length']))
+    return AUTO_ENGINES[engine](instance, seed, time_limit, metrics)
+
+
+ENGINES = {
+    'small_model': run_small_model,
+    'large_model': run_large_model,
+    'stabilized': run_stabilized,
+    'exact': run_exact,
+    'alns': run_alns,
+    'greedy': run_greedy,
+    'auto': run_auto,
+}
+# The benchmark engine run for each solver the Auto solver can pick
+AUTO_ENGINES = {'OR-Tools': run_large_model, 'ALNS': run_alns, 'Greedy': run_greedy}
+
+
+def lower_bound(instance):
+    bounds = CutListBounds(fromThou(instance['stock_length']), 0, 0)
+    for quantity, length in instance['demands']:
+        bounds.add(fromThou(length), quantity)
+    return bounds.lowerBound()
+
+
+def is_valid(solution, instance):
+    produced = Counter()
+    for pattern, count in solution.patterns():
+        if sum(pattern) > instance['stock_length']:
+            return False
+        for length in pattern:
+            produced[length] += count
+    return all(produced[length] >= quantity for quantity, length in instance['demands'])
+
+
+def measure(engine, instance, seed, time_limit):
+    metrics = Metrics()
+    tracemalloc.start()
+    start = time.perf_counter()
+    solution = ENGINES[engine](instance, seed, time_limit, metrics)
+    runtime = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if solution is None:
+        return None
+    bound = lower_bound(instance)
+    solved = solution is not UNSOLVED
+    sticks = len(solution) if solved else None
+    valid = is_valid(solution, instance) if solved else True
+    return {
+        'instance': instance['name'],
+        'family': instance['family'],
+        'engine': engine,
+        'runtime': round(runtime, 4),
+        'sticks': sticks,
+        'lower_bound': bound,
+        'gap': round((sticks - bound) / bound, 4) if solved and valid and bound else None,
+        'peak_mib': round(peak / 2 ** 20, 2),
+        'solved': solved,
+        'valid': valid,
+        'iterations': metrics.counters.get('column_generation_iterations'),
+        'converged_seconds': converged_seconds(metrics),
+    }
+
+
+def converged_seconds(metrics):
+    """Get how long column generation took to prove its LP optimal, or None if it did not run or did not converge."""
+    if not metrics.counters.get('column_generation_converged'):
+        return None
+    return round(metrics.timers['column_generation'][1], 4)
+
+
+def run(args):
+    seeds = [1234 + i for i in range(args.seeds)]
+    suite = instances.suite(seeds, instances.QUICK_FAMILIES if args.quick else instances.FAMILIES)
+    results = []
+    for instance in suite:
+        for engine in args.engines:
+            result = measure(engine, instance, instance['seed'], args.time_limit)
+            if result is not None:
+                results.append(result)
+                print_row(result)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time_limit': args.time_limit,
+        'results': results,
+    }
+
+
+def print_row(result, baseline=None):
+    gap = '-' if result['gap'] is None else f"{result['gap']:.1%}"
+    sticks = '-' if result['sticks'] is None else result['sticks']
+    status = '' if result['valid'] else '  INVALID'
+    if not result['solved']:
+        status = '  UNSOLVED'
+    iterations = '-' if result.get('iterations') is None else result['iterations']
+    converged = '-' if result.get('converged_seconds') is None else f"{result['converged_seconds']:.2f}s"
+    line = (f"{result['instance']:<22} {result['engine']:<12} {result['runtime']:8.2f}s {sticks:>6} "
+            f"{result['lower_bound']:6d} {gap:>7} {result['peak_mib']:8.2f}MiB {iterations:>6} {converged:>9}{status}")
+    if baseline is not None:
+        line += f"   was {baseline['runtime']:.2f}s {baseline['sticks']} sticks"
+    print(line)
+
+
+def regressions(report, baseline):
+    """Lists the results that use more sticks, run noticeably slower or became invalid compared to the baseline."""
+    previous = {(result['instance'], result['engine']): result for result in baseline['results']}
+    found = []
+    for result in report['results']:
+        before = previous.get((result['instance'], result['engine']))
+        if before is None:
+            continue
+        slower = result['runtime'] > before['runtime'] * (1 + RUNTIME_TOLERANCE) and \
+            result['runtime'] - before['runtime'] > RUNTIME_MIN_DELTA
+        worse = before['solved'] and (not result['solved'] or result['sticks'] > before['sticks'])
+        if worse or slower or (before['valid'] and not result['valid']):
+            found.append((result, before))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='one small instance per family')
+    parser.add_argument('--seeds', type=int, default=1, help='number of seeds per instance size')
+    parser.add_argument('--time-limit', type=float, default=10.0, help='seconds per engine run')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=list(ENGINES))
+    parser.add_argument('--output', help='write the report to this JSON file')
+    parser.add_argument('--compare', help='baseline report to compare against')
+    args = parser.parse_args()
+
+    print(f"{'instance':<22} {'engine':<12} {'runtime':>9} {'sticks':>6} {'bound':>6} {'gap':>7} {'peak':>11} "
+          f"{'iters':>6} {'converged':>9}")
+    report = run(args)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+
+    failed = any(not result['valid'] for result in report['results'])
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        found = regressions(report, baseline)
+        print(f'\n{len(found)} regression(s) against {args.compare}')
+        for result, before in found:
+            print_row(result, before)
+        failed = failed or bool(found)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Measures how long a fresh interpreter takes to import the modules each entry point needs.
+
+Every target is timed in a new process, so nothing is shared between runs, and the median of the runs is reported.
+``headless`` is what a batch worker imports, ``gui`` the GUI module without opening a window, and ``engines`` the
+solver engines that are loaded on the first solve.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+CSP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'csp')
+
+TARGETS = {
+    'headless': 'import solver_handler, brobo_preprocessor, cut_list_bounds',
+    'gui': 'import BROBOv3_1',
+    'engines': 'import stock_cutter_1d, alns_stock_cutter',
+}
+
+SCRIPT = 'import time; start = time.perf_counter(); {imports}; print(time.perf_counter() - start)'
+
+
+def time_import(imports):
+    output = subprocess.run([sys.executable, '-c', SCRIPT.format(imports=imports)], cwd=CSP, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.split()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, imports in TARGETS.items():
+        try:
+            times = [time_import(imports) for _ in range(runs)]
+        except subprocess.CalledProcessError as error:
+            print(f'{name:>9}: failed ({error.stderr.strip().splitlines()[-1]})')
+            continue
+        print(f'{name:>9}: {statistics.median(times) * 1000:8.1f} ms  (min {min(times) * 1000:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Compares program files written per second by the xlsxwriter path and the direct BROBO writer.
+
+Usage:
+    python benchmarks/bench_xlsx_writers.py [number_of_files]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'csp'))
+from build_xlsx_file import buildXFile, JobDirectory
+
+
+def random_stick(rng):
+    cuts = [-rng.randint(1000, 40000) for _ in range(rng.randint(2, 12))]
+    return [sum(-cut for cut in cuts) + 125 * (len(cuts) - 1)] + cuts[1:]
+
+
+def bench(writer, sticks):
+    with tempfile.TemporaryDirectory() as dirPath:
+        jobDirectory = JobDirectory(dirPath, 1)
+        start = time.perf_counter()
+        for programNum, stick in enumerate(sticks, start=1):
+            buildXFile(stick, programNum, 1, dirPath, None, 1, jobDirectory, writer).buildSheet()
+        return len(sticks) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(1234)
+    sticks = [random_stick(rng) for _ in range(count)]
+    results = {writer: bench(writer, sticks) for writer in ('xlsxwriter', 'direct')}
+    for writer, rate in results.items():
+        print(f'{writer:>10}: {rate:8.1f} files/s')
+    print(f'   speedup: {results["direct"] / results["xlsxwriter"]:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Offline generator for one dimensional cutting stock benchmark instances.
+
+Every instance is a dict with the keys ``name``, ``family``, ``seed``, ``stock_length`` and ``demands``, where
+``demands`` is a list of ``[quantity, length]`` pairs with distinct integer lengths, longest first, the format the
+OR-Tools engines take. Lengths are integers so they can be read as thousandths of an inch. The same arguments
+always give the same instance.
+
+Families:
+    uniform:  Falkenauer's "u" class. Item lengths uniform in [20, 100] on a stock of 150, so there are many
+              distinct lengths with small quantities.
+    triplet:  Falkenauer's "t" class. Every stock is filled exactly by three items between a quarter and a half of
+              the stock, so the material bound is optimal and any waste at all is a wrong packing.
+    shop:     Shop floor cut lists. A few distinct lengths on a 24 ft stick, in sixteenths of an inch, with high
+              quantities.
+"""
+import random
+from collections import Counter
+
+
+def uniform(numItems, seed, stock_length=150, low=20, high=100):
+    rng = random.Random(seed)
+    lengths = [rng.randint(low, high) for _ in range(numItems)]
+    return _instance(f'uniform_{numItems}_s{seed}', 'uniform', seed, stock_length, lengths)
+
+
+def triplet(numTriplets, seed, stock_length=1000):
+    rng = random.Random(seed)
+    quarter = stock_length // 4
+    lengths = []
+    for _ in range(numTriplets):
+        first = rng.randint(stock_length * 38 // 100, stock_length * 49 // 100)
+        second = rng.randint(quarter, stock_length - first - quarter)
+        lengths += [first, second, stock_length - first - second]
+    return _instance(f'triplet_{numTriplets}_s{seed}', 'triplet', seed, stock_length, lengths)
+
+
+def shop(numLengths, seed, stock_length=288000, low=12000, high=120000, maxQuantity=200):
+    rng = random.Random(seed)
+    sizes = rng.sample(range(low * 16 // 1000, high * 16 // 1000), numLengths)
+    lengths = []
+    for size in sizes:
+        lengths += [size * 1000 // 16] * rng.randint(10, maxQuantity)
+    return _instance(f'shop_{numLengths}_s{seed}', 'shop', seed, stock_length, lengths)
+
+
+FAMILIES = {
+    'uniform': (uniform, (60, 120, 250)),
+    'triplet': (triplet, (20, 40)),
+    'shop': (shop, (5, 12)),
+}
+
+QUICK_FAMILIES = {
+    'uniform': (uniform, (60,)),
+    'triplet': (triplet, (20,)),
+    'shop': (shop, (5,)),
+}
+
+
+def suite(seeds=(1234,), families=FAMILIES):
+    """Builds every instance of every family for each seed.
+
+    :param seeds: (Optional) The seeds. Defaults to (1234,).
+    :param dict families: (Optional) Family name to (generator, sizes). Defaults to FAMILIES.
+    :return: Instances
+    :rtype: list of dict
+    """
+    return [generator(size, seed) for seed in seeds for generator, sizes in families.values() for size in sizes]
+
+
+def flatten(instance):
+    """Get one length per item, the format ``alnsSolver`` takes."""
+    return [length for quantity, length in instance['demands'] for _ in range(quantity)]
+
+
+def _instance(name, family, seed, stock_length, lengths):
+    demands = [[quantity, length] for length, quantity in sorted(Counter(lengths).items(), reverse=True)]
+    return {'name': name, 'family': family, 'seed': seed, 'stock_length': stock_length, 'demands': demands}
@@ -1,7 +1,18 @@
-from asyncio.windows_events import NULL
+import logging
+import queue
+import threading
 import tkinter as tk
+from collections import deque
+from tkinter import filedialog, messagebox, ttk
 from solver_handler import CuttingParameters
+from cut_list_bounds import CutListBounds
 from brobo_preprocessor import buildBroboProgram
+from job_io import parseCut, parseCutList, readCutList
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds the cut list must stay unchanged before first fit decreasing packs it for the upper estimate
+ESTIMATE_DELAY = 300
 
 class CutOptimizerApp:
     def __init__(self, root):
@@ -11,15 +22,24 @@ class CutOptimizerApp:
         self.stock_length = tk.StringVar()
         self.blade_width = tk.StringVar()
         self.dead_zone = tk.StringVar()
-        self.scale_factor = 100
+        self.new_cut_length = tk.StringVar()
+        self.new_cut_quantity = tk.StringVar()
 
+        # Plain array model behind the cut list view; row i of cut_tree shows cut_lengths[i] x cut_quantities[i]
         self.cut_lengths = []
         self.cut_quantities = []
+        self.cut_bounds = None
+        self.estimate_job = None
+
+        # Background solving state, only touched from the Tk thread
+        self.pending_jobs = deque()
+        self.solve_events = queue.Queue()
+        self.cancel_solve = None
 
         self.create_widgets()
 
     def create_widgets(self):
-        self.root.geometry("270x400")  # Set the initial window size
+        self.root.geometry("270x560")  # Set the initial window size
 
         tk.Label(self.root, text="Stock Length:").pack()
         tk.Entry(self.root, textvariable=self.stock_length).pack()
@@ -30,56 +50,163 @@ class CutOptimizerApp:
         tk.Label(self.root, text="Dead Zone:").pack()
         tk.Entry(self.root, textvariable=self.dead_zone).pack()
 
-        self.add_cut_button = tk.Button(self.root, text="Add Cut", command=self.add_cut)
-        self.add_cut_button.pack()
+        new_cut_frame = tk.Frame(self.root)
+        new_cut_frame.pack()
+        tk.Label(new_cut_frame, text="Cut Length").grid(row=0, column=0)
+        tk.Label(new_cut_frame, text="Quantity").grid(row=0, column=1)
+        self.new_cut_length_entry = tk.Entry(new_cut_frame, textvariable=self.new_cut_length, width=12)
+        self.new_cut_length_entry.grid(row=1, column=0)
+        tk.Entry(new_cut_frame, textvariable=self.new_cut_quantity, width=12).grid(row=1, column=1)
+
+        cut_button_frame = tk.Frame(self.root)
+        cut_button_frame.pack()
+        self.add_cut_button = tk.Button(cut_button_frame, text="Add Cut", command=self.add_cut)
+        self.add_cut_button.grid(row=0, column=0)
         self.add_cut_button.config(state="disabled")  # Disable the button initially
+        tk.Button(cut_button_frame, text="Remove", command=self.remove_cuts).grid(row=0, column=1)
+        tk.Button(cut_button_frame, text="Paste", command=self.paste_cuts).grid(row=0, column=2)
+        tk.Button(cut_button_frame, text="Import", command=self.import_cuts).grid(row=0, column=3)
+
+        self.estimate_label = tk.Label(self.root, text="Estimate: -")
+        self.estimate_label.pack()
 
         self.optimize_button = tk.Button(self.root, text="Optimize Cuts", command=self.UtestOptimize)
         self.optimize_button.pack()
 
-        self.cut_canvas = tk.Canvas(self.root)
-        self.cut_frame = tk.Frame(self.cut_canvas)
+        self.progress_bar = ttk.Progressbar(self.root, orient="horizontal", mode="determinate", maximum=100)
+        self.progress_bar.pack(fill="x")
 
-        self.cut_scrollbar = tk.Scrollbar(self.root, orient="vertical", command=self.cut_canvas.yview)
-        self.cut_canvas.configure(yscrollcommand=self.cut_scrollbar.set)
+        self.status_label = tk.Label(self.root, text="Idle")
+        self.status_label.pack()
 
-        self.cut_scrollbar.pack(side="right", fill="y")
-        self.cut_canvas.pack(side="left", fill="both", expand=True)
-        self.cut_canvas.create_window((0, 0), window=self.cut_frame, anchor="nw")
+        self.cancel_button = tk.Button(self.root, text="Cancel", command=self.cancel)
+        self.cancel_button.pack()
+        self.cancel_button.config(state="disabled")
+
+        # A Treeview only draws the visible rows, so the cost of the list does not grow with the number of cuts
+        self.cut_tree = ttk.Treeview(self.root, columns=("length", "quantity"), show="headings", selectmode="extended")
+        self.cut_tree.heading("length", text="Cut Length")
+        self.cut_tree.heading("quantity", text="Quantity")
+        self.cut_tree.column("length", width=120, anchor="e")
+        self.cut_tree.column("quantity", width=120, anchor="e")
+        self.cut_tree.bind("<Double-1>", self.edit_cut)
+        self.cut_tree.bind("<Delete>", lambda event: self.remove_cuts())
 
-        self.cut_frame.bind("<Configure>", self.on_frame_configure)
+        self.cut_scrollbar = tk.Scrollbar(self.root, orient="vertical", command=self.cut_tree.yview)
+        self.cut_tree.configure(yscrollcommand=self.cut_scrollbar.set)
 
-        tk.Label(self.cut_frame, text="Cut Length").grid(row=0, column=0)
-        tk.Label(self.cut_frame, text="Quantity").grid(row=0, column=1)
+        self.cut_scrollbar.pack(side="right", fill="y")
+        self.cut_tree.pack(side="left", fill="both", expand=True)
 
         # Bind a function to be called whenever the entry fields are updated
         self.stock_length.trace_add("write", self.check_initial_params)
         self.blade_width.trace_add("write", self.check_initial_params)
         self.dead_zone.trace_add("write", self.check_initial_params)
 
-    def on_frame_configure(self, event):
-        self.cut_canvas.configure(scrollregion=self.cut_canvas.bbox("all"))
-
     def check_initial_params(self, *args):
         # Check if all three initial parameters are provided
         if self.stock_length.get() and self.blade_width.get() and self.dead_zone.get():
             self.add_cut_button.config(state="normal")  # Enable the button
         else:
             self.add_cut_button.config(state="disabled")  # Disable the button
+        self.rebuild_estimate()
+
+    def rebuild_estimate(self):
+        try:
+            self.cut_bounds = CutListBounds(float(self.getStockLength()), float(self.getBladeWidth()),
+                                            float(self.getDeadZone()))
+        except ValueError:
+            self.cut_bounds = None
+        else:
+            for length, quantity in zip(self.cut_lengths, self.cut_quantities):
+                self.cut_bounds.add(float(length), quantity)
+        self.show_estimate()
+
+    def show_estimate(self):
+        # The lower bound is O(1) and shown at once; the upper bound waits until the edits pause
+        if self.estimate_job is not None:
+            self.root.after_cancel(self.estimate_job)
+            self.estimate_job = None
+        if self.cut_bounds is None or not self.cut_lengths:
+            self.estimate_label.config(text="Estimate: -")
+            return
+        lower = self.cut_bounds.lowerBound()
+        if lower is None:
+            self.estimate_label.config(text="Estimate: a cut is longer than the stock")
+            return
+        self.estimate_label.config(text=f"Estimate: at least {lower} sticks")
+        self.estimate_job = self.root.after(ESTIMATE_DELAY, self.show_upper_estimate)
+
+    def show_upper_estimate(self):
+        self.estimate_job = None
+        lower, upper = self.cut_bounds.lowerBound(), self.cut_bounds.upperBound()
+        if lower == upper:
+            self.estimate_label.config(text=f"Estimate: {lower} sticks")
+        else:
+            self.estimate_label.config(text=f"Estimate: {lower} to {upper} sticks")
 
     def add_cut(self):
-        cut_length = tk.StringVar()
-        cut_quantity = tk.StringVar()
+        try:
+            length, quantity = parseCut(self.new_cut_length.get(), self.new_cut_quantity.get() or "1")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid numeric values.")
+            return
+        self.append_cuts([(length, quantity)])
+        self.new_cut_length.set("")
+        self.new_cut_quantity.set("")
+        self.new_cut_length_entry.focus_set()
 
-        entry_cut_length = tk.Entry(self.cut_frame, textvariable=cut_length)
-        entry_cut_quantity = tk.Entry(self.cut_frame, textvariable=cut_quantity)
+    def append_cuts(self, cuts):
+        for length, quantity in cuts:
+            self.cut_lengths.append(length)
+            self.cut_quantities.append(quantity)
+            self.cut_tree.insert("", "end", values=(length, quantity))
+            if self.cut_bounds is not None:
+                self.cut_bounds.add(float(length), quantity)
+        self.show_estimate()
 
-        entry_cut_length.grid(row=len(self.cut_lengths) + 1, column=0)
-        entry_cut_quantity.grid(row=len(self.cut_quantities) + 1, column=1)
+    def remove_cuts(self):
+        rows = sorted((self.cut_tree.index(item) for item in self.cut_tree.selection()), reverse=True)
+        for row in rows:
+            if self.cut_bounds is not None:
+                self.cut_bounds.remove(float(self.cut_lengths[row]), self.cut_quantities[row])
+            del self.cut_lengths[row]
+            del self.cut_quantities[row]
+        self.cut_tree.delete(*self.cut_tree.selection())
+        self.show_estimate()
+
+    def edit_cut(self, event):
+        item = self.cut_tree.identify_row(event.y)
+        if not item:
+            return
+        row = self.cut_tree.index(item)
+        self.new_cut_length.set(self.cut_lengths[row])
+        self.new_cut_quantity.set(self.cut_quantities[row])
+        self.cut_tree.selection_set(item)
+        self.remove_cuts()
+        self.new_cut_length_entry.focus_set()
+
+    def paste_cuts(self):
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return
+        self.load_cuts(lambda: parseCutList(text))
+
+    def import_cuts(self):
+        path = filedialog.askopenfilename(filetypes=[("Cut lists", "*.csv *.txt *.xlsx"), ("All files", "*.*")])
+        if not path:
+            return
+        self.load_cuts(lambda: readCutList(path))
+
+    def load_cuts(self, read):
+        try:
+            cuts = read()
+        except ValueError as error:
+            messagebox.showerror("Error", str(error))
+            return
+        self.append_cuts(cuts)
 
-        self.cut_lengths.append(cut_length)
-        self.cut_quantities.append(cut_quantity)
-    
     def getStockLength(self):
         return self.stock_length.get()
     
@@ -90,18 +217,14 @@ class CutOptimizerApp:
         return self.dead_zone.get()
     
     def getCutLengths(self):
-        return [cut_length.get() for cut_length in self.cut_lengths]
+        return list(self.cut_lengths)
     
     def getCutQuantities(self):
-        return [int(cut_quantity.get()) for cut_quantity in self.cut_quantities]
-    
-    def getScaleFactor(self):
-        #TODO: return self.scale_factor.get()
-        return 100
+        return list(self.cut_quantities)
     
     def getSolver(self):
         #TODO: return self.solver.get()
-        return "ALNS"
+        return "Auto"
     
     def getAuthor(self):
         #TODO: return self.author.get()
@@ -135,31 +258,110 @@ class CutOptimizerApp:
         print(f"Stock Length: {stock_length}\nBlade Width: {blade_width}\nDead Zone: {dead_zone}\nCut Lengths: {cut_lengths}\nCut Quantities: {cut_quantities}")
         newCut = CuttingParameters(stock_length, blade_width, dead_zone, cut_lengths, cut_quantities)
         newCut.setSolver('ALNS')
-        newCut.setScaleFactor(100)
         newCut.setJobNumber(1212)
         newCut.setDirPath("U:/Git Development/rsi.Brobo")
         newCut.setAuthor("Dylan")
         newCut.setStaringProgramNumber(4)
         newCut.setFileName("test")
         newCut.setDebug(True)
-        newCut.buildSolution()
-        newCut.print_solution()
-        buildBroboProgram(newCut)
+        self.submit(newCut, buildPrograms=True)
 
     def optimize(self):
-        newCut = CuttingParameters(self.getStockLength(), self.getBladeWidth(), self.getDeadZone(), self.getCutLengths(), self.getCutQuantities())
+        try:
+            newCut = CuttingParameters(float(self.getStockLength()), float(self.getBladeWidth()), float(self.getDeadZone()),
+                                       [float(length) for length in self.getCutLengths()], self.getCutQuantities())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid numeric values.")
+            return
         newCut.setSolver(self.getSolver())
-        newCut.setScaleFactor(self.getScaleFactor())
         newCut.setJobNumber(self.getJobNumber())
         newCut.setDirPath(self.getDirPath())
         newCut.setAuthor(self.getAuthor())
         newCut.setDebug(self.getDebug())
-        newCut.buildSolution()
-        solution = newCut.getSolution()
-        print (solution)
+        self.submit(newCut, buildPrograms=False)
         #buildBroboProgram(solution, newCut.getBladeWidth(), newCut.getJobNumber(), newCut.getDirPath())
 
+    def submit(self, newCut, buildPrograms):
+        # The job's inputs are captured in newCut, so the form can be edited for the next job straight away
+        self.pending_jobs.append((newCut, buildPrograms))
+        if self.cancel_solve is None:
+            self.start_next_job()
+        else:
+            self.update_status("Solving...")
+
+    def start_next_job(self):
+        newCut, buildPrograms = self.pending_jobs.popleft()
+        self.cancel_solve = threading.Event()
+        self.progress_bar["value"] = 0
+        self.cancel_button.config(state="normal")
+        self.update_status("Solving...")
+        worker = threading.Thread(target=self.solve_worker, args=(newCut, buildPrograms, self.cancel_solve), daemon=True)
+        worker.start()
+        self.root.after(100, self.poll_solve)
+
+    def solve_worker(self, newCut, buildPrograms, cancel):
+        # Runs off the Tk thread: never touch widgets here, only post messages to solve_events
+        try:
+            newCut.solve(lambda event: self.solve_events.put(("progress", event)), cancel)
+            if cancel.is_set():
+                self.solve_events.put(("cancelled", newCut))
+                return
+            if buildPrograms:
+                buildBroboProgram(newCut)
+            self.solve_events.put(("done", newCut))
+        except Exception as error:
+            # Every failure must be posted, or poll_solve would wait for this job forever
+            if not isinstance(error, (ValueError, OSError)):
+                logger.exception("Solve failed")
+            self.solve_events.put(("error", error))
+
+    def poll_solve(self):
+        finished = False
+        while True:
+            try:
+                kind, payload = self.solve_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                self.show_progress(payload)
+                continue
+            finished = True
+            if kind == "done":
+                payload.print_solution()
+                logger.debug("Solve metrics: %s", payload.getMetrics().toJSON())
+                self.progress_bar["value"] = 100
+                self.update_status(f"Done: {len(payload.getSolution())} sticks")
+            elif kind == "cancelled":
+                self.update_status("Cancelled")
+            else:
+                error = payload
+                logger.error("Error: %s", error)
+                self.update_status("Failed")
+                messagebox.showerror("Error", str(error) or type(error).__name__)
+        if not finished:
+            self.root.after(100, self.poll_solve)
+            return
+        self.cancel_solve = None
+        self.cancel_button.config(state="disabled")
+        if self.pending_jobs:
+            self.start_next_job()
+
+    def show_progress(self, event):
+        self.progress_bar["value"] = 100 * event["iteration"] / max(event["iterations"], 1)
+        self.update_status(f"{event['engine']}: {event['sticks']} sticks (min {event['bound']}), {event['elapsed']:.1f}s")
+
+    def update_status(self, text):
+        if self.pending_jobs:
+            text += f" | {len(self.pending_jobs)} queued"
+        self.status_label.config(text=text)
+
+    def cancel(self):
+        if self.cancel_solve is not None:
+            self.cancel_solve.set()
+            self.update_status("Cancelling...")
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     root = tk.Tk()
     app = CutOptimizerApp(root)
     root.mainloop()
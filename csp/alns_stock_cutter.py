@@ -1,24 +1,48 @@
-import copy
 from functools import partial
+from math import ceil
 
-import matplotlib.pyplot as plt
 import numpy as np
 import numpy.random as rnd
 
 from alns import ALNS
 from alns.accept import HillClimbing
 from alns.select import RouletteWheel
-from alns.stop import MaxIterations
+from alns.stop import MaxIterations, MaxRuntime
+
+from cut_solution import CutSolution
+from solve_progress import ProgressTracker
+
+# Outcome order of the ALNS operator counts: new global best, better than current, accepted, rejected
+OUTCOMES = ('best', 'better', 'accepted', 'rejected')
 
 #BEAM_LENGTH = 9500  #TODO: make this a parameter It is not being set correctly
+# Stock types as (available, length, cost) tuples, set by alnsSolver; available is None for unlimited
+STOCKS = None
+
+
+class Beam(list):
+    """
+    A beam in use: the ordered beams cut from it, plus the index of its
+    stock type in STOCKS.
+    """
+    __slots__ = ('stock',)
+
+    def __init__(self, cuts=(), stock=0):
+        super().__init__(cuts)
+        self.stock = stock
+
+    def copy(self):
+        return Beam(self, self.stock)
+
+
 class CspState:
     """
     Solution state for the CSP problem. It has two data members, assignments
-    and unassigned. Assignments is a list of lists, one for each beam in use.
+    and unassigned. Assignments is a list of Beams, one for each beam in use.
     Each entry is another list, containing the ordered beams cut from this
-    beam. Each such sublist must sum to at most BEAM_LENGTH. Unassigned is a
-    list of ordered beams that are not currently assigned to one of the
-    available beams.
+    beam. Each such sublist must sum to at most the length of its stock
+    type. Unassigned is a list of ordered beams that are not currently
+    assigned to one of the available beams.
     """
 
     def __init__(self, assignments, unassigned=None):
@@ -31,18 +55,33 @@ class CspState:
         """
         Helper method to ensure each solution state is immutable.
         """
-        return CspState(copy.deepcopy(self.assignments), self.unassigned.copy())
+        return CspState([assignment.copy() for assignment in self.assignments], self.unassigned.copy())
 
     def objective(self):
         """
-        Computes the total number of beams in use.
+        Computes the total cost of the beams in use, which is the number of
+        beams when there is one stock type. Beams beyond the available stock
+        cost a penalty that no feasible solution reaches.
+        """
+        cost = sum(STOCKS[assignment.stock][2] for assignment in self.assignments)
+        excess = self.excess()
+        return cost + PENALTY * excess if excess else cost
+
+    def excess(self):
+        """
+        Computes the number of beams in use beyond the available stock.
         """
-        return len(self.assignments)
+        if len(STOCKS) == 1 and STOCKS[0][0] is None:
+            return 0
+        used = stockUsage(self.assignments)
+        return sum(max(used[s] - STOCKS[s][0], 0) for s in range(len(STOCKS)) if STOCKS[s][0] is not None)
 
     def plot(self):
         """
-        Helper method to plot a solution.
+        Helper method to plot a solution. Imports matplotlib on first use.
         """
+        import matplotlib.pyplot as plt
+
         _, ax = plt.subplots(figsize=(12, 6))
 
         ax.barh(np.arange(len(self.assignments)),
@@ -64,8 +103,54 @@ def wastage(assignment):
     """
     Helper method that computes the wastage on a given beam assignment.
     """
-    print (BEAM_LENGTH)
-    return BEAM_LENGTH - sum(assignment)
+    return STOCKS[assignment.stock][1] - sum(assignment)
+
+
+def stockUsage(assignments):
+    """
+    Helper method that counts the beams in use of each stock type.
+    """
+    used = [0] * len(STOCKS)
+    for assignment in assignments:
+        used[assignment.stock] += 1
+    return used
+
+
+def open_beam(state, beam):
+    """
+    Opens a new beam for an ordered beam, using the available stock type
+    with the lowest cost per unit length that fits it, and the longest
+    fitting stock type if none is available.
+    """
+    if len(STOCKS) == 1:
+        return Beam([beam], 0)
+    used = stockUsage(state.assignments)
+    fitting = [s for s in range(len(STOCKS)) if STOCKS[s][1] >= beam]
+    available = [s for s in fitting if STOCKS[s][0] is None or used[s] < STOCKS[s][0]]
+    if available:
+        stock = min(available, key=lambda s: (STOCKS[s][2] / STOCKS[s][1], -STOCKS[s][1]))
+    else:
+        stock = max(fitting, key=lambda s: STOCKS[s][1])
+    return Beam([beam], stock)
+
+
+def right_size(state):
+    """
+    Moves every beam to the cheapest available stock type its cuts fit on,
+    so the bar type is chosen per beam once its cuts are known.
+    """
+    if len(STOCKS) == 1:
+        return state
+    used = stockUsage(state.assignments)
+    for assignment in sorted(state.assignments, key=sum):
+        length = sum(assignment)
+        used[assignment.stock] -= 1
+        candidates = [s for s in range(len(STOCKS)) if STOCKS[s][1] >= length and
+                      (STOCKS[s][0] is None or used[s] < STOCKS[s][0])]
+        if candidates:
+            assignment.stock = min(candidates, key=lambda s: (STOCKS[s][2], -STOCKS[s][1]))
+        used[assignment.stock] += 1
+    return state
 
 
 """DESTROY OPERATORS"""
@@ -79,8 +164,8 @@ def random_removal(state, random_state):
     """
     state = state.copy()
 
-    for _ in range(beams_to_remove(state.objective())):
-        idx = random_state.randint(state.objective())
+    for _ in range(beams_to_remove(len(state.assignments))):
+        idx = random_state.randint(len(state.assignments))
         state.unassigned.extend(state.assignments.pop(idx))
 
     return state
@@ -96,7 +181,7 @@ def worst_removal(state, random_state):
     state.assignments.sort(key=wastage, reverse=True)
 
     # Removes the worst assignments
-    for _ in range(beams_to_remove(state.objective())):
+    for _ in range(beams_to_remove(len(state.assignments))):
         state.unassigned.extend(state.assignments.pop(0))
 
     return state
@@ -117,9 +202,9 @@ def greedy_insert(state, random_state):
                 assignment.append(beam)
                 break
         else:
-            state.assignments.append([beam])
+            state.assignments.append(open_beam(state, beam))
 
-    return state
+    return right_size(state)
 
 def minimal_wastage(state, random_state):
     """
@@ -141,14 +226,61 @@ def minimal_wastage(state, random_state):
         if beam <= wastage(assignment):
             assignment.append(beam)
         else:
-            state.assignments.append([beam])
+            state.assignments.append(open_beam(state, beam))
 
-    return state
+    return right_size(state)
+
+class ProgressStop:
+    """
+    Stopping criterion that wraps another criterion and reports every new
+    best state to a ProgressTracker. Stops early when the tracker's
+    progress callback asks for it.
+    """
+
+    def __init__(self, stop, tracker, bound):
+        self.stop = stop
+        self.tracker = tracker
+        self.bound = bound
+        self.iteration = 0
+
+    def __call__(self, rnd_state, best, current):
+        stock_used = sum(STOCKS[assignment.stock][1] for assignment in best.assignments) if len(STOCKS) > 1 else None
+        stopped = self.tracker.update(self.iteration, len(best.assignments), self.bound, stock_used)
+        self.iteration += 1
+        return stopped or self.stop(rnd_state, best, current)
 
-def alnsSolver(stock_length, cutData, iterations=100, seed=1234):
-    global BEAM_LENGTH
-    BEAM_LENGTH = stock_length
+
+class FirstStop:
+    """
+    Stopping criterion that stops as soon as any of the wrapped criteria
+    does. Every criterion is consulted on each iteration so their internal
+    counters stay in step.
+    """
+
+    def __init__(self, *stops):
+        self.stops = stops
+
+    def __call__(self, rnd_state, best, current):
+        return any([stop(rnd_state, best, current) for stop in self.stops])
+
+
+def alnsSolver(stock_length, cutData, iterations=100, seed=1234, progress=None, cancel=None, metrics=None, time_limit=None, stocks=None):
+    """
+    Packs the ordered beams with ALNS, starting from a greedy solution.
+
+    stocks optionally replaces stock_length with several stock types as
+    [available, length, cost] lists; available is None for unlimited and
+    cost defaults to 1. The bar type is then chosen per beam and the total
+    cost minimized. Raises ValueError if the available stock cannot hold
+    every ordered beam.
+    """
+    global BEAM_LENGTH, STOCKS, PENALTY
+    if stocks is None:
+        stocks = [[None, stock_length]]
+    STOCKS = [(stock[0], stock[1], stock[2] if len(stock) > 2 and stock[2] is not None else 1) for stock in stocks]
+    BEAM_LENGTH = stock_length = max(stock[1] for stock in STOCKS)
     BEAMS = cutData # must be a flattened list 
+    PENALTY = max(stock[2] for stock in STOCKS) * (len(BEAMS) + 1)
     # Define the initial state of the problem
     rnd_state = rnd.RandomState(seed)
     state = CspState([], BEAMS.copy())
@@ -165,8 +297,33 @@ def alnsSolver(stock_length, cutData, iterations=100, seed=1234):
     
     accept = HillClimbing()
     select = RouletteWheel([3, 2, 1, 0.5], 0.8, 2, 2)
+    tracker = ProgressTracker(progress, 'ALNS', iterations, stock_length, sum(BEAMS), cancel)
     stop = MaxIterations(iterations)
+    if time_limit is not None:
+        stop = FirstStop(stop, MaxRuntime(time_limit))
+    stop = ProgressStop(stop, tracker, ceil(sum(BEAMS) / stock_length))
     result = alns.iterate(init_sol, select, accept, stop)
+    if metrics is not None:
+        _recordStatistics(metrics, result.statistics)
     solution = result.best_state
+    if solution.excess():
+        raise ValueError('Not enough stock available to cut every part')
     # Return the best solution found
-    return solution.assignments
\ No newline at end of file
+    if len(STOCKS) == 1:
+        return CutSolution.fromSticks(solution.assignments, stock_length)
+    return CutSolution.fromSticks(solution.assignments, stock_length,
+                                  [STOCKS[assignment.stock][1] for assignment in solution.assignments])
+
+
+def _recordStatistics(metrics, statistics):
+    """
+    Records the ALNS iteration times and how often each operator led to each outcome.
+    """
+    for runtime in statistics.runtimes:
+        metrics.observe('alns_iteration', float(runtime))
+    metrics.increment('alns_iterations', len(statistics.runtimes))
+    for kind, counts in (('destroy', statistics.destroy_operator_counts),
+                         ('repair', statistics.repair_operator_counts)):
+        for name, outcomes in counts.items():
+            for outcome, count in zip(OUTCOMES, outcomes):
+                metrics.increment(f'alns_{kind}_{name}_{outcome}', int(count))
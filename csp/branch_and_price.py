@@ -0,0 +1,269 @@
+import heapq
+import logging
+import time
+from math import ceil, floor
+
+from ortools.linear_solver import pywraplp
+
+from cut_solution import CutSolution
+from greedy_cutter import firstFitDecreasing
+from metrics import Metrics
+from solve_progress import ProgressTracker
+from stock_cutter_1d import (MAX_PRICING_COLUMNS, REDUCED_COST_TOLERANCE, get_diverse_patterns, get_pattern_ladder,
+                             newSolver, solve_master)
+
+logger = logging.getLogger(__name__)
+
+# Most nodes searched before the best incumbent is returned with the gap proven so far
+MAX_NODES = 10000
+# Most seconds the integer master over the root columns gets to find an incumbent
+ROOT_MASTER_TIME = 2.0
+# Relative slack taken off an LP value before it is rounded up to a stick bound, so LP round-off never overstates it
+BOUND_TOLERANCE = 1e-6
+# Pattern usage this close to an integer counts as integral
+INTEGRALITY_TOLERANCE = 1e-6
+
+
+def branchAndPrice(demands, stock_length, time_limit=None, metrics=None, progress=None, cancel=None, maxNodes=MAX_NODES):
+    """Solves the cutting stock problem exactly by branch-and-price, proving how far the answer is from optimal.
+
+    Every node solves the column generation LP of the pattern master to optimality, pricing with the greedy, local
+    search and exact knapsack ladder of :func:`stock_cutter_1d.get_pattern_ladder`; its value rounded up bounds the
+    stick count of every solution below the node. Nodes are searched best bound first. A node whose LP uses a pattern
+    a fractional number of times branches on that pattern: one child cuts it at most the rounded down number of times,
+    the other at least the rounded up number. Capped patterns must not come back as new columns, so pricing skips
+    them and, when the exact knapsack optimum is capped, takes the best pattern that is not from a bounded depth first
+    search. The lower bound of the whole search is the smallest bound of the open nodes.
+
+    Incumbents come from first fit decreasing, the integer master over the root columns and, at every node, the LP
+    usage rounded down with the rest of the demand packed by first fit decreasing. The search stops when the
+    incumbent meets the lower bound, the time limit or node limit is reached, or it is cancelled.
+
+    Records the ``branch_and_price`` timer around the search, the ``master_lp`` and ``pricing`` timers of every
+    column generation iteration and the ``branch_and_price_nodes``, ``branch_and_price_incumbents`` and
+    ``branch_and_price_proven`` counters.
+
+    :param list demands: [quantity, length] pairs with integer lengths including kerf.
+    :param int stock_length: The usable stock length.
+    :param float time_limit: (Optional) Seconds after which the best incumbent is returned.
+    :param Metrics metrics: (Optional) Collects the timers and counters.
+    :param callable progress: (Optional) Progress callback, see :class:`ProgressTracker`. Its ``bound`` is the proven
+        lower bound.
+    :param threading.Event cancel: (Optional) Stops the search when set.
+    :param int maxNodes: (Optional) The most nodes to search. Defaults to MAX_NODES.
+    :raises ValueError: If a cut is longer than the stock.
+    :return: The best solution found and a lower bound on the sticks of any solution; the proven gap is one less the
+        bound over the solution's stick count
+    :rtype: tuple of (CutSolution, int)
+    """
+    if metrics is None:
+        metrics = Metrics()
+    with metrics.timer("branch_and_price"):
+        search = _Search(demands, stock_length, time_limit, metrics, cancel)
+        incumbent = firstFitDecreasing(demands, stock_length)
+        if not len(incumbent):
+            return incumbent, 0
+        tracker = ProgressTracker(progress, "Exact", maxNodes, stock_length, search.demandLength, cancel)
+        # Nodes are (bound, minus depth, sequence, lower bounds, upper bounds) with the bounds keyed by pool index:
+        # best bound first, deepest first among ties
+        heap = [(search.materialBound, 0, 0, {}, {})]
+        nodes = 0
+        while heap and heap[0][0] < len(incumbent):
+            if nodes >= maxNodes or search.stopped():
+                break
+            nodeBound, depth, sequence, lower, upper = heapq.heappop(heap)
+            nodes += 1
+            metrics.increment("branch_and_price_nodes")
+            solved = search.solveNode(lower, upper)
+            if solved is None:
+                # Out of time in the node LP, so the node stays open with what its pricing proved so far
+                heapq.heappush(heap, (max(nodeBound, search.rootBound) if nodes == 1 else nodeBound, depth, sequence,
+                                      lower, upper))
+                break
+            value, values, feasible = solved
+            if not feasible:
+                continue
+            nodeBound = max(nodeBound, ceil(value - BOUND_TOLERANCE * max(value, 1.0)))
+            candidates = [search.roundDown(values)]
+            if nodes == 1:
+                candidates.append(search.integerMaster())
+            for candidate in candidates:
+                if candidate is not None and len(candidate) < len(incumbent):
+                    incumbent = candidate
+                    metrics.increment("branch_and_price_incumbents")
+            if nodeBound < len(incumbent):
+                branch = _branchingPattern(values)
+                if branch is not None:
+                    count = values[branch]
+                    heapq.heappush(heap, (nodeBound, depth - 1, 2 * nodes, {**lower, branch: ceil(count)}, upper))
+                    heapq.heappush(heap, (nodeBound, depth - 1, 2 * nodes + 1, lower, {**upper, branch: floor(count)}))
+            bound = min(heap[0][0], len(incumbent)) if heap else len(incumbent)
+            if tracker.update(nodes, len(incumbent), bound):
+                break
+        bound = min(heap[0][0], len(incumbent)) if heap else len(incumbent)
+    if bound == len(incumbent):
+        metrics.increment("branch_and_price_proven")
+    logger.info("Branch-and-price searched %d nodes: %d sticks, lower bound %d, gap %.2f%%", nodes, len(incumbent),
+                bound, 100 * (1 - bound / len(incumbent)))
+    tracker.update(nodes, len(incumbent), bound)
+    return incumbent, bound
+
+
+class _Search:
+    # The column pool shared by every node, and the node LP, pricing and incumbent heuristics over it
+    def __init__(self, demands, stock_length, time_limit, metrics, cancel):
+        self.quantities = [quantity for quantity, _ in demands]
+        self.widths = [length for _, length in demands]
+        self.stock_length = stock_length
+        self.metrics = metrics
+        self.cancel = cancel
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.demandLength = sum(quantity * length for quantity, length in demands)
+        self.materialBound = ceil(self.demandLength / stock_length)
+        self.rootBound = self.materialBound
+        # Any real solution costs less than covering a single cut with an artificial variable
+        self.penalty = sum(self.quantities) + 1
+        self.pool = []
+        self.index = {}
+        for i, width in enumerate(self.widths):
+            pattern = [0] * len(self.widths)
+            pattern[i] = stock_length // width
+            self._addPattern(pattern)
+
+    def stopped(self):
+        return (self.deadline is not None and time.perf_counter() >= self.deadline) or \
+            (self.cancel is not None and self.cancel.is_set())
+
+    def solveNode(self, lower, upper):
+        # Column generation until no pattern prices out; None when stopped before the node LP is optimal
+        root = not lower and not upper
+        capped = {self.pool[j] for j in upper}
+        while not self.stopped():
+            with self.metrics.timer("master_lp"):
+                solved = self._master(lower, upper)
+            if solved is None:
+                return None
+            values, duals, value, artificial = solved
+            with self.metrics.timer("pricing"):
+                columns = self._price(duals, capped, root)
+            if not columns:
+                return value, values, artificial <= INTEGRALITY_TOLERANCE
+            for pattern in columns:
+                self._addPattern(pattern)
+            self.metrics.increment("patterns_added", len(columns))
+        return None
+
+    def roundDown(self, values):
+        # The patterns the LP uses whole, with the demand they leave packed by first fit decreasing
+        counts = [floor(value + INTEGRALITY_TOLERANCE) for value in values]
+        residual = list(self.quantities)
+        for j, count in enumerate(counts):
+            for i, cuts in enumerate(self.pool[j]):
+                residual[i] -= cuts * count
+        rest = firstFitDecreasing([[quantity, width] for quantity, width in zip(residual, self.widths) if quantity > 0],
+                                  self.stock_length)
+        used = [j for j, count in enumerate(counts) if count]
+        table = [[width for width, cuts in zip(self.widths, self.pool[j]) for _ in range(cuts)] for j in used]
+        table += [pattern for pattern, _ in rest.patterns()]
+        return CutSolution(table, [counts[j] for j in used] + [count for _, count in rest.patterns()],
+                           self.stock_length)
+
+    def integerMaster(self):
+        # The integer master over the root columns, for the few instances rounding does not solve
+        time_limit = ROOT_MASTER_TIME
+        if self.deadline is not None:
+            time_limit = min(time_limit, self.deadline - time.perf_counter())
+        if time_limit <= 0:
+            return None
+        patterns = [[pattern[i] for pattern in self.pool] for i in range(len(self.widths))]
+        with self.metrics.timer("integer_master"):
+            status, y, _ = solve_master(patterns, self.quantities, self.stock_length, integer=True,
+                                        time_limit=time_limit)
+        if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            return None
+        return CutSolution.fromPatternMatrix(patterns, y, self.widths, self.stock_length)
+
+    def _addPattern(self, pattern):
+        pattern = tuple(int(count) for count in pattern)
+        if pattern not in self.index:
+            self.index[pattern] = len(self.pool)
+            self.pool.append(pattern)
+
+    def _master(self, lower, upper):
+        # Like stock_cutter_1d.solve_master, with the branching bounds on the pattern usage and artificial variables
+        # that keep nodes feasible until pricing has found patterns to replace the capped ones
+        solver = newSolver("Branch-and-price master")
+        y = [solver.NumVar(lower.get(j, 0), upper.get(j, solver.infinity()), "") for j in range(len(self.pool))]
+        artificial = [solver.NumVar(0, quantity, "") for quantity in self.quantities]
+        objective = solver.Objective()
+        for variable in y:
+            objective.SetCoefficient(variable, 1)
+        for variable in artificial:
+            objective.SetCoefficient(variable, self.penalty)
+        objective.SetMinimization()
+        constraints = []
+        for i, quantity in enumerate(self.quantities):
+            constraint = solver.Constraint(quantity, solver.infinity())
+            constraint.SetCoefficient(artificial[i], 1)
+            constraints.append(constraint)
+        for j, pattern in enumerate(self.pool):
+            for i, cuts in enumerate(pattern):
+                if cuts:
+                    constraints[i].SetCoefficient(y[j], cuts)
+        if solver.Solve() != pywraplp.Solver.OPTIMAL:
+            logger.warning("The branch-and-price master LP was not solved to optimality")
+            return None
+        values = [variable.solution_value() for variable in y]
+        return (values, [constraint.dual_value() for constraint in constraints], sum(values),
+                sum(variable.solution_value() for variable in artificial))
+
+    def _price(self, duals, capped, root):
+        n = len(self.widths)
+        min_value = 1 + REDUCED_COST_TOLERANCE
+        worth = lambda pattern: sum(duals[i] * pattern[i] for i in range(n))
+        allowed = lambda pattern: tuple(pattern) not in capped and tuple(pattern) not in self.index
+        improves = lambda pattern: worth(pattern) > min_value and allowed(pattern)
+        pattern, value, level = get_pattern_ladder(duals, self.widths, self.stock_length, improves,
+                                                   metrics=self.metrics)
+        if level == "exact" and root:
+            # Farley's bound, valid while no pattern is excluded from pricing
+            bound = sum(duals[i] * self.quantities[i] for i in range(n)) / max(value, 1.0)
+            self.rootBound = max(self.rootBound, ceil(bound - BOUND_TOLERANCE * max(bound, 1.0)))
+        if not improves(pattern) and capped and value > min_value:
+            self.metrics.increment("pricing_branching_calls")
+            pattern = _bestAllowedPattern(duals, self.widths, self.stock_length, capped, min_value)
+        if pattern is None or not improves(pattern):
+            return []
+        return [column for column in get_diverse_patterns(duals, self.widths, self.stock_length, pattern,
+                                                          MAX_PRICING_COLUMNS, min_value) if allowed(column)]
+
+
+def _branchingPattern(values):
+    # The pattern used closest to half way between two integers, the most used among ties
+    fractional = [(abs(value - floor(value) - 0.5), -value, j) for j, value in enumerate(values)
+                  if abs(value - round(value)) > INTEGRALITY_TOLERANCE]
+    return min(fractional)[2] if fractional else None
+
+
+def _bestAllowedPattern(l, w, parent_width, excluded, min_value):
+    # Depth first knapsack search, highest dual value per unit width first, pruned by the bound of filling the rest
+    # of the room at the best remaining ratio, for the best pattern worth more than min_value that is not excluded
+    order = sorted((i for i in range(len(l)) if l[i] > 0), key=lambda i: l[i] / w[i], reverse=True)
+    counts = [0] * len(l)
+    best = [None, min_value]
+
+    def search(k, room, value):
+        if k == len(order):
+            if value > best[1] and tuple(counts) not in excluded:
+                best[0], best[1] = list(counts), value
+            return
+        i = order[k]
+        if value + room * l[i] / w[i] <= best[1]:
+            return
+        for count in range(room // w[i], -1, -1):
+            counts[i] = count
+            search(k + 1, room - count * w[i], value + count * l[i])
+        counts[i] = 0
+
+    search(0, parent_width, 0.0)
+    return best[0]
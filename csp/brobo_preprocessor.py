@@ -1,11 +1,30 @@
-from build_xlsx_file import buildXFile
-from solver_handler import CuttingParameters
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from build_xlsx_file import buildXFile, JobDirectory
+from cut_solution import CutSolution
+from units import fromThou, toThou
+
+# Below this many programs the worker pool costs more to start than it saves
+PARALLEL_MIN_PROGRAMS = 8
 
 def buildBroboProgram(cutParams):
-    """This function builds a Brobo program by processing the raw cut data solution and creating an Excel file for each stick.
+    """This function builds a Brobo program by processing the raw cut data solution and creating an Excel file for each
+    unique cutting pattern, with the number of sticks to cut written to the quantity column. If pattern grouping is
+    turned off on the cutting parameters, one Excel file is created for each stick instead. When the job is cut from
+    several stock lengths, generated file names end with the stock length to load.
+
+    Program numbers and file names are assigned in order in the calling process, exactly as a sequential run would.
+    For larger jobs the workbooks are then written by a pool of worker processes while later sticks are still
+    being prepared, with at most two files per worker waiting in the queue. The time to write each file is recorded
+    by the ``xlsx_write`` timer of the cutting parameters metrics.
 
     :param cutParams: The cutting parameters object.
     :type cutParams: CuttingParameters
+    :return: The paths of the program files, in program order
+    :rtype: list of str
 
     Dependencies:
         - CuttingParameters from solver_handler module
@@ -15,18 +34,32 @@ def buildBroboProgram(cutParams):
     bladeKerf = cutParams.getBladeWidth()
     jobNumber = cutParams.getJobNumber()
     fileName = cutParams.getFileName()
-    scaleFactor = cutParams.getScaleFactor()
     author = cutParams.getAuthor()
     dirPath = cutParams.getDirPath()
     programNum = cutParams.getStaringProgramNumber()
-
-    broboSticksData = _buildBroboCutData(solution, bladeKerf)
-    for stickData in broboSticksData:
-        xlsFile = buildXFile(stickData, programNum, jobNumber, dirPath, fileName)
-        if author != None:
-            xlsFile.setAuthor(author)
-        xlsFile.buildSheet()
-        programNum += 1
+    workers = cutParams.getWorkers() or os.cpu_count() or 1
+    metrics = cutParams.getMetrics()
+
+    if not isinstance(solution, CutSolution):
+        solution = CutSolution.fromSticks(solution)
+    stocks = _stockLengths(solution, cutParams.dead_zone)
+    if cutParams.getGroupPatterns():
+        quantities = [count for _, count in solution.patterns()]
+        solution = [pattern for pattern, _ in solution.patterns()]
+    else:
+        stocks = [stock for stock, (_, count) in zip(stocks, solution.patterns()) for _ in range(count)]
+        quantities = [1] * len(solution)
+
+    jobDirectory = JobDirectory(dirPath, jobNumber)
+    xlsFiles = _iterXFiles(_iterBroboCutData(solution, bladeKerf), quantities, programNum, jobNumber, dirPath, fileName, author, jobDirectory, cutParams.getWriter(), stocks)
+    paths = []
+    xlsFiles = _recordPaths(xlsFiles, paths)
+    if workers > 1 and len(solution) >= PARALLEL_MIN_PROGRAMS:
+        _writeParallel(xlsFiles, workers, metrics)
+    else:
+        for xlsFile in xlsFiles:
+            metrics.observe('xlsx_write', _writeXFile(xlsFile))
+    return paths
     #######################################################################
     #TODO: We are rebuilding this function to use a passed in CuttingParameters object so that we can have more control over what is passed to the xls file builder.
     #######################################################################
@@ -54,6 +87,94 @@ def buildBroboProgram(cutParams):
     """
 
 ############ Private Functions ############
+
+def _iterXFiles(broboSticksData, quantities, programNum, jobNumber, dirPath, fileName, author, jobDirectory, writer, stocks):
+    """
+    Creates the xls file builders in program order, allocating each file name as it goes.
+
+    Args:
+        broboSticksData (iterable): The Brobo cut data of each program.
+        quantities (list): The number of sticks each program cuts.
+        programNum (int): The first program number.
+        jobNumber (int): The job number.
+        dirPath (str): The directory path.
+        fileName (str): The name of the Excel files, or None.
+        author (str): The author of the solution, or None.
+        jobDirectory (JobDirectory): The job directory the file names are allocated from.
+        writer (str): The xlsx writer, 'xlsxwriter' or 'direct'.
+        stocks (iterable): The stock length in inches of each program, or None for each when there is one stock length.
+
+    Yields:
+        buildXFile: The xls file builder of each program.
+    """
+    for stickData, quantity, stock in zip(broboSticksData, quantities, stocks):
+        xlsFile = buildXFile(stickData, programNum, jobNumber, dirPath, fileName, quantity, jobDirectory, writer, stock)
+        if author != None:
+            xlsFile.setAuthor(author)
+        yield xlsFile
+        programNum += 1
+
+def _stockLengths(solution, deadZone):
+    """
+    Gets the stock length in inches of each pattern of a job cut from several stock lengths.
+
+    Args:
+        solution (CutSolution): The solution.
+        deadZone (float): The dead zone in inches, taken off the stock lengths the solution records.
+
+    Returns:
+        list: The stock length of each pattern, or None for each when the job has one stock length.
+    """
+    if not solution.hasMixedStock():
+        return [None] * solution.numPatterns()
+    return [fromThou(solution.stockLength(idx) + toThou(deadZone)) for idx in range(solution.numPatterns())]
+
+def _recordPaths(xlsFiles, paths):
+    """
+    Passes the xls file builders through, appending the path of each file to paths.
+
+    Args:
+        xlsFiles (iterable): The xls file builders.
+        paths (list): The list the paths are appended to.
+
+    Yields:
+        buildXFile: The xls file builders.
+    """
+    for xlsFile in xlsFiles:
+        paths.append(xlsFile.savePath + xlsFile.fileName)
+        yield xlsFile
+
+def _writeParallel(xlsFiles, workers, metrics):
+    """
+    Writes the xls files in a pool of worker processes, keeping at most two files per worker in flight.
+
+    Args:
+        xlsFiles (iterable): The xls file builders to write.
+        workers (int): The number of worker processes.
+        metrics (Metrics): Records the write time of each file.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for xlsFile in xlsFiles:
+            if len(pending) >= 2 * workers:
+                metrics.observe('xlsx_write', pending.popleft().result())
+            pending.append(pool.submit(_writeXFile, xlsFile))
+        for future in pending:
+            metrics.observe('xlsx_write', future.result())
+
+def _writeXFile(xlsFile):
+    """
+    Writes one xls file. Runs in a worker process when writing in parallel.
+
+    Args:
+        xlsFile (buildXFile): The xls file builder.
+
+    Returns:
+        float: The time taken to write the file, in seconds.
+    """
+    start = time.perf_counter()
+    xlsFile.buildSheet()
+    return time.perf_counter() - start
         
 def _buildBroboCutData(data, bladeKerf):
     """
@@ -66,8 +187,20 @@ def _buildBroboCutData(data, bladeKerf):
     Returns:
         list: The processed demand data.
     """
-    data, bladeKerf = _scaleData(data, bladeKerf)
-    demandData = []
+    return list(_iterBroboCutData(data, bladeKerf))
+
+def _iterBroboCutData(data, bladeKerf):
+    """
+    Builds the cut data for Brobo machine one stick at a time, without changing the input data.
+
+    Args:
+        data (list): The input data, in integer thousandths of an inch.
+        bladeKerf (float): The blade kerf value in inches.
+
+    Yields:
+        list: The processed demand data of each stick.
+    """
+    bladeKerf = toThou(bladeKerf)
     for stick in data:
         tempStick = []
         stick = _orderList(stick)
@@ -75,25 +208,7 @@ def _buildBroboCutData(data, bladeKerf):
         stick = _drop_first(stick)
         for measurement in stick:
             tempStick.append(_ensure_negative(measurement))
-        demandData.append(tempStick)
-    return demandData
-
-def _scaleData(data, bladeKerf):
-    """
-    Scales the data and blade kerf to decimal inches.
-
-    Parameters:
-    data (list): The data to be scaled.
-    bladeKerf (float): The blade kerf value.
-
-    Returns:
-    tuple: A tuple containing the scaled data and blade kerf.
-    """
-    bladeKerf = round(_inchToDecimalInch(bladeKerf))
-    for stick in data:
-        for i, element in enumerate(stick):
-            stick[i] = round(_inchToDecimalInch(element))
-    return data, bladeKerf
+        yield tempStick
 
 def _buildInitialAbsVal(stickData, bladeKerf):
     """
@@ -112,9 +227,6 @@ def _buildInitialAbsVal(stickData, bladeKerf):
     return abs(kerfLength + partsLength)
 
 ############ Private Helper Functions ############
-def _inchToDecimalInch(measurement):
-    return float(measurement) * 1000
-
 def _orderList(list):
     return sorted(list)
 
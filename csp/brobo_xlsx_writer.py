@@ -0,0 +1,222 @@
+"""Minimal writer for BROBO program workbooks.
+
+A BROBO program is a single sheet of a dozen or so rows, so a full xlsxwriter Workbook is mostly overhead. This
+module writes the same cells straight into an xlsx package. Every part except the sheet, the shared strings and
+the document properties is identical for all programs, so those parts are deflated once at import and copied into
+each file. The sheet and shared strings are written exactly as xlsxwriter writes them, so the cells read back the
+same. The package leaves out the optional theme part.
+"""
+import struct
+import zlib
+from datetime import datetime, timezone
+
+
+HEADER = ['axis', 'number', 'demand', 'quantity', 'mode', 'output']
+
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_CONTENT_TYPES = (
+    _XML_DECLARATION +
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/docProps/app.xml" ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+    '<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>')
+
+_ROOT_RELS = (
+    _XML_DECLARATION +
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    f'<Relationship Id="rId2" Type="{_PACKAGE_REL_NS}/metadata/core-properties" Target="docProps/core.xml"/>'
+    f'<Relationship Id="rId3" Type="{_REL_NS}/extended-properties" Target="docProps/app.xml"/>'
+    '</Relationships>')
+
+_WORKBOOK_RELS = (
+    _XML_DECLARATION +
+    f'<Relationships xmlns="{_PACKAGE_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{_REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{_REL_NS}/styles" Target="styles.xml"/>'
+    f'<Relationship Id="rId3" Type="{_REL_NS}/sharedStrings" Target="sharedStrings.xml"/>'
+    '</Relationships>')
+
+_WORKBOOK = (
+    _XML_DECLARATION +
+    f'<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+    '<fileVersion appName="xl" lastEdited="4" lowestEdited="4" rupBuild="4505"/>'
+    '<workbookPr defaultThemeVersion="124226"/>'
+    '<bookViews><workbookView xWindow="240" yWindow="15" windowWidth="16095" windowHeight="9660"/></bookViews>'
+    '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+    '<calcPr calcId="124519" fullCalcOnLoad="1"/>'
+    '</workbook>')
+
+_STYLES = (
+    _XML_DECLARATION +
+    f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="1"><font><sz val="11"/><color rgb="FF000000"/><name val="Calibri"/><family val="2"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '<dxfs count="0"/><tableStyles count="0" defaultTableStyle="TableStyleMedium9" defaultPivotStyle="PivotStyleLight16"/>'
+    '</styleSheet>')
+
+_APP = (
+    _XML_DECLARATION +
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties" '
+    'xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes">'
+    '<Application>Microsoft Excel</Application><DocSecurity>0</DocSecurity><ScaleCrop>false</ScaleCrop>'
+    '<HeadingPairs><vt:vector size="2" baseType="variant"><vt:variant><vt:lpstr>Worksheets</vt:lpstr></vt:variant>'
+    '<vt:variant><vt:i4>1</vt:i4></vt:variant></vt:vector></HeadingPairs>'
+    '<TitlesOfParts><vt:vector size="1" baseType="lpstr"><vt:lpstr>Sheet1</vt:lpstr></vt:vector></TitlesOfParts>'
+    '<Company></Company><LinksUpToDate>false</LinksUpToDate><SharedDoc>false</SharedDoc>'
+    '<HyperlinksChanged>false</HyperlinksChanged><AppVersion>12.0000</AppVersion>'
+    '</Properties>')
+
+_CORE = (
+    _XML_DECLARATION +
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:dcmitype="http://purl.org/dc/dcmitype/" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:creator></dc:creator><cp:lastModifiedBy></cp:lastModifiedBy>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{0}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{0}</dcterms:modified>'
+    '</cp:coreProperties>')
+
+_SHEET_HEAD = (
+    _XML_DECLARATION +
+    f'<worksheet xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}"><dimension ref="{{0}}"/>'
+    '<sheetViews><sheetView tabSelected="1" workbookViewId="0"/></sheetViews>'
+    '<sheetFormatPr defaultRowHeight="15"/><sheetData>')
+
+_SHEET_TAIL = (
+    '</sheetData><pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" header="0.3" footer="0.3"/></worksheet>')
+
+# Zip entries are dated 1980-01-01 like xlsxwriter's, so identical programs give identical files
+_DOS_TIME = 0
+_DOS_DATE = (1 << 5) | 1
+
+
+def buildProgramRows(stickData, programNumber, author=None, quantity=1):
+    """Builds the rows of a BROBO program sheet, the same cells ``buildXFile`` writes.
+
+    :param list stickData: The Brobo cut data of one stick.
+    :param int programNumber: The program number.
+    :param str author: (Optional) The author of the solution.
+    :param int quantity: (Optional) How many sticks the program cuts.
+    :return: Rows of cell values, starting at A1
+    :rtype: list of lists
+    """
+    rows = [HEADER + [';Program Author: ' + author] if author else list(HEADER), ['Pno', programNumber]]
+    lineNum = 3
+    for measurement in stickData:
+        rows.append([0, lineNum - 2, measurement, quantity, 0 if lineNum == 3 else 1, 1])
+        lineNum += 1
+    rows.append([0, lineNum, 0, 0, 0, 1])
+    return rows
+
+
+def writeProgramFile(path, rows):
+    """Writes rows of cell values to an xlsx file the BROBO saw can read.
+
+    :param str path: The file path.
+    :param list rows: Rows of str, int or float cell values, starting at A1. None leaves a cell empty.
+    """
+    sheet, sharedStrings = _buildSheetParts(rows)
+    created = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    parts = _STATIC_HEAD + [
+        _deflatePart('xl/worksheets/sheet1.xml', sheet),
+        _STATIC_WORKBOOK,
+        _deflatePart('xl/sharedStrings.xml', sharedStrings),
+        _STATIC_STYLES,
+        _deflatePart('docProps/core.xml', _CORE.format(created)),
+        _STATIC_APP,
+    ]
+    with open(path, 'wb') as file:
+        file.write(_buildZip(parts))
+
+
+############ Private Functions ############
+
+def _buildSheetParts(rows):
+    strings = {}
+    stringCount = 0
+    maxCol = max(len(row) for row in rows)
+    out = []
+    for rowIdx, row in enumerate(rows):
+        if rowIdx % 16 == 0:
+            block = rows[rowIdx:rowIdx + 16]
+            cols = [col for blockRow in block for col, value in enumerate(blockRow) if value is not None]
+            spans = f'{min(cols) + 1}:{max(cols) + 1}' if cols else None
+        cells = []
+        for col, value in enumerate(row):
+            if value is None:
+                continue
+            ref = _cellRef(rowIdx, col)
+            if isinstance(value, str):
+                index = strings.setdefault(value, len(strings))
+                stringCount += 1
+                cells.append(f'<c r="{ref}" t="s"><v>{index}</v></c>')
+            else:
+                cells.append(f'<c r="{ref}"><v>{value:.16G}</v></c>')
+        out.append(f'<row r="{rowIdx + 1}" spans="{spans}">' + ''.join(cells) + '</row>')
+    dimension = f'A1:{_cellRef(len(rows) - 1, maxCol - 1)}'
+    sheet = _SHEET_HEAD.format(dimension) + ''.join(out) + _SHEET_TAIL
+    sharedStrings = (
+        _XML_DECLARATION +
+        f'<sst xmlns="{_MAIN_NS}" count="{stringCount}" uniqueCount="{len(strings)}">' +
+        ''.join(_sharedString(string) for string in strings) + '</sst>')
+    return sheet, sharedStrings
+
+def _sharedString(string):
+    escaped = string.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    if string != string.strip():
+        return f'<si><t xml:space="preserve">{escaped}</t></si>'
+    return f'<si><t>{escaped}</t></si>'
+
+def _cellRef(row, col):
+    letters = ''
+    col += 1
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters + str(row + 1)
+
+def _deflatePart(name, text):
+    data = text.encode('utf-8')
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return name.encode('utf-8'), zlib.crc32(data), compressed, len(data)
+
+def _buildZip(parts):
+    body = []
+    directory = []
+    offset = 0
+    for name, crc, compressed, size in parts:
+        local = struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, 0, 8, _DOS_TIME, _DOS_DATE,
+                            crc, len(compressed), size, len(name), 0) + name
+        directory.append(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 20, 20, 0, 8, _DOS_TIME, _DOS_DATE,
+                                     crc, len(compressed), size, len(name), 0, 0, 0, 0, 0, offset) + name)
+        body.append(local)
+        body.append(compressed)
+        offset += len(local) + len(compressed)
+    directoryBytes = b''.join(directory)
+    end = struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(parts), len(parts), len(directoryBytes), offset, 0)
+    return b''.join(body) + directoryBytes + end
+
+_STATIC_HEAD = [
+    _deflatePart('[Content_Types].xml', _CONTENT_TYPES),
+    _deflatePart('_rels/.rels', _ROOT_RELS),
+    _deflatePart('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS),
+]
+_STATIC_WORKBOOK = _deflatePart('xl/workbook.xml', _WORKBOOK)
+_STATIC_STYLES = _deflatePart('xl/styles.xml', _STYLES)
+_STATIC_APP = _deflatePart('docProps/app.xml', _APP)
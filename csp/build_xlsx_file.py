@@ -1,6 +1,13 @@
-import xlsxwriter
+import logging
 import os
 import re
+import threading
+from brobo_xlsx_writer import buildProgramRows, writeProgramFile
+
+logger = logging.getLogger(__name__)
+
+# Folder inside each job number directory holding one NNN.lock marker per three digit prefix handed out
+PREFIX_LOCK_DIR = '.prefixes'
 
 class buildXFile:
     """
@@ -11,32 +18,59 @@ class buildXFile:
     :ivar int jobNum: The job number.
     :ivar str savePath: The save path.
     :ivar str fileName: (Optional) The file name.
+    :ivar int quantity: (Optional) How many sticks the program cuts, written to the quantity column of every cut.
     :ivar str author: The author of the solution.
+    :ivar str writer: (Optional) 'xlsxwriter' to build the file with xlsxwriter, or 'direct' for the lightweight writer.
+    :ivar float stockLength: (Optional) The stock length in inches, added to generated file names when a job is cut from several stock lengths.
+
+    Pass the same :class:`JobDirectory` to every file of a job so the directory is only scanned once.
 
     Dependencies:
         - xlsxwriter
         - os
         - re
     """
-    def __init__(self, stickData, programNumber,  jobNumber, dirPath,  fileName = None):
+    def __init__(self, stickData, programNumber,  jobNumber, dirPath,  fileName = None, quantity = 1, jobDirectory = None, writer = 'xlsxwriter', stockLength = None):
         self.stickData = stickData
         self.savePath = dirPath
         self.jobNum = jobNumber
         self.programNumber = programNumber
+        self.quantity = quantity
+        self.writer = writer
+        self.stockLength = stockLength
         self.author = 'Auto Generated'
         self.fileName = fileName
-        self._checkValidSaveLocation()
-        self.workbook = xlsxwriter.Workbook(self.savePath + self.fileName)
-        self.worksheet = self.workbook.add_worksheet()
+        self._checkValidSaveLocation(jobDirectory)
 
     def buildSheet(self):
         """This method fully builds the Excel file.
+        The workbook is only created here, so a constructed buildXFile can be sent to a worker process to be written.
+        xlsxwriter is imported on first use, so workers using the direct writer never load it.
+        The file is written under a temporary name and then moved onto the claimed name, so a failed write never
+        leaves an empty program behind; the claimed placeholder is removed when the write fails.
         """                
-        self._buildHeader()
-        self._buildAuthor()
-        self._buildProgramNumber()
-        self._buildCuts()
-        self._saveFile()
+        path = self.savePath + self.fileName
+        temp = f"{path}.{os.getpid()}.tmp"
+        try:
+            if self.writer == 'direct':
+                writeProgramFile(temp, buildProgramRows(self.stickData, self.programNumber, self.author, self.quantity))
+            else:
+                import xlsxwriter
+                self.workbook = xlsxwriter.Workbook(temp)
+                self.worksheet = self.workbook.add_worksheet()
+                self._buildHeader()
+                self._buildAuthor()
+                self._buildProgramNumber()
+                self._buildCuts()
+                self._saveFile()
+            os.replace(temp, path)
+        except BaseException:
+            for leftover in (temp, path):
+                try:
+                    os.remove(leftover)
+                except OSError:
+                    pass
+            raise
 
     def setAuthor(self, author):
         """Used to set the author of the solution.
@@ -88,6 +122,7 @@ class buildXFile:
     def _buildCuts(self):
         """
         Builds the cuts in the worksheet based on the stickData.
+        The quantity column of every cut holds the number of sticks the program is run for.
 
         Args:
             self: The current instance of the class.
@@ -97,7 +132,7 @@ class buildXFile:
             self.worksheet.write('A' + str(tempLineNum), 0)
             self.worksheet.write('B' + str(tempLineNum), tempLineNum - 2)
             self.worksheet.write('C' + str(tempLineNum), measurement)
-            self.worksheet.write('D' + str(tempLineNum), 1)
+            self.worksheet.write('D' + str(tempLineNum), self.quantity)
             modeVal = 0 if tempLineNum == 3 else 1
             self.worksheet.write('E' + str(tempLineNum), modeVal)
             self.worksheet.write('F' + str(tempLineNum), 1)
@@ -126,98 +161,201 @@ class buildXFile:
         self.worksheet.write('F' + str(lineNum), 1)
 
 
-    def _checkValidSaveLocation(self):
+    def _checkValidSaveLocation(self, jobDirectory):
         """
         Checks if the save location is valid and performs necessary actions.
 
-        This method first builds the job number path using the `_buildJobNumPath` method.
+        This method uses the given job directory, or scans the job number directory if none is given.
         If the `fileName` attribute is empty, it automatically generates a file name using the `_autoGenerateFileName` method.
         Otherwise, it processes the file name using the `_processFileName` method.
-        Finally, it checks if a file with the same name already exists in the save path. If it does, it generates a new file name.
 
         Args:
             self: The current instance of the class.
+            jobDirectory (JobDirectory): The job directory to allocate the file name from, or None.
         """
-        self._buildJobNumPath()
+        if jobDirectory is None:
+            jobDirectory = JobDirectory(self.savePath, self.jobNum)
+        self.savePath = jobDirectory.getSavePath()
 
         if not self.fileName:
-            self._autoGenerateFileName()
+            self._autoGenerateFileName(jobDirectory)
         else:
-            self._processFileName()
-            if os.path.exists(self.savePath + self.fileName):   #Only gets triggered in rare cases due to the _processFileName method doing initial checks (May be removed in the future)
-                print("File already exists.")
-                self._autoGenerateFileName()
-            
-    def _buildJobNumPath(self):
-        """
-        Creates a directory path based on the job number and saves it to the `savePath` attribute.
-
-        If the directory path does not exist, it will be created using the `savePath` and `jobNum` attributes.
-        The `savePath` attribute will be updated to include the job number directory.
-
-        Args:
-            self: The current instance of the class.
-        """
-        if not os.path.exists(self.savePath + '/' + str(self.jobNum)):
-            os.makedirs(self.savePath + '/' + str(self.jobNum))
-        self.savePath = self.savePath + '/' + str(self.jobNum) + '/'
+            self._processFileName(jobDirectory)
     
-    def _processFileName(self):
+    def _processFileName(self, jobDirectory):
         """
         Process the file name by first checking if the name contains invalid characters. If it does it will automatically generate a new file name.
-        If the file name does not start with three digits, it will automatically add a three digit number to the beginning of the file name.
         If the file name does not end with '.xlsx', it will automatically add '.xlsx' to the end of the file name.
+        If the file name does not start with three digits, it will automatically add the next free three digit number to the beginning of the file name.
+        If a file with the same name already exists, it will automatically generate a new file name.
 
         Args:
             self: The current instance of the class.
+            jobDirectory (JobDirectory): The job directory to allocate the file name from.
         """
         if re.search(r'[\\/*?:"<>|]', self.fileName):
-                print("Invalid characters in file name.")
-                self._autoGenerateFileName()
+                logger.warning("Invalid characters in file name.")
+                self._autoGenerateFileName(jobDirectory)
                 return
-        
-        if not re.match(r'^\d{3}', self.fileName):
-            print("Filename does not start with three digits.")
-            files = [f for f in os.listdir(self.savePath) if f.endswith('.xlsx')]
-
-            while True:
-                count = len(files) + 1
-                count_str = str(count).zfill(3)
-                fileName = count_str + '-' + self.fileName
-                if not os.path.exists(self.savePath + fileName):
-                    break
-                count += 1
-            self.fileName = fileName
 
         if not self.fileName.lower().endswith('.xlsx'):
             self.fileName += '.xlsx'
 
-    def _autoGenerateFileName(self):
+        if not re.match(r'^\d{3}', self.fileName):
+            logger.info("Filename does not start with three digits.")
+            self.fileName = jobDirectory.allocate('-' + self.fileName)
+        elif not jobDirectory.reserve(self.fileName):
+            logger.warning("File already exists.")
+            self._autoGenerateFileName(jobDirectory)
+
+    def _autoGenerateFileName(self, jobDirectory):
         """
         Auto-generates a unique file name for the Excel file based on the program number and the number of stick data parts.
 
         Args:
             self: The current instance of the class.
+            jobDirectory (JobDirectory): The job directory to allocate the file name from.
+        """
+        logger.debug("Auto Generating File Name........................")
+        self.fileName = jobDirectory.allocate('-Program_Num_'+ str(self.programNumber) +'_'+ str(len(self.stickData)) + '_parts' + self._quantitySuffix() + self._stockSuffix() + '.xlsx')
+        logger.debug("File Name: %s", self.fileName)
+
+    def _quantitySuffix(self):
         """
-        print("Auto Generating File Name........................")
-        
-        count = 0
-        highest_number = 0
+        Returns the '_xN' file name suffix for programs that cut more than one stick.
+
+        Args:
+            self: The current instance of the class.
+        """
+        return '_x' + str(self.quantity) if self.quantity > 1 else ''
+
+    def _stockSuffix(self):
+        """
+        Returns the '_on_Nin' file name suffix naming the stock length to load, for jobs cut from several stock lengths.
+
+        Args:
+            self: The current instance of the class.
+        """
+        return f'_on_{self.stockLength:g}in' if self.stockLength is not None else ''
+
+
+class JobDirectory:
+    """
+    A class used to hand out unique file names in a job number directory.
+
+    The directory is created and scanned once. After that the used three digit prefixes are kept in memory and the
+    next free prefix is handed out in O(1). Every prefix is claimed by creating its NNN.lock marker in the
+    PREFIX_LOCK_DIR folder exclusively, and every name by creating the file exclusively, so writers in other threads,
+    processes or on other machines sharing the directory never receive the same prefix, even for different suffixes.
+    Markers are kept, so a prefix is not handed out again after its file is deleted.
+
+    :ivar str savePath: The job number directory, ending with '/'.
+    :ivar str lockPath: The folder of prefix lock markers, ending with '/'.
+    :ivar set usedPrefixes: The three digit prefixes already in use.
+    :ivar int nextPrefix: The next prefix to try.
+
+    Dependencies:
+        - os
+        - re
+        - threading
+    """
+    def __init__(self, dirPath, jobNumber):
+        self.savePath = dirPath + '/' + str(jobNumber) + '/'
+        self.lockPath = self.savePath + PREFIX_LOCK_DIR + '/'
+        os.makedirs(self.lockPath, exist_ok=True)
+        self._lock = threading.Lock()
+        self.usedPrefixes = set()
+
         files = [f for f in os.listdir(self.savePath) if f.endswith('.xlsx')]
-        for file in files:
+        for file in files + os.listdir(self.lockPath):
             match = re.match(r'^(\d{3})', file)
             if match:
-                number = int(match.group(1))
-                if number > highest_number:
-                    highest_number = number
-
-        count = highest_number + 1 if highest_number > len(files) else len(files) + 1
-
-        while True:
-            count_str = str(count).zfill(3)
-            file_name = count_str + '-Program_Num_'+ str(self.programNumber) +'_'+ str(len(self.stickData)) + '_parts.xlsx'
-            print(f"File Name: {file_name}")
-            if not os.path.exists(self.savePath + file_name):
-                break
-            count += 1
-        self.fileName = file_name
\ No newline at end of file
+                self.usedPrefixes.add(int(match.group(1)))
+        highest_number = max(self.usedPrefixes, default=0)
+        self.nextPrefix = highest_number + 1 if highest_number > len(files) else len(files) + 1
+
+    def getSavePath(self):
+        """Get the job number directory.
+
+        :return: Save Path
+        :rtype: String
+        """
+        return self.savePath
+
+    def allocate(self, suffix):
+        """Claims the next free three digit prefix and returns the file name made from it and the suffix.
+
+        :param suffix: The rest of the file name, including the extension.
+        :type suffix: String
+        :return: File Name
+        :rtype: String
+        """
+        with self._lock:
+            while True:
+                prefix = self.nextPrefix
+                self.nextPrefix += 1
+                if prefix in self.usedPrefixes:
+                    continue
+                self.usedPrefixes.add(prefix)
+                if not self._claimPrefix(prefix):
+                    continue
+                fileName = str(prefix).zfill(3) + suffix
+                if self._claim(fileName):
+                    return fileName
+
+    def reserve(self, fileName):
+        """Claims a specific file name.
+
+        :param fileName: The file name.
+        :type fileName: String
+        :return: True if the name was free and is now reserved
+        :rtype: bool
+        """
+        with self._lock:
+            if not self._claim(fileName):
+                return False
+            match = re.match(r'^(\d{3})', fileName)
+            if match:
+                # The caller chose this prefix, so it is marked as used whether or not another writer holds it
+                prefix = int(match.group(1))
+                self.usedPrefixes.add(prefix)
+                os.close(os.open(self._prefixLock(prefix), os.O_CREAT | os.O_WRONLY))
+            return True
+
+    def _claim(self, fileName):
+        """
+        Creates an empty placeholder file, failing if the file already exists.
+
+        Args:
+            self: The current instance of the class.
+            fileName (str): The file name.
+        """
+        try:
+            os.close(os.open(self.savePath + fileName, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def _claimPrefix(self, prefix):
+        """
+        Creates the lock marker of a three digit prefix, failing if another writer already claimed it.
+
+        Args:
+            self: The current instance of the class.
+            prefix (int): The prefix.
+        """
+        try:
+            os.close(os.open(self._prefixLock(prefix), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def _prefixLock(self, prefix):
+        """
+        Returns the path of the lock marker of a three digit prefix.
+
+        Args:
+            self: The current instance of the class.
+            prefix (int): The prefix.
+        """
+        return self.lockPath + str(prefix).zfill(3) + '.lock'
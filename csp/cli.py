@@ -0,0 +1,320 @@
+"""Headless command line entry point for solving cut lists and writing BROBO programs in bulk.
+
+Each job file (CSV, text, xlsx or JSON, see :mod:`job_io`) is solved with :class:`CuttingParameters` and its
+programs are written with :func:`buildBroboProgram`, without importing tkinter. Jobs run in parallel worker
+processes with ``--jobs``. A JSON summary of every job is written to stdout (or ``--summary``) and log messages go
+to stderr, so the output can be piped straight into other tools.
+
+Usage:
+    python csp/cli.py JOB [JOB ...] --stock-length 288 --blade-width 0.125 [--dead-zone 6] [--out-dir DIR]
+                      [--stock 240:12 --stock 288 ...]
+                      [--solver {OR-Tools,ALNS,Greedy,Auto,Exact}] [--jobs N] [--time-limit SECONDS] [--budget SECONDS] ...
+
+With ``--server URL`` the jobs are read here but solved on a solver service (see :mod:`solver_service`), and
+their program files are written on the server. ``--stock`` cuts every job from several stock lengths in one solve,
+``--remnants FILE`` cuts from the offcuts in a remnant inventory before opening new stock, and ``--catalog FILE``
+solves recurring stock and length sets exactly over every maximal pattern kept in a pattern catalog. ``--consolidate``
+solves small jobs that share stock, blade width and dead zone together and splits the sticks back per job.
+
+Directories are expanded to the job files they contain. The exit status is 0 when every job succeeded, 1 when a
+job failed or was skipped because the budget ran out, and 2 for invalid arguments.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from job_io import buildCuttingParameters, findJobFiles, readJob, summarizeSolution
+
+logger = logging.getLogger(__name__)
+
+
+def runJob(path, defaults, buildPrograms=True):
+    """Reads, solves and writes the programs of one job file. Runs in a worker process when jobs run in parallel.
+
+    :param str path: Job file.
+    :param dict defaults: Settings used when the job file does not set them.
+    :param bool buildPrograms: (Optional) Write the BROBO program files. Defaults to True.
+    :return: Summary of the job
+    :rtype: dict
+    """
+    start = time.perf_counter()
+    summary = {"file": path, "status": "ok"}
+    try:
+        job = readJob(path, defaults)
+        summary.update(name=job["name"], jobNumber=job["jobNumber"], solver=job["solver"])
+        cutParams = buildCuttingParameters(job)
+        cutParams.solve()
+        summary.update(summarizeSolution(cutParams))
+        if buildPrograms:
+            from brobo_preprocessor import buildBroboProgram
+            summary["programs"] = buildBroboProgram(cutParams)
+        summary["metrics"] = cutParams.getMetrics().toDict()
+    except (ValueError, OSError) as error:
+        logger.error("%s: %s", path, error)
+        summary.update(status="error", error=str(error))
+    except Exception as error:
+        # Any other failure is a bug, but it must only cost this job, not the summaries of the whole batch
+        logger.exception("%s: unexpected error", path)
+        summary.update(status="error", error=f"{type(error).__name__}: {error}")
+    summary["elapsed"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def runJobs(paths, defaults, buildPrograms=True, jobs=1, budget=None):
+    """Runs every job file, up to ``jobs`` at a time, and collects their summaries in input order.
+
+    :param list paths: Job files.
+    :param dict defaults: Settings used when a job file does not set them.
+    :param bool buildPrograms: (Optional) Write the BROBO program files. Defaults to True.
+    :param int jobs: (Optional) Number of jobs solved in parallel. Defaults to 1.
+    :param float budget: (Optional) Seconds after which no new job is started; the rest are reported as skipped.
+    :return: Job summaries
+    :rtype: list of dict
+    """
+    deadline = None if budget is None else time.perf_counter() + budget
+    summaries = {}
+    pending = list(reversed(paths))
+
+    def outOfTime():
+        return deadline is not None and time.perf_counter() >= deadline
+
+    if jobs <= 1:
+        while pending and not outOfTime():
+            path = pending.pop()
+            summaries[path] = _logged(runJob(path, defaults, buildPrograms))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            running = {}
+            while pending or running:
+                while pending and len(running) < jobs and not outOfTime():
+                    path = pending.pop()
+                    running[pool.submit(runJob, path, defaults, buildPrograms)] = path
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = running.pop(future)
+                    try:
+                        summaries[path] = _logged(future.result())
+                    except Exception as error:
+                        # The worker process died or the summary could not be sent back
+                        logger.error("%s: %s", path, error)
+                        summaries[path] = {"file": path, "status": "error", "error": f"{type(error).__name__}: {error}"}
+    for path in pending:
+        summaries[path] = {"file": path, "status": "skipped", "error": "Time budget exhausted"}
+    return [summaries[path] for path in paths]
+
+
+def runRemoteJobs(paths, defaults, server, buildPrograms=True, timeout=None):
+    """Reads every job file locally and solves them on a solver service, see :mod:`solver_service`.
+
+    Program files stay on the server; their names are listed in each summary under ``files``.
+
+    :param list paths: Job files.
+    :param dict defaults: Settings used when a job file does not set them.
+    :param str server: Solver service URL.
+    :param bool buildPrograms: (Optional) Write the BROBO program files on the server. Defaults to True.
+    :param float timeout: (Optional) Seconds to wait for each job.
+    :return: Job summaries
+    :rtype: list of dict
+    """
+    from solver_service import ServiceClient
+
+    client = ServiceClient(server)
+    submitted = []
+    for path in paths:
+        summary = {"file": path, "status": "ok"}
+        try:
+            job = readJob(path, defaults)
+            summary.update(name=job["name"], jobNumber=job["jobNumber"], solver=job["solver"])
+            settings = {key: value for key, value in job.items() if key not in ("name", "path", "dirPath", "workers")}
+            settings.update(cuts=[list(cut) for cut in job["cuts"]], buildPrograms=buildPrograms)
+            summary["id"] = client.submit(settings)["id"]
+        except (ValueError, OSError) as error:
+            logger.error("%s: %s", path, error)
+            summary.update(status="error", error=str(error))
+        submitted.append(summary)
+    for summary in submitted:
+        if summary["status"] != "ok":
+            continue
+        try:
+            status = client.wait(summary["id"], timeout=timeout)
+        except (ValueError, OSError) as error:
+            status = {"status": "error", "error": str(error)}
+        if status["status"] == "done":
+            result = status["result"]
+            result.pop("programs", None)
+            summary.update(result, elapsed=round(status["finished"] - status["submitted"], 3))
+            _logged(summary)
+        else:
+            summary.update(status="error", error=status.get("error") or f"Job {status['status']}")
+            logger.error("%s: %s", summary["file"], summary["error"])
+    return submitted
+
+
+def runConsolidated(paths, defaults, buildPrograms=True, allowMixed=True):
+    """Reads every job file and solves the jobs sharing stock, blade width, dead zone and solver as one.
+
+    Each group is solved with :class:`JobConsolidator`, and every job still gets its own programs. A job's summary
+    counts the sticks it received that also hold cuts of other jobs under ``shared``.
+
+    :param list paths: Job files.
+    :param dict defaults: Settings used when a job file does not set them.
+    :param bool buildPrograms: (Optional) Write the BROBO program files. Defaults to True.
+    :param bool allowMixed: (Optional) Whether a stick may hold cuts of more than one job. Defaults to True.
+    :return: Job summaries
+    :rtype: list of dict
+    """
+    from consolidation import JobConsolidator, consolidationKey
+
+    summaries = {}
+    groups = {}
+    for path in paths:
+        summary = {"file": path, "status": "ok"}
+        try:
+            job = readJob(path, defaults)
+            summary.update(name=job["name"], jobNumber=job["jobNumber"], solver=job["solver"])
+            cutParams = buildCuttingParameters(job)
+            groups.setdefault(consolidationKey(cutParams), []).append((path, cutParams))
+        except (ValueError, OSError) as error:
+            logger.error("%s: %s", path, error)
+            summary.update(status="error", error=str(error))
+        summaries[path] = summary
+
+    for group in groups.values():
+        start = time.perf_counter()
+        consolidator = JobConsolidator([cutParams for _, cutParams in group], allowMixed)
+        try:
+            consolidator.solve()
+            programs = consolidator.buildPrograms() if buildPrograms else [None] * len(group)
+        except (ValueError, OSError) as error:
+            for path, _ in group:
+                logger.error("%s: %s", path, error)
+                summaries[path].update(status="error", error=str(error))
+            continue
+        elapsed = round(time.perf_counter() - start, 3)
+        for (path, cutParams), jobPrograms in zip(group, programs):
+            summary = summaries[path]
+            summary.update(summarizeSolution(cutParams), group=[p for p, _ in group], elapsed=elapsed)
+            summary["shared"] = sum(stick["count"] for stick in consolidator.getShared()
+                                    if cutParams.getJobNumber() in stick["jobs"])
+            if jobPrograms is not None:
+                summary["programs"] = jobPrograms
+            _logged(summary)
+    return [summaries[path] for path in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve cut lists and write BROBO programs without the GUI.")
+    parser.add_argument("paths", nargs="+", metavar="JOB", help="job files (csv, txt, xlsx, json) or directories")
+    parser.add_argument("--out-dir", default=".", help="directory the job number folders are created in")
+    parser.add_argument("--stock-length", type=float, help="stock length in inches")
+    parser.add_argument("--blade-width", type=float, help="blade width in inches")
+    parser.add_argument("--dead-zone", type=float, help="dead zone in inches")
+    parser.add_argument("--stock", action="append", type=_stockArg, metavar="LENGTH[:AVAILABLE[:COST]]",
+                        help="a stock length on the rack; repeat to cut from several lengths in one solve")
+    parser.add_argument("--remnants", help="remnant inventory file the jobs cut from first and add offcuts to")
+    parser.add_argument("--min-remnant", type=float, help="shortest offcut kept as a remnant, in inches")
+    parser.add_argument("--catalog", help="pattern catalog file OR-Tools jobs take every maximal pattern from")
+    parser.add_argument("--solver", choices=["OR-Tools", "ALNS", "Greedy", "Auto", "Exact"],
+                        help="solver engine, Auto picks one from the cut list and Exact proves how far its answer "
+                             "is from optimal (default OR-Tools)")
+    parser.add_argument("--job-number", help="job number (default: the job file name)")
+    parser.add_argument("--author", help="program author")
+    parser.add_argument("--starting-program-number", type=int, help="first program number (default 1)")
+    parser.add_argument("--writer", choices=["xlsxwriter", "direct"], help="program file writer")
+    parser.add_argument("--no-group", action="store_true", help="write one program per stick instead of per pattern")
+    parser.add_argument("--workers", type=int, help="processes writing the program files of each job")
+    parser.add_argument("--time-limit", type=float, help="seconds each solve may run")
+    parser.add_argument("--budget", type=float, help="seconds after which no new job is started")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="jobs solved in parallel")
+    parser.add_argument("--no-programs", action="store_true", help="only solve, do not write program files")
+    parser.add_argument("--consolidate", action="store_true",
+                        help="solve jobs sharing stock, blade width and dead zone as one")
+    parser.add_argument("--no-mixed", action="store_true",
+                        help="with --consolidate, never cut parts of two jobs from one stick")
+    parser.add_argument("--summary", help="write the JSON summary to this file instead of stdout")
+    parser.add_argument("--server", help="solve on a solver service at this URL, e.g. http://shop-server:8765")
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="log more (-vv for debug)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=[logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)],
+                        format="%(levelname)s %(name)s: %(message)s", stream=sys.stderr)
+
+    paths = findJobFiles(args.paths)
+    if not paths:
+        parser.error("no job files found")
+    defaults = {
+        "dirPath": args.out_dir,
+        "stockLength": args.stock_length,
+        "bladeWidth": args.blade_width,
+        "deadZone": args.dead_zone,
+        "solver": args.solver,
+        "jobNumber": args.job_number,
+        "author": args.author,
+        "startingProgramNumber": args.starting_program_number,
+        "writer": args.writer,
+        "groupPatterns": False if args.no_group else None,
+        # Parallel jobs already keep every CPU busy, so each writes its files in its own process
+        "workers": args.workers if args.workers is not None or args.jobs <= 1 else 1,
+        "timeLimit": args.time_limit,
+        "stocks": args.stock,
+        "remnantFile": args.remnants,
+        "minRemnant": args.min_remnant,
+        "catalogFile": args.catalog,
+    }
+    if args.remnants and args.jobs > 1:
+        # Every job updates the inventory the next one cuts from
+        logger.warning("--remnants solves one job at a time")
+        args.jobs = 1
+
+    start = time.perf_counter()
+    if args.consolidate:
+        summaries = runConsolidated(paths, defaults, not args.no_programs, not args.no_mixed)
+    elif args.server:
+        summaries = runRemoteJobs(paths, defaults, args.server, not args.no_programs, args.budget)
+    else:
+        summaries = runJobs(paths, defaults, not args.no_programs, args.jobs, args.budget)
+    report = {
+        "jobs": summaries,
+        "ok": sum(summary["status"] == "ok" for summary in summaries),
+        "failed": sum(summary["status"] == "error" for summary in summaries),
+        "skipped": sum(summary["status"] == "skipped" for summary in summaries),
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
+    text = json.dumps(report, indent=2)
+    if args.summary:
+        with open(args.summary, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 0 if report["ok"] == len(summaries) else 1
+
+
+############ Private Functions ############
+
+def _stockArg(text):
+    fields = text.split(":")
+    if len(fields) > 3:
+        raise argparse.ArgumentTypeError(f"invalid stock: {text}")
+    try:
+        length = float(fields[0])
+        available = int(fields[1]) if len(fields) > 1 and fields[1] else None
+        cost = float(fields[2]) if len(fields) > 2 and fields[2] else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid stock: {text}")
+    return [length, available, cost]
+
+
+def _logged(summary):
+    if summary["status"] == "ok":
+        logger.info("%s: %s sticks in %.2fs", summary["file"], summary["sticks"], summary["elapsed"])
+    return summary
+
+
+if __name__ == "__main__":
+    sys.exit(main())
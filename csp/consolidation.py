@@ -0,0 +1,175 @@
+import logging
+from collections import Counter
+
+from cut_solution import CutSolution
+from solver_handler import CuttingParameters
+from units import fromThou, toThou
+
+logger = logging.getLogger(__name__)
+
+
+class JobConsolidator:
+    """A class used to solve several small jobs cut from the same stock as one, and split the sticks back per job.
+
+    The cut lists are merged into one combined job, solved once with the settings of the first job, and every stick
+    is then given to one job. A stick whose cuts one job still needs entirely goes to that job. Otherwise, when mixed
+    sticks are allowed, its cuts are handed out in job order and the stick goes to the job with the most length on
+    it; its program is written with that job's programs and listed by :meth:`getShared`. Cuts no job needs any more
+    stay with the stick's job.
+
+    When mixed sticks are not allowed no stick can be shared, so the combined problem falls apart into one problem
+    per job and each job is solved on its own, which gives the same result as the combined solve.
+
+    :ivar list jobs: The jobs, as CuttingParameters with the same stock, blade width and dead zone.
+    :ivar bool allowMixed: Whether a stick may hold cuts of more than one job.
+    :ivar CuttingParameters combined: The combined job, once solved with mixed sticks allowed.
+    :ivar list shared: The mixed sticks, see :meth:`getShared`.
+    """
+    def __init__(self, jobs, allowMixed=True):
+        """
+        :param list jobs: The jobs to consolidate.
+        :param bool allowMixed: (Optional) Whether a stick may hold cuts of more than one job. Defaults to True.
+        :raises ValueError: If there are no jobs or they do not share stock, blade width and dead zone.
+        """
+        if not jobs:
+            raise ValueError("No jobs to consolidate")
+        keys = {consolidationKey(job) for job in jobs}
+        if len(keys) > 1:
+            raise ValueError("Consolidated jobs must share stock, blade width, dead zone and solver")
+        self.jobs = list(jobs)
+        self.allowMixed = allowMixed
+        self.combined = None
+        self.shared = []
+
+    def solve(self, progress=None, cancel=None):
+        """Solves the jobs and sets the solution of each one, ready for ``buildBroboProgram``.
+
+        :param callable progress: (Optional) Progress callback of the combined solve.
+        :param threading.Event cancel: (Optional) Stops the combined solve early when set.
+        :raises ValueError: If invalid numeric values are entered or the solver is unknown.
+        """
+        if not self.allowMixed:
+            for job in self.jobs:
+                job.solve(progress, cancel)
+            return
+        self.combined = combineJobs(self.jobs)
+        self.combined.solve(progress, cancel)
+        self.shared = self._split(self.combined.getSolution())
+
+    def getShared(self):
+        """Get the sticks holding cuts of more than one job.
+
+        :return: One dict per mixed pattern with ``owner`` (the job number whose programs cut it), ``count`` (the
+            number of sticks), ``lengths`` (the cut lengths in inches) and ``jobs`` (job number to the cut lengths
+            in inches that job receives from each stick)
+        :rtype: list of dict
+        """
+        return self.shared
+
+    def getCombined(self):
+        """Get the combined job, whose metrics cover the combined solve.
+
+        :return: Combined job, or None before solving or when mixed sticks are not allowed
+        :rtype: CuttingParameters
+        """
+        return self.combined
+
+    def buildPrograms(self):
+        """Writes the programs of every job to its own directory, numbered from its own starting program number.
+
+        :return: The program file paths of each job, in job order
+        :rtype: list of list
+        """
+        from brobo_preprocessor import buildBroboProgram
+        return [buildBroboProgram(job) for job in self.jobs]
+
+    def _split(self, solution):
+        remaining = [_demand(job) for job in self.jobs]
+        wanted = sum(remaining, Counter())
+        sticks = [[] for _ in self.jobs]
+        stocks = [[] for _ in self.jobs]
+        shared = {}
+        for idx, (pattern, count) in enumerate(solution.patterns()):
+            stock = solution.stockLength(idx)
+            cuts = Counter(pattern)
+            for _ in range(count):
+                needed = Counter({length: min(quantity, wanted[length]) for length, quantity in cuts.items()})
+                owner = next((j for j, demand in enumerate(remaining) if not needed - demand), None)
+                if owner is not None:
+                    received = {owner: list(needed.elements())}
+                else:
+                    received = _handOut(needed, remaining)
+                    owner = max(received, key=lambda j: (sum(received[j]), -j))
+                for j, lengths in received.items():
+                    remaining[j] -= Counter(lengths)
+                wanted -= needed
+                sticks[owner].append(pattern)
+                stocks[owner].append(stock)
+                if len(received) > 1:
+                    key = (owner, pattern, tuple((j, tuple(sorted(lengths, reverse=True))) for j, lengths in sorted(received.items())))
+                    shared[key] = shared.get(key, 0) + 1
+
+        mixedStock = solution.hasMixedStock()
+        for job, jobSticks, jobStocks in zip(self.jobs, sticks, stocks):
+            job.setSolution(CutSolution.fromSticks(jobSticks, solution.stock_length, jobStocks if mixedStock else None))
+        if shared:
+            logger.info("%d of %d sticks hold cuts of more than one job", sum(shared.values()), len(solution))
+        return [{
+            "owner": self.jobs[owner].getJobNumber(),
+            "count": count,
+            "lengths": [fromThou(length) for length in pattern],
+            "jobs": {self.jobs[j].getJobNumber(): [fromThou(length) for length in lengths] for j, lengths in received},
+        } for (owner, pattern, received), count in shared.items()]
+
+
+def consolidationKey(job):
+    """Get what jobs must share to be consolidated: stock, blade width, dead zone and solver.
+
+    :param CuttingParameters job: Job.
+    :return: Hashable key
+    :rtype: tuple
+    """
+    stocks = tuple(job.getStocks()) if job.getStocks() is not None else None
+    return (toThou(job.getStockLength()), stocks, toThou(job.getBladeWidth()), toThou(job.dead_zone), job.getSolver())
+
+
+def combineJobs(jobs):
+    """Merges the cut lists of several jobs into one job with the settings of the first.
+
+    :param list jobs: The jobs, as CuttingParameters.
+    :return: Combined job
+    :rtype: CuttingParameters
+    """
+    first = jobs[0]
+    total = sum((_demand(job) for job in jobs), Counter())
+    lengths = {}
+    for job in jobs:
+        for length in job.cut_lengths:
+            lengths.setdefault(toThou(length), length)
+    combined = CuttingParameters(first.getStockLength(), first.getBladeWidth(), first.dead_zone,
+                                 [lengths[length] for length in total], list(total.values()))
+    combined.setSolver(first.getSolver())
+    combined.setTimeLimit(first.getTimeLimit())
+    combined.setStocks(first.getStocks())
+    combined.setRemnants(first.getRemnants())
+    return combined
+
+
+############ Private Functions ############
+
+def _demand(job):
+    demand = Counter()
+    for length, quantity in zip(job.cut_lengths, job.cut_quantities):
+        demand[toThou(length)] += int(quantity)
+    return demand
+
+
+def _handOut(needed, remaining):
+    # Each cut goes to the first job still needing its length
+    received = {}
+    left = [Counter(demand) for demand in remaining]
+    for length in sorted(needed.elements(), reverse=True):
+        j = next(j for j, demand in enumerate(left) if demand[length] > 0)
+        left[j][length] -= 1
+        received.setdefault(j, []).append(length)
+    return received
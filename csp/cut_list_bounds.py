@@ -0,0 +1,97 @@
+from math import ceil
+
+from greedy_cutter import firstFitDecreasing
+from units import toThou
+
+
+class CutListBounds:
+    """A class used to keep a running estimate of the number of sticks a cut list needs while it is being edited.
+
+    Lengths are converted to thousandths of an inch and padded with the blade kerf exactly like
+    ``CuttingParameters._solverPreProcess``, and the dead zone is taken off the stock length. Every edit updates the
+    quantity of its length and the running total length and number of cuts longer than half and a third of the stock
+    in O(1), so :meth:`lowerBound` is O(1) too. :meth:`upperBound` packs the whole list with first fit decreasing and
+    is cached until the next edit, so callers showing it while the list is edited should wait for a pause in the
+    edits before asking for it.
+
+    :ivar int stock_length: The usable stock length in thousandths of an inch.
+    :ivar int blade_width: The blade width in thousandths of an inch.
+    :ivar dict counts: The quantity of each distinct cut length in thousandths of an inch, including blade kerf.
+    """
+    def __init__(self, stock_length, blade_width, dead_zone):
+        self.stock_length = toThou(stock_length) - toThou(dead_zone)
+        self.blade_width = toThou(blade_width)
+        self.counts = {}
+        self.total_length = 0
+        self.over_half = 0
+        self.over_third = 0
+        self.too_long = 0
+        self._upper_bound = None
+
+    def add(self, length, quantity=1):
+        """Adds cuts to the running estimate.
+
+        :param int, float or str length: Cut length in inches.
+        :param int quantity: Number of cuts.
+        """
+        self._update(self._solverLength(length), quantity)
+
+    def remove(self, length, quantity=1):
+        """Removes cuts previously added with :meth:`add`.
+
+        :param int, float or str length: Cut length in inches.
+        :param int quantity: Number of cuts.
+        :raises ValueError: If fewer cuts of this length were added.
+        """
+        length = self._solverLength(length)
+        if self.counts.get(length, 0) < quantity:
+            raise ValueError(f"Cannot remove {quantity} cuts of length {length}")
+        self._update(length, -quantity)
+
+    def lowerBound(self):
+        """Get the minimum number of sticks needed for the current cut list.
+
+        This is the larger of the material bound (total length over stock length) and a bound from the long cuts:
+        no two cuts longer than half the stock share a stick, and a stick holds at most two cuts longer than a third.
+
+        :return: Lower bound on the stick count, or None if a cut is longer than the stock
+        :rtype: int
+        """
+        if self.too_long:
+            return None
+        material = ceil(self.total_length / self.stock_length) if self.stock_length > 0 else 0
+        thirds = max(0, self.over_third - self.over_half)
+        return max(material, self.over_half + ceil(max(0, thirds - self.over_half) / 2))
+
+    def upperBound(self):
+        """Get the number of sticks first fit decreasing uses for the current cut list.
+
+        :return: Upper bound on the stick count, or None if a cut is longer than the stock
+        :rtype: int
+        """
+        if self.too_long:
+            return None
+        if self._upper_bound is None:
+            demands = [[quantity, length] for length, quantity in self.counts.items()]
+            self._upper_bound = len(firstFitDecreasing(demands, self.stock_length))
+        return self._upper_bound
+
+    def _solverLength(self, length):
+        return toThou(length) + self.blade_width
+
+    def _update(self, length, quantity):
+        count = self.counts.get(length, 0) + quantity
+        if count == 0:
+            self.counts.pop(length, None)
+        else:
+            self.counts[length] = count
+        self.total_length += length * quantity
+        if length > self.stock_length:
+            self.too_long += quantity
+        elif 2 * length > self.stock_length:
+            self.over_half += quantity
+            self.over_third += quantity
+        elif 3 * length > self.stock_length:
+            self.over_third += quantity
+        self._upper_bound = None
+
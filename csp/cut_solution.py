@@ -0,0 +1,193 @@
+from array import array
+from itertools import repeat
+
+
+class CutSolution:
+    """An immutable solution to the stick packing problem, stored as a table of unique cutting patterns and the number
+    of sticks cut with each.
+
+    The cut lengths of all patterns are kept in one flat array, so a job that cuts the same pattern hundreds of times
+    stores it once. The array holds integers when every length is an integer (the thousandths of an inch the solvers
+    use) and floats otherwise. Iterating the solution expands it lazily into one list of cut lengths per stick, which keeps it a
+    drop-in replacement for the old list of sticks.
+
+    A job cut from more than one stock length also records the stock length of every pattern.
+
+    :ivar int or float stock_length: The stock length the patterns are cut from, or None if unknown. With more than
+        one stock length this is the longest one.
+    """
+    __slots__ = ('_lengths', '_offsets', '_counts', '_stocks', 'stock_length')
+
+    def __init__(self, patterns, counts, stock_length=None, stocks=None):
+        """
+        :param patterns: The cut lengths of each pattern.
+        :type patterns: iterable of iterables of int or float
+        :param counts: The number of sticks cut with each pattern.
+        :type counts: iterable of int
+        :param int or float stock_length: (Optional) The stock length.
+        :param stocks: (Optional) The stock length each pattern is cut from, when there is more than one.
+        :type stocks: iterable of int or float
+        """
+        lengths = []
+        patternStocks = []
+        self._offsets = array('l', [0])
+        self._counts = array('l')
+        self.stock_length = stock_length
+        for pattern, count, stock in zip(patterns, counts, stocks if stocks is not None else repeat(None)):
+            if count <= 0:
+                continue
+            lengths.extend(pattern)
+            patternStocks.append(stock)
+            self._offsets.append(len(lengths))
+            self._counts.append(count)
+        self._lengths = _numberArray(lengths)
+        self._stocks = None
+        if stocks is not None:
+            self._stocks = _numberArray(patternStocks)
+            if patternStocks and stock_length is None:
+                self.stock_length = max(patternStocks)
+
+    @classmethod
+    def fromSticks(cls, sticks, stock_length=None, stocks=None):
+        """Builds a solution from one list of cut lengths per stick, grouping sticks with the same cuts.
+
+        :param sticks: The cut lengths of each stick.
+        :type sticks: iterable of iterables of int or float
+        :param int or float stock_length: (Optional) The stock length.
+        :param stocks: (Optional) The stock length each stick is cut from, when there is more than one.
+        :type stocks: iterable of int or float
+        :return: Solution
+        :rtype: CutSolution
+        """
+        patterns = {}
+        for stick, stock in zip(sticks, stocks if stocks is not None else repeat(None)):
+            key = (stock, tuple(sorted(stick, reverse=True)))
+            patterns[key] = patterns.get(key, 0) + 1
+        return cls([pattern for _, pattern in patterns], patterns.values(), stock_length,
+                   None if stocks is None else [stock for stock, _ in patterns])
+
+    @classmethod
+    def fromPatternMatrix(cls, patterns, y, widths, stock_length=None, stocks=None):
+        """Builds a solution from a column generation result, without expanding it per stick.
+
+        :param patterns: patterns[i][j] is the number of cuts of width i in pattern j.
+        :type patterns: list of lists of int
+        :param y: The number of sticks cut with each pattern.
+        :type y: list of int
+        :param widths: The width of each cut.
+        :type widths: list of int or float
+        :param int or float stock_length: (Optional) The stock length.
+        :param stocks: (Optional) The stock length each pattern is cut from, when there is more than one.
+        :type stocks: list of int or float
+        :return: Solution
+        :rtype: CutSolution
+        """
+        table = []
+        for j in range(len(y)):
+            pattern = []
+            for i in range(len(widths)):
+                pattern.extend([widths[i]] * int(patterns[i][j]))
+            table.append(pattern)
+        return cls(table, y, stock_length, stocks)
+
+    def patterns(self):
+        """Yields each unique pattern with the number of sticks cut with it.
+
+        :return: Generator of (cut lengths, count) pairs
+        :rtype: generator of (tuple, int)
+        """
+        for idx in range(len(self._counts)):
+            yield self.pattern(idx), self._counts[idx]
+
+    def pattern(self, idx):
+        """Get the cut lengths of one pattern.
+
+        :param int idx: Pattern index.
+        :return: Cut lengths
+        :rtype: tuple
+        """
+        return tuple(self._lengths[self._offsets[idx]:self._offsets[idx + 1]])
+
+    def stockLength(self, idx):
+        """Get the stock length one pattern is cut from.
+
+        :param int idx: Pattern index.
+        :return: Stock length, or None if unknown
+        :rtype: int or float
+        """
+        return self.stock_length if self._stocks is None else self._stocks[idx]
+
+    def stockCounts(self):
+        """Get the number of sticks used of each stock length.
+
+        :return: Stock length to number of sticks, longest first
+        :rtype: dict
+        """
+        counts = {}
+        for idx in range(len(self._counts)):
+            stock = self.stockLength(idx)
+            counts[stock] = counts.get(stock, 0) + self._counts[idx]
+        return dict(sorted(counts.items(), key=lambda item: -(item[0] or 0)))
+
+    def hasMixedStock(self):
+        """Get whether the patterns record their own stock length, i.e. the job was cut from several stock lengths.
+
+        :rtype: bool
+        """
+        return self._stocks is not None
+
+    def count(self, idx):
+        """Get the number of sticks cut with one pattern.
+
+        :param int idx: Pattern index.
+        :return: Count
+        :rtype: int
+        """
+        return self._counts[idx]
+
+    def numPatterns(self):
+        """Get the number of unique patterns.
+
+        :return: Number of patterns
+        :rtype: int
+        """
+        return len(self._counts)
+
+    def map(self, func, stock_length=None):
+        """Builds a new solution with ``func`` applied to every cut length, once per unique pattern.
+
+        :param callable func: Function applied to each cut length.
+        :param int or float stock_length: (Optional) The stock length of the new solution.
+        :return: Solution
+        :rtype: CutSolution
+        """
+        return CutSolution(([func(length) for length in pattern] for pattern, _ in self.patterns()),
+                           self._counts, stock_length, self._stocks)
+
+    def sticks(self):
+        """Yields ``[unused length, [cut lengths]]`` for every stick, the format ``StockCutter1D`` used to return.
+
+        :return: Generator of sticks
+        :rtype: generator of lists
+        """
+        for idx, (pattern, count) in enumerate(self.patterns()):
+            stock = self.stockLength(idx)
+            unused = stock - sum(pattern) if stock is not None else None
+            for _ in range(count):
+                yield [unused, list(pattern)]
+
+    def __len__(self):
+        return sum(self._counts)
+
+    def __iter__(self):
+        for pattern, count in self.patterns():
+            for _ in range(count):
+                yield list(pattern)
+
+    def __repr__(self):
+        stocks = '' if self._stocks is None else f', stocks={list(self._stocks)}'
+        return f'CutSolution({[list(pattern) for pattern, _ in self.patterns()]}, {list(self._counts)}{stocks})'
+
+
+def _numberArray(values):
+    return array('q' if all(isinstance(value, int) for value in values) else 'd', values)
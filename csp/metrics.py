@@ -0,0 +1,134 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    """A class used to collect phase timers and event counters from a solve and its program file writes.
+
+    Timers record the number of observations, the total and the longest duration of each phase in seconds. Counters
+    record how often something happened. Both are keyed by name, for example ``master_lp``, ``pricing`` or
+    ``alns_destroy_random_removal_best``. All methods are thread safe, so engines running in a worker thread can
+    record into the same object the GUI reads from.
+
+    Phases recorded by the solvers:
+        - ``preprocess``, ``solve`` and ``postprocess`` around each solve.
+        - ``bounds`` and ``small_model`` in the small OR-Tools model.
+        - ``column_generation`` around the whole loop, and ``master_lp``, ``pricing`` and ``integer_master`` in it.
+        - ``branch_and_price`` around the exact search, with ``master_lp`` and ``pricing`` in every node.
+        - ``alns_iteration`` for every ALNS iteration.
+        - ``xlsx_write`` for every program file.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+
+    @contextmanager
+    def timer(self, name):
+        """Times the body of a ``with`` block as one observation of ``name``.
+
+        :param str name: Timer name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        """Records one observation of a timer.
+
+        :param str name: Timer name.
+        :param float seconds: Duration in seconds.
+        """
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    def increment(self, name, amount=1):
+        """Adds to a counter.
+
+        :param str name: Counter name.
+        :param int amount: (Optional) Amount to add. Defaults to 1.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def total(self, name):
+        """Get the total time recorded by a timer.
+
+        :param str name: Timer name.
+        :return: Seconds, or 0 if the timer was never observed
+        :rtype: float
+        """
+        with self._lock:
+            return self.timers[name][1] if name in self.timers else 0.0
+
+    def reset(self):
+        """Clears all timers and counters."""
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def toDict(self):
+        """Get a snapshot of all timers and counters.
+
+        :return: ``{"timers": {name: {"count", "total", "max"}}, "counters": {name: value}}``
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "timers": {name: {"count": count, "total": total, "max": longest}
+                           for name, (count, total, longest) in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def toJSON(self, indent=None):
+        """Exports the snapshot from :meth:`toDict` as JSON.
+
+        :param int indent: (Optional) JSON indent.
+        :return: JSON text
+        :rtype: str
+        """
+        return json.dumps(self.toDict(), indent=indent)
+
+    def toPrometheus(self, prefix="brobo"):
+        """Exports all timers and counters in the Prometheus text exposition format.
+
+        Timers become one summary, ``<prefix>_phase_seconds``, labelled by phase, plus a ``_max`` gauge. Each counter
+        becomes its own ``<prefix>_<name>_total`` counter.
+
+        :param str prefix: (Optional) Metric name prefix. Defaults to 'brobo'.
+        :return: Prometheus text
+        :rtype: str
+        """
+        snapshot = self.toDict()
+        lines = []
+        if snapshot["timers"]:
+            family = f"{prefix}_phase_seconds"
+            lines.append(f"# HELP {family} Time spent in each solver phase.")
+            lines.append(f"# TYPE {family} summary")
+            for name, timer in snapshot["timers"].items():
+                lines.append(f'{family}_sum{{phase="{name}"}} {timer["total"]!r}')
+                lines.append(f'{family}_count{{phase="{name}"}} {timer["count"]}')
+            lines.append(f"# HELP {family}_max Longest observation of each solver phase.")
+            lines.append(f"# TYPE {family}_max gauge")
+            for name, timer in snapshot["timers"].items():
+                lines.append(f'{family}_max{{phase="{name}"}} {timer["max"]!r}')
+        for name, value in snapshot["counters"].items():
+            family = f"{prefix}_{_metricName(name)}_total"
+            lines.append(f"# TYPE {family} counter")
+            lines.append(f"{family} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _metricName(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
@@ -0,0 +1,147 @@
+import json
+import os
+
+# Set covering over more columns than this is slower than generating the few columns it needs
+MAX_CATALOG_PATTERNS = 5000
+
+
+class PatternCatalog:
+    """A class used to keep every maximal cutting pattern of the stock and length sets a shop cuts again and again.
+
+    A pattern is maximal when no other length of its set fits in the room it leaves. Solving the master as a set
+    covering problem over all maximal patterns gives the optimal stick count without column generation, so for the
+    small, stable sets of standard lengths cut from each stock this is both faster and exact. Entries are keyed by
+    the usable stock length, the blade kerf and the set of cut lengths, all in thousandths of an inch. Sets with more
+    than ``maxPatterns`` maximal patterns are remembered as too large, so they are only enumerated once.
+
+    With a path the catalog is loaded from and saved to a JSON file. Saving replaces the file in one step, so
+    processes sharing the file never see it half written, though an entry added by one of them at the same time as
+    another may be lost and is then built again.
+
+    :ivar str path: The JSON file the catalog is saved to, or None to keep it in memory.
+    :ivar int maxPatterns: The most maximal patterns an entry may hold.
+    :ivar dict entries: Key to the sorted cut lengths and the pattern counts aligned with them, or None if too large.
+    """
+    def __init__(self, path=None, maxPatterns=MAX_CATALOG_PATTERNS):
+        """
+        :param str path: (Optional) The JSON file the catalog is loaded from, if it exists, and saved to.
+        :param int maxPatterns: (Optional) The most maximal patterns an entry may hold. Defaults to
+            MAX_CATALOG_PATTERNS.
+        :raises ValueError: If the file is not a valid catalog.
+        """
+        self.path = path
+        self.maxPatterns = maxPatterns
+        self.entries = {}
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def patterns(self, stock_length, blade_width, lengths):
+        """Get every maximal pattern of a stock and length set, enumerating and saving them the first time.
+
+        :param int stock_length: The usable stock length in thousandths of an inch.
+        :param int blade_width: The blade kerf in thousandths of an inch, added to every cut.
+        :param list lengths: The cut lengths in thousandths of an inch, without kerf. A length given more than once
+            gets the same counts in each of its rows, so callers covering demands must merge them first.
+        :return: The cut counts of each pattern, aligned with lengths, or None if there are more than maxPatterns
+        :rtype: list of list
+        """
+        key = catalogKey(stock_length, blade_width, lengths)
+        if key not in self.entries:
+            self.build(stock_length, blade_width, lengths)
+        entry = self.entries[key]
+        if entry is None:
+            return None
+        position = {length: idx for idx, length in enumerate(entry["lengths"])}
+        order = [position[length] for length in lengths]
+        return [[pattern[idx] for idx in order] for pattern in entry["patterns"]]
+
+    def build(self, stock_length, blade_width, lengths):
+        """Enumerates the maximal patterns of a stock and length set into the catalog and saves it if it has a path.
+
+        :param int stock_length: The usable stock length in thousandths of an inch.
+        :param int blade_width: The blade kerf in thousandths of an inch, added to every cut.
+        :param list lengths: The distinct cut lengths in thousandths of an inch, without kerf.
+        :return: The number of patterns, or None if there are more than maxPatterns
+        :rtype: int
+        """
+        ordered = sorted(set(lengths), reverse=True)
+        patterns = enumerateMaximalPatterns([length + blade_width for length in ordered], stock_length, self.maxPatterns)
+        key = catalogKey(stock_length, blade_width, ordered)
+        self.entries[key] = None if patterns is None else {"lengths": ordered, "patterns": patterns}
+        if self.path is not None:
+            self.save()
+        return None if patterns is None else len(patterns)
+
+    def load(self):
+        """Replaces the catalog with the contents of its file.
+
+        :raises ValueError: If the file is not a valid catalog.
+        """
+        with open(self.path) as file:
+            try:
+                entries = json.load(file)["entries"]
+                if not isinstance(entries, dict):
+                    raise TypeError("entries is not an object")
+                self.entries = entries
+            except (json.JSONDecodeError, KeyError, TypeError) as error:
+                raise ValueError(f"{self.path} is not a valid pattern catalog: {error}")
+
+    def save(self):
+        """Writes the catalog to its file, replacing it in one step so a crash never leaves it half written."""
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp, "w") as file:
+            json.dump({"entries": self.entries}, file)
+        os.replace(temp, self.path)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def catalogKey(stock_length, blade_width, lengths):
+    """Get the catalog key of a stock and length set.
+
+    :param int stock_length: The usable stock length in thousandths of an inch.
+    :param int blade_width: The blade kerf in thousandths of an inch.
+    :param list lengths: The cut lengths in thousandths of an inch, without kerf, in any order.
+    :return: Key
+    :rtype: str
+    """
+    return f"{stock_length}/{blade_width}/" + ",".join(str(length) for length in sorted(set(lengths), reverse=True))
+
+
+def enumerateMaximalPatterns(widths, stock_length, limit=None):
+    """Lists every pattern no other width fits on, by depth first search from the widest cut down.
+
+    :param list widths: The distinct cut widths, including kerf.
+    :param int stock_length: The usable stock length.
+    :param int limit: (Optional) Stop and return None once there are more patterns than this.
+    :return: The number of cuts of each width in every pattern, or None if there are more than limit
+    :rtype: list of list
+    """
+    fitting = [width for width in widths if width <= stock_length]
+    if not fitting:
+        return []
+    smallest = min(fitting)
+    patterns = []
+    counts = [0] * len(widths)
+    suffix = [min(widths[idx:]) for idx in range(len(widths))] + [float("inf")]
+
+    def search(idx, room):
+        if room < smallest:
+            # Nothing else fits, so the widths not reached yet get no cuts
+            patterns.append(list(counts))
+            return limit is None or len(patterns) <= limit
+        if suffix[idx] > room:
+            # Only a width already passed over would still fit, so no pattern down this branch is maximal
+            return True
+        for count in range(room // widths[idx], -1, -1):
+            counts[idx] = count
+            if not search(idx + 1, room - count * widths[idx]):
+                counts[idx] = 0
+                return False
+        counts[idx] = 0
+        return True
+
+    if not search(0, stock_length):
+        return None
+    return patterns
@@ -0,0 +1,168 @@
+import json
+import os
+from bisect import bisect_left, insort
+
+from units import fromThou, toThou
+
+# Offcuts shorter than this many inches are scrap rather than remnants
+DEFAULT_MINIMUM = 12
+
+
+class RemnantInventory:
+    """A class used to keep the offcuts on the rack so later jobs cut from them before opening new stock.
+
+    Remnants are kept in thousandths of an inch as a sorted list of distinct lengths with a count for each, so the
+    shortest remnant that holds a cut is found with a binary search. With a path the inventory is loaded from and
+    saved to a JSON file of ``[length in inches, count]`` pairs.
+
+    :ivar str path: The JSON file the inventory is saved to, or None to keep it in memory.
+    :ivar int minimum: The shortest offcut kept as a remnant, in thousandths of an inch.
+    :ivar list lengths: The sorted distinct remnant lengths in thousandths of an inch.
+    :ivar dict counts: The number of remnants of each length.
+    """
+    def __init__(self, path=None, minimum=DEFAULT_MINIMUM):
+        """
+        :param str path: (Optional) The JSON file the inventory is loaded from, if it exists, and saved to.
+        :param minimum: (Optional) The shortest offcut kept as a remnant, in inches. Defaults to DEFAULT_MINIMUM.
+        :type minimum: int, float or str
+        :raises ValueError: If the file is not a valid inventory.
+        """
+        self.path = path
+        self.minimum = toThou(minimum)
+        self.lengths = []
+        self.counts = {}
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def add(self, length, quantity=1):
+        """Puts remnants on the rack.
+
+        :param length: Remnant length in inches.
+        :type length: int, float or str
+        :param int quantity: (Optional) Number of remnants. Defaults to 1.
+        """
+        self._put(toThou(length), quantity)
+
+    def remove(self, length, quantity=1):
+        """Takes remnants off the rack.
+
+        :param length: Remnant length in inches.
+        :type length: int, float or str
+        :param int quantity: (Optional) Number of remnants. Defaults to 1.
+        :raises ValueError: If there are fewer remnants of this length.
+        """
+        self._take(toThou(length), quantity)
+
+    def bestFit(self, length):
+        """Get the shortest remnant at least ``length`` long.
+
+        :param length: Length in inches.
+        :type length: int, float or str
+        :return: Remnant length in inches, or None if no remnant is long enough
+        :rtype: float
+        """
+        idx = bisect_left(self.lengths, toThou(length))
+        return fromThou(self.lengths[idx]) if idx < len(self.lengths) else None
+
+    def remnants(self):
+        """Get every remnant length with its count, shortest first.
+
+        :return: (length in inches, count) pairs
+        :rtype: list of tuple
+        """
+        return [(fromThou(length), self.counts[length]) for length in self.lengths]
+
+    def plan(self, cutData, deadZone):
+        """Assigns as many cuts as possible to remnants, best fit decreasing, without changing the inventory.
+
+        Cuts are placed longest first. Each cut goes on the opened remnant with the least room left that holds it,
+        and otherwise opens the shortest remnant on the rack that holds it. Cuts no remnant holds are left for the
+        solver.
+
+        :param list cutData: [length, quantity] pairs in thousandths of an inch including kerf, longest first.
+        :param int deadZone: The dead zone in thousandths of an inch, taken off every remnant.
+        :return: The remnant sticks as [usable length, [cut lengths]] lists, and the [length, quantity] pairs left
+        :rtype: tuple
+        """
+        available = [length - deadZone for length in self.lengths for _ in range(self.counts[length])
+                     if length > deadZone]
+        opened = []
+        sticks = []
+        remaining = []
+        for length, quantity in cutData:
+            left = 0
+            for _ in range(quantity):
+                idx = bisect_left(opened, (length, -1))
+                if idx < len(opened):
+                    room, stick = opened.pop(idx)
+                    sticks[stick][1].append(length)
+                    insort(opened, (room - length, stick))
+                    continue
+                idx = bisect_left(available, length)
+                if idx == len(available):
+                    left += 1
+                    continue
+                usable = available.pop(idx)
+                sticks.append([usable, [length]])
+                insort(opened, (usable - length, len(sticks) - 1))
+            if left:
+                remaining.append([length, left])
+        return sticks, remaining
+
+    def update(self, used, offcuts):
+        """Takes the remnants a job used off the rack, puts back its offcuts of at least the minimum length and saves
+        the inventory if it has a path.
+
+        :param list used: The remnant lengths used, in thousandths of an inch.
+        :param list offcuts: The offcut lengths, in thousandths of an inch.
+        :return: The number of offcuts kept as remnants
+        :rtype: int
+        """
+        for length in used:
+            self._take(length, 1)
+        kept = [length for length in offcuts if length >= self.minimum]
+        for length in kept:
+            self._put(length, 1)
+        if self.path is not None:
+            self.save()
+        return len(kept)
+
+    def load(self):
+        """Replaces the inventory with the contents of its file.
+
+        :raises ValueError: If the file is not a valid inventory.
+        """
+        with open(self.path) as file:
+            try:
+                data = json.load(file)
+                self.lengths, self.counts = [], {}
+                for length, quantity in data["remnants"]:
+                    self._put(toThou(length), int(quantity))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as error:
+                raise ValueError(f"{self.path} is not a valid remnant inventory: {error}")
+
+    def save(self):
+        """Writes the inventory to its file, replacing it in one step so a crash never leaves it half written."""
+        temp = self.path + ".tmp"
+        with open(temp, "w") as file:
+            json.dump({"remnants": [[length, count] for length, count in self.remnants()]}, file, indent=1)
+        os.replace(temp, self.path)
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def _put(self, length, quantity):
+        if length <= 0 or quantity <= 0:
+            return
+        if length not in self.counts:
+            insort(self.lengths, length)
+            self.counts[length] = 0
+        self.counts[length] += quantity
+
+    def _take(self, length, quantity):
+        if self.counts.get(length, 0) < quantity:
+            raise ValueError(f"Cannot take {quantity} remnants of {fromThou(length)} off the rack")
+        self.counts[length] -= quantity
+        if not self.counts[length]:
+            del self.counts[length]
+            self.lengths.pop(bisect_left(self.lengths, length))
@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+
+
+class ProgressTracker:
+    """A class used to report improving incumbents from a running solver engine.
+
+    Engines call :meth:`update` whenever they have a feasible stick count and a lower bound. Only improvements
+    (fewer sticks or a higher bound) are forwarded to the ``progress`` callback. The callback receives a dict with
+    the keys ``engine``, ``iteration``, ``iterations``, ``sticks``, ``waste``, ``bound`` and ``elapsed`` and may
+    return True to ask the engine to stop early with the best solution found so far. The ``cancel`` event is checked
+    on every update, so engines stop promptly even while the incumbent is not improving.
+
+    :ivar callable progress: The progress callback, or None.
+    :ivar threading.Event cancel: Event that asks the engine to stop when set, or None.
+    :ivar str engine: The name of the engine reporting progress.
+    :ivar int iterations: The iteration limit of the engine.
+    :ivar int or float stock_length: The stock length in solver units.
+    :ivar int or float demand_length: The total length of all demanded cuts in solver units.
+    """
+    def __init__(self, progress, engine, iterations, stock_length, demand_length, cancel=None):
+        self.progress = progress
+        self.cancel = cancel
+        self.engine = engine
+        self.iterations = iterations
+        self.stock_length = stock_length
+        self.demand_length = demand_length
+        self.start = time.perf_counter()
+        self.sticks = None
+        self.bound = 0
+        self.stopped = False
+
+    def update(self, iteration, sticks, bound, stock_used=None):
+        """Reports the current incumbent to the progress callback if it improved.
+
+        :param int iteration: The current engine iteration.
+        :param int sticks: The number of sticks used by the current incumbent.
+        :param int bound: A lower bound on the number of sticks.
+        :param int or float stock_used: (Optional) The total length of the sticks used, for jobs cut from several
+            stock lengths. Defaults to the stick count times the stock length.
+        :return: True if the caller asked the engine to stop
+        :rtype: bool
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            self.stopped = True
+        if self.progress is None:
+            return self.stopped
+        bound = min(bound, sticks)
+        if self.sticks is not None and sticks >= self.sticks and bound <= self.bound:
+            return self.stopped
+        self.sticks = sticks if self.sticks is None else min(sticks, self.sticks)
+        self.bound = max(bound, self.bound)
+        event = {
+            "engine": self.engine,
+            "iteration": iteration,
+            "iterations": self.iterations,
+            "sticks": self.sticks,
+            "waste": (stock_used if stock_used is not None else self.sticks * self.stock_length) - self.demand_length,
+            "bound": self.bound,
+            "elapsed": time.perf_counter() - self.start,
+        }
+        self.stopped = bool(self.progress(event)) or self.stopped
+        return self.stopped
+
+
+def streamEvents(solve):
+    """Runs ``solve(progress, cancel)`` in a background thread and yields its progress events as they arrive.
+
+    Closing the generator before the solve finishes sets the ``cancel`` event, which asks the engine to stop.
+    Exceptions raised by ``solve`` are re-raised in the caller once all earlier events have been yielded.
+
+    :param callable solve: Callable taking a progress callback and a cancel event.
+    :return: Generator of progress event dicts
+    :rtype: generator
+    """
+    events = queue.Queue()
+    cancelled = threading.Event()
+    done = object()
+    errors = []
+
+    def worker():
+        try:
+            solve(events.put, cancelled)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            events.put(done)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            event = events.get()
+            if event is done:
+                break
+            yield event
+    finally:
+        cancelled.set()
+        thread.join()
+    if errors:
+        raise errors[0]
@@ -1,6 +1,10 @@
-from stock_cutter_1d import solveCut
-from alns_stock_cutter import alnsSolver
-from tkinter import messagebox
+import logging
+from cut_solution import CutSolution
+from metrics import Metrics
+from solve_progress import ProgressTracker, streamEvents
+from units import THOU, fromThou, toThou, toThouArray
+
+logger = logging.getLogger(__name__)
 
 #TODO: Add a hybrid solver that uses ALNS to generate a good initial solution and then uses OR-Tools to optimize it.
 class CuttingParameters:
@@ -11,7 +15,7 @@ class CuttingParameters:
     :ivar int or float dead_zone: The dead zone of the blade.
     :ivar list cut_lengths: The lengths of the cuts.
     :ivar list cut_quantities: The quantities of the cuts.
-    :ivar int scale_factor: Scale factor used to convert data to decimal integer.
+    :ivar int scale_factor: Scale factor used to convert data to decimal integer. Fixed at thousandths of an inch.
     :ivar int jobNumber: The job number.
     :ivar str dirPath: The directory path.
     :ivar str solver: The solver type.
@@ -19,12 +23,26 @@ class CuttingParameters:
     :ivar int staringProgramNumber: The starting program number.
     :ivar str fileName: The name of the Excel files.
     :ivar bool debug: The debug status.
-    :ivar list of list of int or float solution: The solution to the stick packing problem.
+    :ivar bool groupPatterns: Whether identical sticks share one program. Defaults to True.
+    :ivar int workers: The number of processes writing program files. Defaults to the number of CPUs.
+    :ivar str writer: The xlsx writer for program files, 'xlsxwriter' or 'direct'. Defaults to 'xlsxwriter'.
+    :ivar float timeLimit: Seconds the solver may run before returning its best solution, or None for no limit.
+    :ivar list stocks: Stock lengths on the rack as (length, available, cost) tuples, replacing stock_length, or None.
+    :ivar RemnantInventory remnants: Offcuts cut from before any new stock, or None.
+    :ivar PatternCatalog catalog: Maximal patterns of recurring stock and length sets, or None.
+    :ivar CutSolution solution: The solution to the stick packing problem, in thousandths of an inch.
+    :ivar int lowerBound: The fewest sticks any solution needs, as proven by the last "Exact" solve, or None.
+    :ivar Metrics metrics: Phase timers and counters of the solves and program file writes.
 
     Dependencies:
         - solveCut from stock_cutter_1d module
         - alnsSolver from alns_stock_cutter module
-        - messagebox from tkinter module
+        - firstFitDecreasing from greedy_cutter module
+        - selectEngine from engine_selector module, for the "Auto" solver
+        - branchAndPrice from branch_and_price module, for the "Exact" solver
+
+    The solver engines are imported on the first solve, so importing this module stays fast and works without a
+    display.
     """    
     def __init__(self, stock_length, blade_width, dead_zone, cut_lengths, cut_quantities):
         self.stock_length = stock_length
@@ -32,15 +50,24 @@ class CuttingParameters:
         self.dead_zone = dead_zone
         self.cut_lengths = cut_lengths
         self.cut_quantities = cut_quantities
-        self.scale_factor = None
+        self.scale_factor = THOU
         self.jobNumber = None
         self.dirPath = None
         self.solver = None
         self.author = None
         self.staringProgramNumber = None
         self.debug = False
+        self.groupPatterns = True
+        self.workers = None
+        self.writer = "xlsxwriter"
+        self.timeLimit = None
+        self.stocks = None
+        self.remnants = None
+        self.catalog = None
         self.solution = None
+        self.lowerBound = None
         self.fileName = None
+        self.metrics = Metrics()
 
     def getStockLength(self):
         """Get the stock length for the cuttingParameters object.
@@ -99,11 +126,12 @@ class CuttingParameters:
         return self.scale_factor
     
     def setScaleFactor(self, scale_factor):
-        """Set the scale factor for the cuttingParameters object.
+        """No longer has any effect: measurements are always converted exactly to thousandths of an inch, the unit the
+        BROBO program files use. Kept so existing callers keep working.
 
         :param int scale_factor: Scale Factor
         """        
-        self.scale_factor = scale_factor
+        pass
 
     def getJobNumber(self):
         """Get the job number for the cuttingParameters object.
@@ -180,71 +208,349 @@ class CuttingParameters:
         """        
         self.debug = debug
 
-    def buildSolution(self):
+    def getGroupPatterns(self):
+        """Get whether identical sticks are written as one program with a repeat quantity.
+
+        :return: Group Patterns
+        :rtype: bool
+        """
+        return self.groupPatterns
+
+    def setGroupPatterns(self, groupPatterns):
+        """Set whether identical sticks are written as one program with a repeat quantity.
+
+        :param bool groupPatterns: Group Patterns
+        """
+        self.groupPatterns = groupPatterns
+
+    def getWorkers(self):
+        """Get the number of processes used to write program files.
+
+        :return: Workers if set, else None for one per CPU
+        :rtype: int
+        """
+        return self.workers
+
+    def setWorkers(self, workers):
+        """Set the number of processes used to write program files. Use 1 to write them in the calling process.
+
+        :param int workers: Workers
+        """
+        self.workers = workers
+
+    def getWriter(self):
+        """Get the xlsx writer used for program files.
+
+        :return: Writer
+        :rtype: string
+        """
+        return self.writer
+
+    def setWriter(self, writer):
+        """Set the xlsx writer used for program files: 'xlsxwriter', or 'direct' for the lightweight writer.
+
+        :param string writer: Writer
+        """
+        self.writer = writer
+
+    def getTimeLimit(self):
+        """Get the solver time limit.
+
+        :return: Time Limit in seconds, or None
+        :rtype: float
+        """
+        return self.timeLimit
+
+    def setTimeLimit(self, timeLimit):
+        """Set how many seconds the solver may run before it returns the best solution found so far.
+
+        :param float timeLimit: Time Limit in seconds, or None for no limit
+        """
+        self.timeLimit = timeLimit
+
+    def getStocks(self):
+        """Get the stock lengths the job may be cut from.
+
+        :return: (length, available, cost) tuples, or None when only the stock length is used
+        :rtype: list of tuple
+        """
+        return self.stocks
+
+    def setStocks(self, stocks):
+        """Set several stock lengths to cut the job from in one solve, replacing the stock length.
+
+        Each stock is a (length, available, cost) tuple with the length in inches. ``available`` is the number of
+        sticks on the rack, or None for unlimited. ``cost`` is the price of one stick; None prices it by its length,
+        so the solver minimizes the total length of stock used. Each solution pattern records its stock length.
+
+        :param list stocks: Stocks, or None to use the stock length only
+        """
+        self.stocks = None if stocks is None else [tuple(stock) + (None,) * (3 - len(stock)) for stock in stocks]
+
+    def getRemnants(self):
+        """Get the remnant inventory the job cuts from before opening new stock.
+
+        :return: Remnant Inventory, or None
+        :rtype: RemnantInventory
+        """
+        return self.remnants
+
+    def setRemnants(self, remnants):
+        """Set a remnant inventory to cut from before opening new stock.
+
+        Cuts are placed on the remnants first and only the rest are solved. After the solve the remnants used are
+        taken off the rack and every offcut of at least the inventory minimum is put back, counted by the
+        ``remnants_used`` and ``offcuts_kept`` metrics.
+
+        :param RemnantInventory remnants: Remnant Inventory, or None to only cut new stock
+        """
+        self.remnants = remnants
+
+    def getPatternCatalog(self):
+        """Get the pattern catalog the OR-Tools solver takes every maximal pattern from.
+
+        :return: Pattern Catalog, or None
+        :rtype: PatternCatalog
+        """
+        return self.catalog
+
+    def setPatternCatalog(self, catalog):
+        """Set a pattern catalog for the OR-Tools solver.
+
+        When the catalog holds, or can enumerate, at most its maximum number of maximal patterns for the stock, blade
+        width and cut lengths of a job cut from one stock length, the job is solved exactly as set covering over them
+        instead of with column generation. The ``catalog_hits`` and ``catalog_misses`` metrics count how often.
+
+        :param PatternCatalog catalog: Pattern Catalog, or None to always use column generation
+        """
+        self.catalog = catalog
+
+    def getLowerBound(self):
+        """Get the fewest sticks any solution needs, as proven by the last solve with the "Exact" solver.
+
+        Remnant sticks planned before the solve count towards the bound.
+
+        :return: Lower bound, or None if the last solve proved none
+        :rtype: int
+        """
+        return self.lowerBound
+
+    def getProvenGap(self):
+        """Get how far the solution of the last "Exact" solve may be from optimal.
+
+        :return: One less the lower bound over the sticks of the solution, 0 when it is proven optimal, or None if the
+            last solve proved no bound
+        :rtype: float
+        """
+        if self.lowerBound is None:
+            return None
+        sticks = len(self.solution)
+        return 1 - self.lowerBound / sticks if sticks else 0.0
+
+    def getMetrics(self):
+        """Get the phase timers and counters recorded by every solve and program file write of this object.
+
+        Export them with ``toJSON()`` or ``toPrometheus()``.
+
+        :return: Metrics
+        :rtype: Metrics
+        """
+        return self.metrics
+
+    def buildSolution(self, progress=None, cancel=None, onError=None):
         """Builds the solution for cutting parameters object.
 
-        :raises ValueError: If invalid numeric values are entered.
+        Errors are logged and passed to ``onError`` instead of being raised, so the GUI can show them in a message
+        box while headless callers never touch tkinter.
+
+        :param callable progress: (Optional) Called with a progress event dict for every improving incumbent.
+            Returning True asks the engine to stop early with the best solution found so far.
+        :param threading.Event cancel: (Optional) Stops the engine early when set.
+        :param callable onError: (Optional) Called with the ValueError raised for invalid numeric values.
+        :return: True if the solution was built
+        :rtype: bool
         """        
         try:
-            stock_length, zipped_data, blade_width = self._solverPreProcess()
-            if self.solver == "OR-Tools":
-                solution = _solveORTools(zipped_data, stock_length)
-                solution = _ortoolsPostProcessor(solution, blade_width, self.scale_factor)
-            elif self.solver == "ALNS":
-                solution = _solveALNS(zipped_data, stock_length)
-                solution = _alnsPostProcessor(solution, blade_width, self.scale_factor)
-            self.solution = solution
+            self.solve(progress, cancel)
         except ValueError as handler:
-            print(f"Error: {handler}")
-            messagebox.showerror("Error", "Please enter valid numeric values.")
+            logger.error("Error: %s", handler)
+            if onError is not None:
+                onError(handler)
+            return False
+        return True
+
+    def streamSolution(self):
+        """Builds the solution in a background thread and yields improving incumbents as the engine finds them.
+
+        Each event is a dict with the keys ``engine``, ``iteration``, ``iterations``, ``sticks``, ``waste`` (in
+        inches, including blade kerf), ``bound`` and ``elapsed`` (seconds). Closing the generator early stops the
+        engine and keeps the best solution found so far. The solution is available from :meth:`getSolution` once the
+        generator is exhausted or closed.
+
+        :raises ValueError: If invalid numeric values are entered.
+        :return: Generator of progress events
+        :rtype: generator
+        """
+        return streamEvents(self.solve)
+
+    def solve(self, progress=None, cancel=None):
+        """Builds the solution like :meth:`buildSolution`, but raises errors instead of reporting them.
+
+        Safe to call from a worker thread.
+
+        :param callable progress: (Optional) Called with a progress event dict for every improving incumbent.
+        :param threading.Event cancel: (Optional) Stops the engine early when set.
+        :raises ValueError: If invalid numeric values are entered or the solver is unknown.
+        """
+        if self.solver not in ("OR-Tools", "ALNS", "Greedy", "Auto", "Exact"):
+            raise ValueError(f"Unknown solver: {self.solver}")
+        self.lowerBound = None
+        with self.metrics.timer("preprocess"):
+            stock_length, zipped_data, blade_width = self._solverPreProcess()
+            stocks = self._stockPreProcess()
+            dead_zone = toThou(self.dead_zone)
+            remnant_sticks = []
+            if self.remnants is not None:
+                remnant_sticks, zipped_data = self.remnants.plan(zipped_data, dead_zone)
+            solver, parameters = self.solver, {}
+            if solver == "Auto" and zipped_data:
+                solver, parameters = _selectSolver(zipped_data, stock_length, stocks, self.metrics)
+        if progress is not None:
+            progress = _deScaleProgress(progress)
+        with self.metrics.timer("solve"):
+            if not zipped_data:
+                solution = CutSolution([], [], stock_length)
+            elif solver == "OR-Tools":
+                if self.catalog is not None and stocks is None:
+                    parameters["catalog_patterns"] = _catalogPatterns(self.catalog, zipped_data, stock_length, blade_width, self.metrics)
+                solution = _solveORTools(zipped_data, stock_length, progress, cancel, self.metrics, self.timeLimit, stocks, **parameters)
+            elif solver == "ALNS":
+                solution = _solveALNS(zipped_data, stock_length, progress, cancel, self.metrics, self.timeLimit, stocks, **parameters)
+            elif solver == "Greedy":
+                solution = _solveGreedy(zipped_data, stock_length, progress, cancel, self.metrics, self.timeLimit, stocks)
+            elif solver == "Exact":
+                solution, self.lowerBound = _solveExact(zipped_data, stock_length, progress, cancel, self.metrics, self.timeLimit, stocks)
+                self.lowerBound += len(remnant_sticks)
+        with self.metrics.timer("postprocess"):
+            if self.remnants is not None:
+                solution = _addRemnantSticks(solution, remnant_sticks)
+                kept = self.remnants.update([usable + dead_zone for usable, _ in remnant_sticks], _offcuts(solution, dead_zone))
+                self.metrics.increment("remnants_used", len(remnant_sticks))
+                self.metrics.increment("offcuts_kept", kept)
+            solution = _postProcessor(solution, blade_width)
+        self.solution = solution
 
     def getSolution(self):
         """Get the solution of the CuttingParameters object.
 
+        Iterating the solution yields the cut lengths of each stick in integer thousandths of an inch; use
+        ``patterns()`` to get each unique pattern with the number of sticks cut with it.
+
         :return: Solution
-        :rtype: List of lists of floats
+        :rtype: CutSolution
         """        
         return self.solution
 
+    def setSolution(self, solution):
+        """Set the solution of the CuttingParameters object, for solutions found outside :meth:`solve`.
+
+        :param CutSolution solution: Solution, with cut lengths in integer thousandths of an inch
+        """
+        self.solution = solution
+        self.lowerBound = None
+
     def print_solution(self):
         """Prints the solution of the stick packing problem.
 
         Example Output:
-            - Stick 1: [1, 0, 1, 0, 1], Usage: 60.00%
+            - Pattern 1 x 3: [20.0, 20.0, 15.0], Usage: 55.00%
             - Blade Width: 10, Dead Zone: 2
         """
-        for idx, stick in enumerate(self.solution, start=1):
-            usage = sum(stick) / (self.stock_length / self.scale_factor) * 100
-            print(f"Stick {idx}: {stick}, Usage: {usage:.2f}%")
-            print(f"Blade Width: {self.blade_width}, Dead Zone: {self.dead_zone}")
+        mixed = self.solution.hasMixedStock()
+        stock_length = toThou(self.stock_length)
+        for idx, (pattern, count) in enumerate(self.solution.patterns(), start=1):
+            if mixed:
+                stock_length = self.solution.stockLength(idx - 1) + toThou(self.dead_zone)
+            usage = sum(pattern) / stock_length * 100
+            stock = f" on {fromThou(stock_length):g}" if mixed else ""
+            print(f"Pattern {idx} x {count}{stock}: {[fromThou(length) for length in pattern]}, Usage: {usage:.2f}%")
+        print(f"Sticks: {len(self.solution)}, Blade Width: {self.blade_width}, Dead Zone: {self.dead_zone}")
 
     def _solverPreProcess(self):
-        stock_length = _scaleMeasurement(self.stock_length - self.dead_zone, self.scale_factor)
-        blade_width = _scaleMeasurement(self.blade_width, self.scale_factor)
-        cut_lengths = [_scaleMeasurement(length, self.scale_factor) for length in self.cut_lengths]
+        stock_length = toThou(self.stock_length) - toThou(self.dead_zone)
+        blade_width = toThou(self.blade_width)
+        cut_lengths = toThouArray(self.cut_lengths)
         zipped_data = _zipCutData(cut_lengths, self.cut_quantities)
         zipped_data = _addBladeKerf(zipped_data, blade_width)
         return stock_length, zipped_data, blade_width
 
-def _solveORTools(zipped_data, stock_length):
+    def _stockPreProcess(self):
+        if self.stocks is None:
+            return None
+        dead_zone = toThou(self.dead_zone)
+        return [[available, toThou(length) - dead_zone, float(length) if cost is None else float(cost)]
+                for length, available, cost in self.stocks]
+
+def _selectSolver(zipped_data, stock_length, stocks, metrics):
+    from engine_selector import instanceFeatures, selectEngine
+    solver, parameters, _ = selectEngine(instanceFeatures(zipped_data, stock_length, stocks))
+    metrics.increment(f"auto_{solver.lower().replace('-', '_')}")
+    return solver, parameters
+
+def _catalogPatterns(catalog, zipped_data, stock_length, blade_width, metrics):
+    with metrics.timer("catalog_lookup"):
+        patterns = catalog.patterns(stock_length, blade_width, [length - blade_width for length, _ in zipped_data])
+    metrics.increment("catalog_misses" if patterns is None else "catalog_hits")
+    return patterns
+
+def _solveORTools(zipped_data, stock_length, progress=None, cancel=None, metrics=None, time_limit=None, stocks=None, iterations=500, catalog_patterns=None):
+    from stock_cutter_1d import solveCut
     zipped_data = [[quantity, length] for length, quantity in zipped_data]
-    return solveCut(zipped_data, stock_length, output_json=False, large_model=True, greedy_model=False, iterAccuracy=500)
+    return solveCut(zipped_data, stock_length, output_json=False, large_model=True, greedy_model=False, iterAccuracy=iterations, progress=progress, cancel=cancel, metrics=metrics, time_limit=time_limit, stocks=stocks, catalog_patterns=catalog_patterns)
 
-def _solveALNS(zipped_data, stock_length):
+def _solveALNS(zipped_data, stock_length, progress=None, cancel=None, metrics=None, time_limit=None, stocks=None, iterations=1000):
+    from alns_stock_cutter import alnsSolver
     zipped_data = _flattenCutData(zipped_data)
-    return alnsSolver(stock_length, zipped_data, iterations=1000, seed=1234)
+    return alnsSolver(stock_length, zipped_data, iterations=iterations, seed=1234, progress=progress, cancel=cancel, metrics=metrics, time_limit=time_limit, stocks=stocks)
 
-def _ortoolsPostProcessor(solution, blade_width, scale_factor):
-    return [[(length - blade_width) / scale_factor for length in stick[1]] for stick in solution]
-
-def _alnsPostProcessor(solution, blade_width, scale_factor):
-    return [[(length - blade_width) / scale_factor for length in assignments] for assignments in solution]
-
-def _deScaleMeasurement(measurement, scaleFactor):
-    return int(float(measurement) / scaleFactor)
-
-def _scaleMeasurement(measurement, scaleFactor):
-    return int(float(measurement) * scaleFactor)
+def _solveGreedy(zipped_data, stock_length, progress=None, cancel=None, metrics=None, time_limit=None, stocks=None):
+    # Packing takes milliseconds, so there is no time limit to honour and a single progress update to report
+    from greedy_cutter import firstFitDecreasing
+    zipped_data = [[quantity, length] for length, quantity in zipped_data]
+    solution = firstFitDecreasing(zipped_data, stock_length, stocks)
+    demand_length = sum(quantity * length for quantity, length in zipped_data)
+    stock_used = sum(length * count for length, count in solution.stockCounts().items()) if stocks else None
+    ProgressTracker(progress, "Greedy", 1, stock_length, demand_length, cancel).update(1, len(solution), 0, stock_used)
+    return solution
+
+def _solveExact(zipped_data, stock_length, progress=None, cancel=None, metrics=None, time_limit=None, stocks=None):
+    from branch_and_price import branchAndPrice
+    if stocks is not None:
+        raise ValueError("The Exact solver cuts from a single stock length")
+    zipped_data = [[quantity, length] for length, quantity in zipped_data]
+    return branchAndPrice(zipped_data, stock_length, time_limit, metrics, progress, cancel)
+
+def _deScaleProgress(progress):
+    def deScaled(event):
+        event["waste"] = fromThou(event["waste"])
+        return progress(event)
+    return deScaled
+
+def _addRemnantSticks(solution, remnant_sticks):
+    if not remnant_sticks:
+        return solution
+    patterns = [pattern for pattern, _ in solution.patterns()] + [cuts for _, cuts in remnant_sticks]
+    counts = [count for _, count in solution.patterns()] + [1] * len(remnant_sticks)
+    stocks = [solution.stockLength(idx) for idx in range(solution.numPatterns())] + [usable for usable, _ in remnant_sticks]
+    return CutSolution(patterns, counts, solution.stock_length, stocks)
+
+def _offcuts(solution, dead_zone):
+    # Cut lengths still include their kerf here, so the offcut is the whole stick less every cut and kerf
+    return [solution.stockLength(idx) + dead_zone - sum(pattern)
+            for idx, (pattern, count) in enumerate(solution.patterns()) for _ in range(count)]
+
+def _postProcessor(solution, blade_width):
+    return solution.map(lambda length: length - blade_width, solution.stock_length)
 
 def _zipCutData(cut_lengths, cut_quantities):
     return sorted(zip(cut_lengths, cut_quantities), key=lambda pair: pair[0], reverse=True)
@@ -0,0 +1,414 @@
+"""Local HTTP solver service, so shop floor PCs can hand their jobs to one fast machine.
+
+Jobs are queued on a pool of worker processes that import the solver engines once at start up, so no request pays
+the OR-Tools or ALNS import. Submitting a job identical to a queued, running or finished one returns the existing
+job instead of solving it again. Only the Python standard library is used on top of the solver modules.
+
+Endpoints (all JSON):
+    POST   /jobs                     Submit a job in the :mod:`job_io` JSON format. ``"buildPrograms": true`` also
+                                     writes the program files on the server. Returns the job status.
+    GET    /jobs                     Status of every job.
+    GET    /jobs/<id>                Status, last progress event and result of one job.
+    DELETE /jobs/<id>                Cancel a queued or running job.
+    GET    /jobs/<id>/files/<name>   Download one of the job's program files.
+    GET    /health                   Number of workers and jobs waiting.
+
+Usage:
+    python csp/solver_service.py [--host 127.0.0.1] [--port 8765] [--workers N] [--out-dir DIR]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from job_io import parseJob
+
+logger = logging.getLogger(__name__)
+
+SERVICE_PORT = 8765
+# Finished jobs kept for status requests and deduplication; the oldest are dropped first
+MAX_FINISHED_JOBS = 256
+FINISHED = ("done", "error", "cancelled")
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class SolverService:
+    """A class used to queue jobs on a pre-warmed pool of solver processes and track their progress.
+
+    :ivar int workers: The number of worker processes.
+    :ivar str outDir: The directory program files are written to, in one folder per job number.
+    :ivar dict jobs: Job records by job id.
+    """
+    def __init__(self, workers=None, outDir="."):
+        self.workers = workers or os.cpu_count() or 1
+        self.outDir = outDir
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._manager = multiprocessing.Manager()
+        self._events = self._manager.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warmWorker)
+        # Start every worker now, so the first jobs do not pay for the process start and engine imports
+        for future in [self._pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        self._dispatcher = threading.Thread(target=self._dispatchEvents, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, settings):
+        """Queues a job, or returns the existing job if an identical one was submitted before and did not fail.
+
+        :param dict settings: Job in the :mod:`job_io` JSON format, plus an optional ``buildPrograms`` flag.
+        :raises ValueError: If the settings are not a valid job, or the job number is not a plain folder name.
+        :return: The job status and whether a new job was created
+        :rtype: tuple
+        """
+        if not isinstance(settings, dict):
+            raise ValueError("A job must be a JSON object")
+        jobId = _jobKey(settings)
+        settings = dict(settings)
+        buildPrograms = bool(settings.pop("buildPrograms", False))
+        # Clients choose what to solve, never where the server reads or writes
+        for key in ("dirPath", "remnantFile", "catalogFile", "cutFile"):
+            settings.pop(key, None)
+        job = parseJob(settings, name=jobId)
+        if not _safeFolderName(str(job["jobNumber"])):
+            raise ValueError(f"jobNumber {job['jobNumber']!r} is not a plain folder name")
+        # The lookup and the insert share one critical section, so identical jobs posted at once are solved once.
+        # The record is only published with its future, so a cancel request never finds a job without one. The
+        # callback is added after the lock is released, as it runs at once if the job already finished.
+        with self._lock:
+            record = self.jobs.get(jobId)
+            if record is not None and record["status"] not in ("error", "cancelled"):
+                return self._public(record), False
+            cancel = self._manager.Event()
+            record = {"id": jobId, "status": "queued", "submitted": time.time(), "progress": None, "result": None,
+                      "error": None, "cancel": cancel}
+            record["future"] = self._pool.submit(_solveJob, jobId, settings, self.outDir, buildPrograms, self._events,
+                                                 cancel)
+            self.jobs[jobId] = record
+            self._evictFinished()
+        record["future"].add_done_callback(lambda future: self._finish(jobId, future))
+        return self._public(record), True
+
+    def status(self, jobId=None):
+        """Get the status of one job, or of every job.
+
+        :param str jobId: (Optional) Job id.
+        :return: Job status, or None if the job is unknown; a list of every job status without an id
+        :rtype: dict or list
+        """
+        with self._lock:
+            if jobId is None:
+                return [self._public(record) for record in self.jobs.values()]
+            record = self.jobs.get(jobId)
+            return None if record is None else self._public(record)
+
+    def cancel(self, jobId):
+        """Cancels a queued job, or stops a running one with the best solution found so far.
+
+        :param str jobId: Job id.
+        :return: Job status, or None if the job is unknown
+        :rtype: dict
+        """
+        with self._lock:
+            record = self.jobs.get(jobId)
+            if record is None:
+                return None
+            if record["status"] not in FINISHED:
+                record["cancel"].set()
+                if record["future"].cancel():
+                    record.update(status="cancelled", finished=time.time())
+            return self._public(record)
+
+    def programPath(self, jobId, name):
+        """Get the path of one of a finished job's program files.
+
+        :param str jobId: Job id.
+        :param str name: Program file name.
+        :return: Path, or None if the job has no such file
+        :rtype: str
+        """
+        status = self.status(jobId)
+        if status is None or not status["result"]:
+            return None
+        for path in status["result"].get("programs", []):
+            if os.path.basename(path) == name:
+                return path
+        return None
+
+    def health(self):
+        """Get the number of workers and of jobs waiting or running.
+
+        :rtype: dict
+        """
+        with self._lock:
+            waiting = sum(record["status"] in ("queued", "running") for record in self.jobs.values())
+        return {"status": "ok", "workers": self.workers, "pending": waiting, "jobs": len(self.jobs)}
+
+    def close(self):
+        """Stops the worker processes. Running jobs are cancelled."""
+        with self._lock:
+            for record in self.jobs.values():
+                if record["status"] not in FINISHED:
+                    record["cancel"].set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._events.put(None)
+        self._dispatcher.join()
+        self._manager.shutdown()
+
+    def _dispatchEvents(self):
+        while True:
+            message = self._events.get()
+            if message is None:
+                return
+            jobId, event = message
+            with self._lock:
+                record = self.jobs.get(jobId)
+                if record is None or record["status"] in FINISHED:
+                    continue
+                record["status"] = "running"
+                if event is not None:
+                    record["progress"] = event
+
+    def _finish(self, jobId, future):
+        with self._lock:
+            record = self.jobs.get(jobId)
+            # A failed or cancelled job resubmitted under the same id has a new record the old future must not touch
+            if record is None or record["future"] is not future or future.cancelled():
+                return
+            try:
+                record["result"] = future.result()
+                record["status"] = "cancelled" if record["cancel"].is_set() else "done"
+            except Exception as error:
+                record["error"] = str(error)
+                record["status"] = "error"
+            record["finished"] = time.time()
+
+    def _evictFinished(self):
+        finished = [record for record in self.jobs.values() if record["status"] in FINISHED]
+        for record in sorted(finished, key=lambda record: record["finished"])[:len(finished) - MAX_FINISHED_JOBS]:
+            del self.jobs[record["id"]]
+
+    @staticmethod
+    def _public(record):
+        return {key: value for key, value in record.items() if key not in ("cancel", "future")}
+
+
+class ServiceClient:
+    """A class used to submit jobs to a :class:`SolverService` over HTTP.
+
+    :ivar str url: The service URL, for example 'http://shop-server:8765'.
+    :ivar float timeout: Seconds to wait for each request.
+    """
+    def __init__(self, url=f"http://127.0.0.1:{SERVICE_PORT}", timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def submit(self, settings):
+        """Submits a job in the :mod:`job_io` JSON format.
+
+        :return: Job status
+        :rtype: dict
+        """
+        return self._request("POST", "/jobs", settings)
+
+    def status(self, jobId):
+        """Get the status of a job.
+
+        :rtype: dict
+        """
+        return self._request("GET", f"/jobs/{jobId}")
+
+    def cancel(self, jobId):
+        """Cancels a job.
+
+        :rtype: dict
+        """
+        return self._request("DELETE", f"/jobs/{jobId}")
+
+    def wait(self, jobId, interval=0.5, timeout=None):
+        """Polls a job until it finishes.
+
+        :param str jobId: Job id.
+        :param float interval: (Optional) Seconds between polls. Defaults to 0.5.
+        :param float timeout: (Optional) Seconds to wait before raising TimeoutError.
+        :return: Final job status
+        :rtype: dict
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.status(jobId)
+            if status["status"] in FINISHED:
+                return status
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {jobId} did not finish in {timeout}s")
+            time.sleep(interval)
+
+    def download(self, jobId, name):
+        """Downloads one of a finished job's program files.
+
+        :return: File contents
+        :rtype: bytes
+        """
+        with urllib.request.urlopen(f"{self.url}/jobs/{jobId}/files/{name}", timeout=self.timeout) as response:
+            return response.read()
+
+    def _request(self, method, path, body=None):
+        data = None if body is None else json.dumps(body).encode()
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            message = json.loads(error.read() or b"{}").get("error", error.reason)
+            raise ValueError(f"{method} {path} failed: {message}") from None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "BroboSolver/1.0"
+
+    def do_GET(self):
+        parts = self._parts()
+        service = self.server.service
+        if parts == ["health"]:
+            return self._send(HTTPStatus.OK, service.health())
+        if parts == ["jobs"]:
+            return self._send(HTTPStatus.OK, service.status())
+        if len(parts) == 2 and parts[0] == "jobs":
+            return self._sendStatus(service.status(parts[1]))
+        if len(parts) == 4 and parts[0] == "jobs" and parts[2] == "files":
+            path = service.programPath(parts[1], parts[3])
+            if path is None:
+                return self._send(HTTPStatus.NOT_FOUND, {"error": "No such file"})
+            with open(path, "rb") as file:
+                data = file.read()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", XLSX_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self._send(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+    def do_POST(self):
+        if self._parts() != ["jobs"]:
+            return self._send(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            status, created = self.server.service.submit(json.loads(self.rfile.read(length) or b"null"))
+        except (ValueError, OSError) as error:
+            return self._send(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+        self._send(HTTPStatus.ACCEPTED if created else HTTPStatus.OK, status)
+
+    def do_DELETE(self):
+        parts = self._parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+        self._sendStatus(self.server.service.cancel(parts[1]))
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+    def _parts(self):
+        return [part for part in self.path.split("?")[0].split("/") if part]
+
+    def _sendStatus(self, status):
+        if status is None:
+            return self._send(HTTPStatus.NOT_FOUND, {"error": "Unknown job"})
+        self._send(HTTPStatus.OK, status)
+
+    def _send(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def createServer(service, host="127.0.0.1", port=SERVICE_PORT):
+    """Creates the HTTP server for a service. Call ``serve_forever()`` on the result to start it.
+
+    :param SolverService service: The service handling the requests.
+    :param str host: (Optional) Address to listen on. Defaults to localhost only.
+    :param int port: (Optional) Port, or 0 for any free port. Defaults to SERVICE_PORT.
+    :rtype: ThreadingHTTPServer
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve cut list solves over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the whole network)")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, help="solver processes (default: one per CPU)")
+    parser.add_argument("--out-dir", default=".", help="directory program files are written to")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(name)s: %(message)s")
+
+    service = SolverService(args.workers, args.out_dir)
+    server = createServer(service, args.host, args.port)
+    print(f"Solver service listening on http://{args.host}:{server.server_address[1]} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+############ Private Functions ############
+
+def _jobKey(settings):
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _safeFolderName(name):
+    # Program files go to one folder per job number under the output directory, so it must not lead out of it
+    return name not in ("", ".", "..") and not any(separator in name for separator in ("/", "\\", ":"))
+
+
+def _warmWorker():
+    import solver_handler, stock_cutter_1d, alns_stock_cutter, brobo_preprocessor
+
+
+def _ping():
+    return os.getpid()
+
+
+def _solveJob(jobId, settings, outDir, buildPrograms, events, cancel):
+    # Runs in a worker process; progress goes back to the service through the shared events queue
+    from job_io import buildCuttingParameters, summarizeSolution
+    from units import fromThou
+
+    events.put((jobId, None))
+    job = parseJob(settings, {"dirPath": outDir, "workers": 1}, jobId)
+    cutParams = buildCuttingParameters(job)
+    cutParams.solve(lambda event: events.put((jobId, event)), cancel)
+    result = summarizeSolution(cutParams)
+    result["solution"] = [{"lengths": [fromThou(length) for length in pattern], "count": count}
+                          for pattern, count in cutParams.getSolution().patterns()]
+    if buildPrograms:
+        from brobo_preprocessor import buildBroboProgram
+        result["programs"] = buildBroboProgram(cutParams)
+        result["files"] = [os.path.basename(path) for path in result["programs"]]
+    result["metrics"] = cutParams.getMetrics().toDict()
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,30 @@ Contributions:
 '''
 from ortools.linear_solver import pywraplp
 from math import ceil
+import json
+import logging
+import time
+from cut_solution import CutSolution
+from greedy_cutter import firstFitDecreasing, solutionCost
+from metrics import Metrics
+from solve_progress import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+# Seconds the integer master always gets, even when column generation used up the time limit
+INTEGER_MASTER_MIN_TIME = 1.0
+# A new pattern is only added when its reduced cost is below minus this fraction of its stock cost
+REDUCED_COST_TOLERANCE = 1e-6
+# Most patterns pricing may add per stock type and iteration; the number adapts between 1 and this limit
+MAX_PRICING_COLUMNS = 8
+# Most moves the local search level of the pricing ladder tries before giving up to the exact solver
+LOCAL_SEARCH_MOVES = 200
+# Starting weight of the stability center in the smoothed pricing duals, how far each update moves it and its cap
+STABILIZATION_ALPHA = 0.5
+STABILIZATION_STEP = 0.1
+STABILIZATION_MAX_ALPHA = 0.99
+# Seconds the set covering master over a pattern catalog gets when the solve has no time limit
+CATALOG_MASTER_TIME = 30.0
 
 
 """
@@ -67,15 +91,21 @@ def ObjVal(x):
     Args:
         demands (List[List[int]]): A list of demand quantities and widths for small sticks.
         parent_width (int, optional): Width of the parent stick. Defaults to 100.
+        metrics (Metrics, optional): Records the ``bounds`` and ``small_model`` timers. Defaults to None.
+        time_limit (float, optional): Stops the solver after this many seconds with the best solution found so far.
+            Defaults to None.
 
     Returns:
         Tuple: A tuple containing the solver status, number of big sticks used, consumed big sticks,
         unused stick widths, and wall time taken.
 """
-def solve_model(demands, parent_width=100):
+def solve_model(demands, parent_width=100, metrics=None, time_limit=None):
+  if metrics is None:
+    metrics = Metrics()
   num_orders = len(demands)
   solver = newSolver('Cutting Stock', True)
-  k,b  = bounds(demands, parent_width)
+  with metrics.timer('bounds'):
+    k,b  = bounds(demands, parent_width)
   
   # Create variables for big stick usage and cuts
   y = [ solver.IntVar(0, 1, f'y_{i}') for i in range(k[1]) ] 
@@ -102,7 +132,10 @@ def solve_model(demands, parent_width=100):
   Cost = solver.Sum((j+1)*y[j] for j in range(k[1]))
   solver.Minimize(Cost)
 
-  status = solver.Solve()
+  if time_limit is not None:
+    solver.SetTimeLimit(int(time_limit * 1000))
+  with metrics.timer('small_model'):
+    status = solver.Solve()
   numSticksUsed = SolVal(nb)
 
   return status, numSticksUsed, sticks(numSticksUsed, SolVal(x), SolVal(unused_widths), demands), SolVal(unused_widths), solver.WallTime()
@@ -144,8 +177,8 @@ def bounds(demands, parent_width=100):
           k[1],T = k[1]+1, 0
   k[0] = int(round(TT/parent_width+0.5))
 
-  print('k', k)
-  print('b', b)
+  logger.debug('k %s', k)
+  logger.debug('b %s', b)
   return k, b
 
 
@@ -189,31 +222,303 @@ def sticks(nb, x, w, demands):
         demands (List[List[int]]): A list of demand quantities and widths for small sticks.
         parent_width (int, optional): The width of the parent stick. Defaults to 100.
         iterAccuracy (int, optional): The number of column generations to iterate through. Defaults to 20.
+        progress (callable, optional): Called with a progress event dict whenever the rounded-up master solution or
+            the Farley lower bound improves. Returning True stops column generation early. Defaults to None.
+        cancel (threading.Event, optional): Stops column generation early when set. Defaults to None.
+        metrics (Metrics, optional): Records the ``column_generation``, ``master_lp``, ``pricing``,
+            ``integer_master`` and ``greedy`` timers and the ``column_generation_iterations``, ``patterns_added``,
+            ``mispricings``, ``column_generation_converged``, ``greedy_fallbacks`` and pricing level counters.
+            Defaults to None.
+        max_columns (int, optional): The most patterns pricing adds per stock type and iteration: the best pattern
+            and then diverse runners-up, see get_diverse_patterns. The number starts at 2 and doubles while the
+            master LP takes less time than pricing, up to max_columns, and halves otherwise. 1 adds only the best
+            pattern. Defaults to MAX_PRICING_COLUMNS.
+        stabilization (bool, optional): Prices with Wentges-smoothed duals: a mix of the stability center, the
+            duals with the best Lagrangian (Farley) bound so far, and the master duals, weighted by alpha. When the
+            smoothed duals find no improving column (a mispricing) the mix moves towards the master duals until
+            pricing uses them unsmoothed, so convergence is only declared when the master duals price out or the
+            bound meets the LP value. alpha starts at STABILIZATION_ALPHA and follows the direction of the
+            Lagrangian subgradient after every smoothed pricing. Only used when no stock is limited. Defaults to
+            False.
+        pricing_ladder (bool, optional): Tries the greedy and local search pricing levels before the exact
+            knapsack solve, see get_pattern_ladder. The bound and the stability center only move on iterations
+            priced exactly. Defaults to True.
+        time_limit (float, optional): Stops column generation after this many seconds. The integer master gets
+            whatever is left, and at least INTEGER_MASTER_MIN_TIME; if it finds no integer solution in time the
+            rounded-up LP solution is used instead. Whenever the time runs out or the integer master fails, the
+            greedy solution is returned if it costs less. Defaults to None.
+        stocks (List[List], optional): The stock types to cut from as [available, width, cost] lists, replacing
+            parent_width. available is the number of sticks on the rack, or None for unlimited, and cost the price
+            of one stick (defaults to 1). Each stock type gets its own pricing problem and the master minimizes the
+            total cost. Defaults to None.
+
+    Raises:
+        ValueError: If the available stock cannot cover the demand.
 
     Returns:
         tuple: A tuple containing the solver status, optimized patterns, pattern usage (y),
-               and the sticks cut using the optimized patterns.
+               and the CutSolution built from the optimized patterns and their usage. With more than one stock type
+               the CutSolution records the stock width of every pattern. When the greedy solution is returned the
+               patterns and y still describe the model's solution.
  """
-def solve_large_model(demands, parent_width=100, iterAccuracy=20):
+def solve_large_model(demands, parent_width=100, iterAccuracy=20, progress=None, cancel=None, metrics=None, time_limit=None, stocks=None, max_columns=MAX_PRICING_COLUMNS, stabilization=False, pricing_ladder=True):
+  if metrics is None:
+    metrics = Metrics()
+  deadline = None if time_limit is None else time.perf_counter() + time_limit
+  if stocks is None:
+    stocks = [[None, parent_width]]
+  stock_widths = [stock[1] for stock in stocks]
+  costs = [stock[2] if len(stock) > 2 and stock[2] is not None else 1 for stock in stocks]
+  available = [stock[0] for stock in stocks]
+  limited = any(quantity is not None for quantity in available)
+  parent_width = max(stock_widths)
   num_orders = len(demands)
   iter = 0
-  patterns = get_initial_patterns(demands)
+  patterns, pattern_stocks = get_initial_stock_patterns(demands, stock_widths)
   quantities = [demands[i][0] for i in range(num_orders)]
-  print('quantities', quantities)
+  widths = [demands[i][1] for i in range(num_orders)]
+  logger.debug('quantities %s', quantities)
+
+  demand_length = sum(quantities[i] * widths[i] for i in range(num_orders))
+  tracker = ProgressTracker(progress, 'OR-Tools', iterAccuracy, parent_width, demand_length, cancel)
+  material_bound = ceil(demand_length / parent_width)
+  # With limited stock the single cut starting patterns may not fit on the rack, so every part may also be
+  # bought outright at a price no real pattern reaches until column generation finds enough good patterns
+  penalty = max(costs) * (sum(quantities) + 1) if limited else None
+  columns = min(2, max_columns)
+
+  def master(integer=False, time_limit=None):
+    return solve_master(patterns, quantities, parent_width=parent_width, integer=integer, time_limit=time_limit,
+                        costs=[costs[s] for s in pattern_stocks], pattern_stocks=pattern_stocks if limited else None,
+                        available=available if limited else None, penalty=penalty)
+
+  # Wentges smoothing: pricing uses a mix of the stability center (the duals with the best Lagrangian bound so
+  # far) and the master duals, which damps the dual oscillation that makes column generation tail off
+  stabilize = stabilization and not limited
+  center, alpha, best_bound = None, STABILIZATION_ALPHA, 0
+
+  with metrics.timer('column_generation'):
+    while iter < iterAccuracy:
+      started = time.perf_counter()
+      with metrics.timer('master_lp'):
+        status, y, l = master()
+      priced = time.perf_counter()
+      iter += 1
+      metrics.increment('column_generation_iterations')
+      duals, stock_duals = l[:num_orders], l[num_orders:] or [0] * len(stocks)
+      lp_value = sum(duals[i] * quantities[i] for i in range(num_orders))
+
+      new_columns = []
+      mispricings = 0
+      with metrics.timer('pricing'):
+        while True:
+          # Each mispricing moves the separation point closer to the master duals, reaching them after a few
+          smoothing = max(0.0, 1 - (mispricings + 1) * (1 - alpha)) if stabilize and center is not None else 0.0
+          separation = [smoothing * center[i] + (1 - smoothing) * duals[i] for i in range(num_orders)] if smoothing else duals
+          best, exact = [], True
+          for s in range(len(stocks)):
+            # Reduced cost of the pattern: its stock cost less the demand and availability duals it collects
+            min_value = costs[s] * (1 + REDUCED_COST_TOLERANCE) - stock_duals[s]
+            improves = lambda pattern: sum(duals[i] * pattern[i] for i in range(num_orders)) > min_value
+            new_pattern, value, level = get_pattern_ladder(separation, widths, stock_widths[s], improves,
+                                                           pricing_ladder, metrics)
+            best.append((new_pattern, value))
+            exact = exact and level == 'exact'
+            if improves(new_pattern):
+              new_columns.extend((pattern, s) for pattern in
+                                 get_diverse_patterns(duals, widths, stock_widths[s], new_pattern, columns, min_value))
+          if exact:
+            # Farley's bound: scaled down until every pattern prices within its cost, the separation duals are
+            # feasible and their objective bounds the LP value from below. It needs the exact pattern values.
+            scale = max(max(value / costs[s] for s, (_, value) in enumerate(best)), 1e-9)
+            bound_value = sum(separation[i] * quantities[i] for i in range(num_orders)) / scale
+            if bound_value > best_bound:
+              center, best_bound = separation, bound_value
+          if new_columns or smoothing == 0:
+            break
+          mispricings += 1
+          metrics.increment('mispricings')
+      if smoothing > 0:
+        alpha = _updateSmoothing(alpha, best, costs, lp_value, quantities, duals, center)
+      # Runners-up cost nothing to price but make every later master solve larger, so take more of them while the
+      # master is the cheap part of an iteration and fewer once it is the expensive part
+      if priced - started < time.perf_counter() - priced:
+        columns = min(2 * columns, max_columns)
+      else:
+        columns = max(columns // 2, 1)
+
+      bound = material_bound
+      if len(stocks) == 1 and not limited:
+        bound = max(bound, ceil(best_bound / costs[0] - 1e-9))
+      if tracker.update(iter, sum(y), bound, _stockUsed(y, pattern_stocks, stock_widths) if len(stocks) > 1 else None):
+        break
+      # Only pricing with the master duals themselves, or a bound meeting the LP value, proves the LP optimal
+      if not new_columns or (not limited and best_bound >= lp_value * (1 - REDUCED_COST_TOLERANCE)):
+        metrics.increment('column_generation_converged')
+        break
+
+      for new_pattern, s in new_columns:
+        for i in range(num_orders):
+          patterns[i].append(new_pattern[i])
+        pattern_stocks.append(s)
+      metrics.increment('patterns_added', len(new_columns))
+      if deadline is not None and time.perf_counter() >= deadline:
+        break
+
+  master_time = None if deadline is None else max(deadline - time.perf_counter(), INTEGER_MASTER_MIN_TIME)
+  with metrics.timer('integer_master'):
+    status, y, l = master(integer=True, time_limit=master_time)
+  rounded = status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+  if rounded:
+    # Rounding up the LP solution covers the demand, though it may use more stock than is available
+    status, y, l = master()
+  fits = not limited or _fitsStock(patterns, y, quantities, pattern_stocks, available)
+
+  solution_stocks = [stock_widths[s] for s in pattern_stocks] if len(stocks) > 1 else None
+  solution = CutSolution.fromPatternMatrix(patterns, y, widths, parent_width, solution_stocks) if fits else None
+  timed_out = deadline is not None and time.perf_counter() >= deadline
+  if rounded or timed_out or not fits:
+    # The time ran out or the integer master failed, so the greedy packing may well be better
+    with metrics.timer('greedy'):
+      greedy = solve_greedy_model(demands, parent_width, stocks)
+    if solution is None or solutionCost(greedy, stocks) < solutionCost(solution, stocks):
+      logger.info('Using the greedy solution, it needs less stock than the model found in time')
+      metrics.increment('greedy_fallbacks')
+      status, solution = pywraplp.Solver.FEASIBLE, greedy
+  stock_used = sum(length * count for length, count in solution.stockCounts().items()) if len(stocks) > 1 else None
+  tracker.update(iter, len(solution), material_bound, stock_used)
+  return status, patterns, y, solution
+
+
+def _ratioOrder(l, w):
+  return sorted((i for i in range(len(l)) if l[i] > 0), key=lambda i: l[i] / w[i], reverse=True)
+
+
+def _fillByRatio(pattern, parent_width, w, order, skip=None):
+  room = parent_width - sum(w[j] * pattern[j] for j in range(len(pattern)))
+  for j in order:
+    if j != skip and w[j] <= room:
+      pattern[j] += room // w[j]
+      room -= (room // w[j]) * w[j]
+  return pattern
+
+
+def _localSearch(l, w, parent_width, pattern, order):
+  # First improvement over moves that swap one piece for as many pieces of another length as fit, then refill
+  best, best_value = pattern, sum(l[i] * pattern[i] for i in range(len(pattern)))
+  moves = 0
+  improved = True
+  while improved and moves < LOCAL_SEARCH_MOVES:
+    improved = False
+    for i in [i for i in range(len(best)) if best[i]]:
+      for j in order:
+        if j == i or moves >= LOCAL_SEARCH_MOVES:
+          continue
+        moves += 1
+        candidate = list(best)
+        candidate[i] -= 1
+        room = parent_width - sum(w[k] * candidate[k] for k in range(len(candidate)))
+        if w[j] > room:
+          continue
+        candidate[j] += room // w[j]
+        _fillByRatio(candidate, parent_width, w, order, skip=i)
+        value = sum(l[k] * candidate[k] for k in range(len(candidate)))
+        if value > best_value + 1e-12:
+          best, best_value, improved = candidate, value, True
+          break
+      if improved:
+        break
+  return best
 
-  while iter < iterAccuracy:
-    status, y, l = solve_master(patterns, quantities, parent_width=parent_width)
-    iter += 1
 
-    widths = [demands[i][1] for i in range(num_orders)]
-    new_pattern, objectiveValue = get_new_pattern(l, widths, parent_width=parent_width)
+"""
+    Solve the cutting stock problem as set covering over a precomputed set of patterns.
 
-    for i in range(num_orders):
-      patterns[i].append(new_pattern[i])
+    With every maximal pattern of the cut widths, as kept by pattern_catalog.PatternCatalog, the integer master over
+    all of them is the exact problem, so no column generation is needed. If the integer master finds no solution
+    within the time limit, or the solve is cancelled before it starts, the rounded-up LP solution is used, and the
+    greedy solution replaces it when it needs fewer sticks.
 
-  status, y, l = solve_master(patterns, quantities, parent_width=parent_width, integer=True)  
+    Args:
+        demands (List[List[int]]): List of child stick quantities and widths.
+        parent_width (int): Width of the parent stick.
+        catalog_patterns (List[List[int]]): The number of cuts of each demand width in every pattern. Demands of
+            the same width are merged, and their counts are read from the first of them.
+        metrics (Metrics, optional): Records the ``catalog_model`` timer and ``greedy_fallbacks`` counter. Defaults to
+            None.
+        time_limit (float, optional): Solver time limit in seconds. Defaults to CATALOG_MASTER_TIME, as the integer
+            master cannot be cancelled once it runs.
+        progress (callable, optional): Called with a progress event for the greedy solution before the integer
+            master and for the final solution. Defaults to None.
+        cancel (threading.Event, optional): Skips the integer master when set. Defaults to None.
 
-  return status, patterns, y, sticks_patterns(patterns, y, demands, parent_width=parent_width)
+    Returns:
+        tuple: A tuple containing the solver status, the patterns, pattern usage (y) and the CutSolution, like
+               solve_large_model. The pattern rows are the distinct widths, in the order they first appear.
+"""
+def solve_catalog_model(demands, parent_width, catalog_patterns, metrics=None, time_limit=None, progress=None, cancel=None):
+  if metrics is None:
+    metrics = Metrics()
+  # A width listed twice shares one catalog column, so covering each row on its own would cut it twice over;
+  # the rows of a width are merged into one demand and the first row's column stands for all of them
+  merged = {}
+  rows = []
+  for i, (quantity, width) in enumerate(demands):
+    if width not in merged:
+      merged[width] = 0
+      rows.append(i)
+    merged[width] += quantity
+  widths = list(merged)
+  quantities = list(merged.values())
+  demand_length = sum(quantities[i] * widths[i] for i in range(len(widths)))
+  material_bound = ceil(demand_length / parent_width)
+  tracker = ProgressTracker(progress, 'OR-Tools', 1, parent_width, demand_length, cancel)
+  with metrics.timer('greedy'):
+    greedy = solve_greedy_model(demands, parent_width)
+  tracker.update(0, len(greedy), material_bound)
+  # Patterns cutting none of this job's lengths cannot help cover it
+  useful = [pattern for pattern in catalog_patterns if any(pattern)]
+  patterns = [[pattern[row] for pattern in useful] for row in rows]
+  with metrics.timer('catalog_model'):
+    status = pywraplp.Solver.NOT_SOLVED
+    if not tracker.stopped:
+      status, y, l = solve_master(patterns, quantities, parent_width=parent_width, integer=True,
+                                  time_limit=CATALOG_MASTER_TIME if time_limit is None else time_limit)
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+      status, y, l = solve_master(patterns, quantities, parent_width=parent_width)
+      status = pywraplp.Solver.FEASIBLE
+  solution = CutSolution.fromPatternMatrix(patterns, y, widths, parent_width)
+  if status != pywraplp.Solver.OPTIMAL and len(greedy) < len(solution):
+    metrics.increment('greedy_fallbacks')
+    solution = greedy
+  tracker.update(1, len(solution), len(solution) if status == pywraplp.Solver.OPTIMAL else material_bound)
+  return status, patterns, y, solution
+
+
+def _updateSmoothing(alpha, best, costs, lp_value, quantities, duals, center):
+  # Automatic smoothing (Pessoa et al.): the subgradient of the Lagrangian at the separation point is the demand
+  # less what the master's stick count would cut with the most valuable pattern. If it points from the center
+  # towards the master duals, smoothing held the duals back, otherwise it was not strong enough.
+  s, (pattern, _) = max(enumerate(best), key=lambda item: item[1][1] / costs[item[0]])
+  sticks = lp_value / costs[s]
+  direction = sum((quantities[i] - sticks * pattern[i]) * (duals[i] - center[i]) for i in range(len(quantities)))
+  if direction > 0:
+    return max(0.0, alpha - STABILIZATION_STEP)
+  return min(STABILIZATION_MAX_ALPHA, alpha + (1 - alpha) * STABILIZATION_STEP)
+
+
+def _stockUsed(y, pattern_stocks, stock_widths):
+  return sum(y[j] * stock_widths[pattern_stocks[j]] for j in range(len(y)))
+
+
+def _fitsStock(patterns, y, quantities, pattern_stocks, available):
+  for i in range(len(quantities)):
+    if sum(patterns[i][j] * y[j] for j in range(len(y))) < quantities[i]:
+      return False
+  for s, quantity in enumerate(available):
+    if quantity is not None and sum(y[j] for j in range(len(y)) if pattern_stocks[j] == s) > quantity:
+      return False
+  return True
 
 
 
@@ -229,12 +534,20 @@ def solve_large_model(demands, parent_width=100, iterAccuracy=20):
         quantities (List[int]): A list of integers representing the demand quantities for each pattern.
         parent_width (int, optional): The width of the parent stick. Defaults to 100.
         integer (bool, optional): If True, the solver uses integer programming, otherwise linear programming. (Defaults to False)
+        time_limit (float, optional): Solver time limit in seconds. Defaults to None.
+        costs (List[float], optional): The cost of each pattern. Defaults to 1 for every pattern.
+        pattern_stocks (List[int], optional): The stock type each pattern is cut from, needed with available.
+            Defaults to None.
+        available (List[int], optional): The number of sticks of each stock type, None for unlimited. Defaults to None.
+        penalty (float, optional): When set, every demand may also be met by an artificial variable of this cost,
+            so the master stays feasible under limited stock. Defaults to None.
 
     Returns:
         tuple: A tuple containing the status of the solver, a list of optimized pattern usage (y), 
-               and a list of dual values (l) associated with the constraints.
+               and a list of dual values (l) associated with the constraints: one per demand, followed by one
+               per stock type when available is given.
  """
-def solve_master(patterns, quantities, parent_width=100, integer=False):
+def solve_master(patterns, quantities, parent_width=100, integer=False, time_limit=None, costs=None, pattern_stocks=None, available=None, penalty=None):
   title = 'Cutting stock master problem'
   num_patterns = len(patterns)
   n = len(patterns[0])
@@ -243,16 +556,38 @@ def solve_master(patterns, quantities, parent_width=100, integer=False):
   solver = newSolver(title, integer)
   
   y = [ solver.IntVar(0, 1000, '') for j in range(n) ]
-  Cost = sum(y[j] for j in range(n)) 
-  solver.Minimize(Cost)
+  artificial = [ solver.NumVar(0, quantities[i], '') for i in range(num_patterns) ] if penalty is not None else []
+  objective = solver.Objective()
+  for j in range(n):
+    objective.SetCoefficient(y[j], 1 if costs is None else costs[j])
+  for a in artificial:
+    objective.SetCoefficient(a, penalty)
+  objective.SetMinimization()
 
+  # Coefficients are set one non-zero at a time: most patterns cut few of the lengths, and building the rows as
+  # expressions over every column would cost more than solving the LP once column generation has added many
   for i in range(num_patterns):
-    constraints.append(solver.Add( sum(patterns[i][j]*y[j] for j in range(n)) >= quantities[i]) ) 
-
+    constraint = solver.Constraint(quantities[i], solver.infinity())
+    for j in range(n):
+      if patterns[i][j]:
+        constraint.SetCoefficient(y[j], patterns[i][j])
+    if artificial:
+      constraint.SetCoefficient(artificial[i], 1)
+    constraints.append(constraint)
+  if available is not None:
+    for s, quantity in enumerate(available):
+      constraint = solver.Constraint(0, quantity if quantity is not None else solver.infinity())
+      for j in range(n):
+        if pattern_stocks[j] == s:
+          constraint.SetCoefficient(y[j], 1)
+      constraints.append(constraint)
+
+  if time_limit is not None:
+    solver.SetTimeLimit(int(time_limit * 1000))
   status = solver.Solve()
   y = [int(ceil(e.SolutionValue())) for e in y]
 
-  l =  [0 if integer else constraints[i].DualValue() for i in range(num_patterns)]
+  l =  [0 if integer else constraint.DualValue() for constraint in constraints]
   toreturn = status, y, l
   return toreturn
 
@@ -290,6 +625,103 @@ def get_new_pattern(l, w, parent_width=100):
 
 
 
+"""
+    Get up to k diverse patterns with negative reduced cost, starting from the best one.
+
+    Runners-up are built from the best pattern without solving another sub-problem: for each length it cuts, one
+    pattern cuts one piece fewer of that length and one leaves the length out entirely, and both refill the room
+    with the other lengths, highest dual value per unit width first. Every runner-up thus moves the master away
+    from the best pattern along a different length. Only patterns worth more than min_value are kept, none twice,
+    and none that another kept pattern dominates (cutting at least as many of every length); the most valuable
+    are returned.
+
+    Args:
+        l (List[float]): List of dual values of the demand constraints.
+        w (List[int]): List of cut widths.
+        parent_width (int): Width of the parent stick.
+        best (List[int]): The best pattern, from get_new_pattern.
+        k (int): The most patterns to return.
+        min_value (float): The dual value a pattern must exceed to have negative reduced cost.
+
+    Returns:
+        List[List[int]]: The best pattern followed by up to k - 1 runners-up, most valuable first.
+    """
+def get_diverse_patterns(l, w, parent_width, best, k, min_value):
+  best = [int(round(count)) for count in best]
+  if k <= 1:
+    return [best]
+  n = len(l)
+  order = _ratioOrder(l, w)
+  candidates = []
+  for i in range(n):
+    if not best[i]:
+      continue
+    for keep in (best[i] - 1, 0):
+      pattern = list(best)
+      pattern[i] = keep
+      _fillByRatio(pattern, parent_width, w, order, skip=i)
+      value = sum(l[j] * pattern[j] for j in range(n))
+      if value > min_value:
+        candidates.append((value, pattern))
+  kept = [best]
+  for value, pattern in sorted(candidates, key=lambda candidate: -candidate[0]):
+    if len(kept) == k:
+      break
+    if not any(all(a >= b for a, b in zip(other, pattern)) or all(a <= b for a, b in zip(other, pattern))
+               for other in kept):
+      kept.append(pattern)
+  return kept
+
+
+
+"""
+    Find a new cutting pattern with a ladder of pricing methods, cheapest first.
+
+    The greedy level fills the stick by dual value per unit width. When that pattern does not improve the master,
+    the local search level repeatedly takes one piece out of the best pattern found, puts as many pieces of another
+    length in its place and refills by ratio, keeping any improvement, for at most LOCAL_SEARCH_MOVES moves. Only
+    when neither finds an improving pattern does the exact level solve the knapsack with get_new_pattern, so the
+    exact solver runs mostly in the iterations that prove convergence. Every level records the
+    ``pricing_<level>_calls`` and ``pricing_<level>_hits`` counters.
+
+    Args:
+        l (List[float]): List of dual values the pattern is priced with.
+        w (List[int]): List of cut widths.
+        parent_width (int): Width of the parent stick.
+        improves (callable): Tells whether a pattern improves the master, which ends the ladder.
+        ladder (bool, optional): If False, only the exact level runs. Defaults to True.
+        metrics (Metrics, optional): Records the level counters. Defaults to None.
+
+    Returns:
+        Tuple: The pattern, its value under l, and the level that found it: 'greedy', 'local_search' or 'exact'.
+        Only the value of the exact level is the best value any pattern reaches.
+    """
+def get_pattern_ladder(l, w, parent_width, improves, ladder=True, metrics=None):
+  if metrics is None:
+    metrics = Metrics()
+  n = len(l)
+  if ladder:
+    order = _ratioOrder(l, w)
+    pattern = [0] * n
+    _fillByRatio(pattern, parent_width, w, order)
+    metrics.increment('pricing_greedy_calls')
+    if improves(pattern):
+      metrics.increment('pricing_greedy_hits')
+      return pattern, sum(l[i] * pattern[i] for i in range(n)), 'greedy'
+    pattern = _localSearch(l, w, parent_width, pattern, order)
+    metrics.increment('pricing_local_search_calls')
+    if improves(pattern):
+      metrics.increment('pricing_local_search_hits')
+      return pattern, sum(l[i] * pattern[i] for i in range(n)), 'local_search'
+  pattern, value = get_new_pattern(l, w, parent_width=parent_width)
+  pattern = [int(round(count)) for count in pattern]
+  metrics.increment('pricing_exact_calls')
+  if improves(pattern):
+    metrics.increment('pricing_exact_hits')
+  return pattern, value, 'exact'
+
+
+
 """
     Generate initial cutting patterns.
 
@@ -310,6 +742,27 @@ def get_initial_patterns(demands):
 
 
 
+"""
+    Generate initial cutting patterns for several stock types.
+
+    Like get_initial_patterns, but with one single cut pattern per order for every stock type the cut fits on.
+    With one stock type the patterns are the same as those of get_initial_patterns.
+
+    Args:
+        demands (List[List[int]]): List of order quantities and widths.
+        stock_widths (List[int]): The width of each stock type.
+
+    Returns:
+        Tuple[List[List[int]], List[int]]: The patterns, as patterns[order][pattern], and the stock type of each pattern.
+    """
+def get_initial_stock_patterns(demands, stock_widths):
+  num_orders = len(demands)
+  columns = [(i, s) for s in range(len(stock_widths)) for i in range(num_orders) if demands[i][1] <= stock_widths[s]]
+  patterns = [[1 if i == order else 0 for order, _ in columns] for i in range(num_orders)]
+  return patterns, [s for _, s in columns]
+
+
+
 """
     Generate detailed cutting patterns based on the optimized solution.
 
@@ -358,7 +811,7 @@ def sticks_patterns(patterns, y, demands, parent_width=100):
 def checkWidths(demands, parent_width):
   for quantity, width in demands:
     if width > parent_width:
-      print(f'Small stick width {width} is greater than parent sticks width {parent_width}. Exiting')
+      logger.warning('Small stick width %s is greater than parent sticks width %s. Exiting', width, parent_width)
       return False
   return True
 
@@ -366,16 +819,24 @@ def checkWidths(demands, parent_width):
 """
     Solve the cutting stock problem using a greedy approach.
 
+    Packs the sticks with first fit decreasing over the aggregated demand, see greedy_cutter.firstFitDecreasing.
+    It never proves optimality, but it returns in milliseconds even for very large cut lists, so it is also the
+    fallback when a time limit runs out before a model finds a better solution.
+
     Args:
-        sorted_pairs (List[Tuple[int, int]]): List of tuples representing available cut lengths and their quantities.
-        working_length (int): Remaining length of the current working stick.
-        working_stick (List[int]): List of cut lengths on the current working stick.
-        blade_width (int): Width of the blade that separates cut lengths.
+        demands (List[List[int]]): List of child stick quantities and widths.
+        parent_width (int): Width of the parent stick. Defaults to 100.
+        stocks (List[List], optional): Stock types as [available, length, cost] lists, replacing parent_width.
+            Defaults to None.
+
+    Raises:
+        ValueError: If the available stock cannot cover the demand.
 
     Returns:
-        Tuple[List[int], List[Tuple[int, int]]] or None: A tuple containing the list of cut lengths on the working stick
-        and the updated list of sorted cut pairs. If a solution is not possible, returns None.
+        CutSolution: The packed sticks.
 """
+def solve_greedy_model(demands, parent_width=100, stocks=None):
+  return firstFitDecreasing(demands, parent_width, stocks)
 
 
 """
@@ -388,13 +849,21 @@ def checkWidths(demands, parent_width):
         output_json (bool): If True, return the results in JSON format. If False, return a list.
         large_model (bool): If True, use the large cutting stock model. If False, use the small model.
         greedy_model (bool): If True, solve using a greedy approach. If False, use the specified model.
+        progress (callable, optional): Progress callback forwarded to the large and catalog models. Defaults to None.
+        cancel (threading.Event, optional): Cancel event forwarded to the large and catalog models. Defaults to None.
+        metrics (Metrics, optional): Collects phase timers and counters. Defaults to None.
+        time_limit (float, optional): Time limit in seconds forwarded to the model. Defaults to None.
+        stocks (List[List], optional): Stock types as [available, length, cost] lists, replacing stock_length.
+            See StockCutter1D. Defaults to None.
+        catalog_patterns (List[List[int]], optional): Every maximal pattern of the cut widths. See StockCutter1D.
+            Defaults to None.
 
     Returns:
-        List or str: Depending on the value of output_json, either a list of consumed sticks or a JSON string.
+        CutSolution or str: Depending on the value of output_json, either the CutSolution or a JSON string.
     """
-def solveCut(cutData, stock_length, output_json=False, large_model=True, greedy_model=False, iterAccuracy=20):
-    stock_length = [[1, stock_length]]
-    solved = StockCutter1D(cutData, stock_length, output_json, large_model, iterAccuracy=iterAccuracy)
+def solveCut(cutData, stock_length, output_json=False, large_model=True, greedy_model=False, iterAccuracy=20, progress=None, cancel=None, metrics=None, time_limit=None, stocks=None, catalog_patterns=None):
+    parent_sticks = stocks if stocks is not None else [[None, stock_length]]
+    solved = StockCutter1D(cutData, parent_sticks, output_json, large_model, greedy_model, iterAccuracy=iterAccuracy, progress=progress, cancel=cancel, metrics=metrics, time_limit=time_limit, catalog_patterns=catalog_patterns)
     return solved
 
 
@@ -409,54 +878,89 @@ def solveCut(cutData, stock_length, output_json=False, large_model=True, greedy_
 
     Args:
         child_sticks (List[List[int]]): List of child stick quantities and widths.
-        parent_sticks (List[List[int]]): List of parent stick quantities and widths.
+        parent_sticks (List[List[int]]): List of parent stick quantities and widths, optionally followed by the cost
+            of one stick. A quantity of None means the stock is unlimited, and the cost defaults to 1. With more than
+            one parent stick the job is solved once over every stock type, minimizing the total cost.
         output_json (bool): If True, the output will be in JSON format, else in a list format.
         large_model (bool): If True, uses a large-scale optimization model, else uses a small model.
+        greedy_model (bool): If True, packs the sticks with first fit decreasing instead of either model.
+        progress (callable, optional): Progress callback forwarded to the large and catalog models. Defaults to None.
+        cancel (threading.Event, optional): Cancel event forwarded to the large and catalog models. Defaults to None.
+        metrics (Metrics, optional): Collects phase timers and counters. Defaults to None.
+        time_limit (float, optional): Time limit in seconds forwarded to the model. Defaults to None.
+        catalog_patterns (List[List[int]], optional): Every maximal pattern of the child stick widths, from a
+            pattern catalog, as the number of cuts of each child stick. The large model then solves set covering
+            over them with solve_catalog_model instead of column generation. Ignored with several stock types.
+            Defaults to None.
 
     Returns:
-        List or str: If output_json is True, returns the output in JSON format, else as a list.
+        CutSolution or str: If output_json is True, returns the output in JSON format, else as a CutSolution.
+
+    Raises:
+        ValueError: If the parent stick quantities cannot cover the demand.
 
     Note:
         The function internally uses different algorithms based on the value of large_model:
         - If large_model is False, it uses a small-scale model for optimization.
         - If large_model is True, it uses a large-scale model for optimization.
+        greedy_model takes precedence over both. When the small model finds no solution within the time limit the
+        greedy solution is returned instead.
+        The small model only handles one unlimited stock type, so other jobs always use the large model.
 """
-def StockCutter1D(child_sticks, parent_sticks, output_json=True, large_model=True, iterAccuracy=20):
-  parent_width = parent_sticks[0][1]
+def StockCutter1D(child_sticks, parent_sticks, output_json=True, large_model=True, greedy_model=False, iterAccuracy=20, progress=None, cancel=None, metrics=None, time_limit=None, catalog_patterns=None):
+  parent_width = max(stick[1] for stick in parent_sticks)
+  single_stock = len(parent_sticks) == 1 and parent_sticks[0][0] is None
 
   if not checkWidths(demands=child_sticks, parent_width=parent_width):
-    return []
+    return CutSolution([], [], parent_width)
 
-  print('child_sticks', child_sticks)
-  print('parent_sticks', parent_sticks)
+  if not large_model and not single_stock:
+    logger.info('The small model takes one unlimited stock type, using the large model')
+    large_model = True
 
-  if not large_model:
-    print('Running Small Model...')
+  logger.debug('child_sticks %s', child_sticks)
+  logger.debug('parent_sticks %s', parent_sticks)
+
+  if greedy_model:
+    logger.info('Running Greedy Model...')
+    with (metrics or Metrics()).timer('greedy'):
+      solution = solve_greedy_model(child_sticks, parent_width, None if single_stock else parent_sticks)
+    status = pywraplp.Solver.FEASIBLE
+
+  elif not large_model:
+    logger.info('Running Small Model...')
     status, numSticksUsed, consumed_big_sticks, unused_stick_widths, wall_time = \
-              solve_model(demands=child_sticks, parent_width=parent_width)
+              solve_model(demands=child_sticks, parent_width=parent_width, metrics=metrics, time_limit=time_limit)
 
-    print('consumed_big_sticks before adjustment: ', consumed_big_sticks)
-    new_consumed_big_sticks = []
+    logger.debug('consumed_big_sticks before adjustment: %s', consumed_big_sticks)
+    cut_sticks = []
     for big_stick in consumed_big_sticks:
-      if len(big_stick) < 2:
-        consumed_big_sticks.remove(big_stick)
-        continue
-      unused_width = big_stick[0]
       substicks = []
       for subitem in big_stick[1:]:
         if isinstance(subitem, list):
           substicks = substicks + subitem
         else:
           substicks.append(subitem)
-      new_consumed_big_sticks.append([unused_width, substicks])
-    print('consumed_big_sticks after adjustment: ', new_consumed_big_sticks)
-    consumed_big_sticks = new_consumed_big_sticks
+      if substicks:
+        cut_sticks.append(substicks)
+    solution = CutSolution.fromSticks(cut_sticks, parent_width)
+    logger.debug('consumed_big_sticks after adjustment: %s', solution)
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+      logger.info('The small model found no solution in time, using the greedy solution')
+      if metrics is not None:
+        metrics.increment('greedy_fallbacks')
+      solution = solve_greedy_model(child_sticks, parent_width)
+      status = pywraplp.Solver.FEASIBLE
   
+  elif catalog_patterns is not None and single_stock:
+    logger.info('Running Catalog Model over %d patterns...', len(catalog_patterns))
+    status, A, y, solution = solve_catalog_model(child_sticks, parent_width, catalog_patterns, metrics=metrics, time_limit=time_limit, progress=progress, cancel=cancel)
+
   else:
-    print('Running Large Model...');
-    status, A, y, consumed_big_sticks = solve_large_model(demands=child_sticks, parent_width=parent_width, iterAccuracy=iterAccuracy)
+    logger.info('Running Large Model...')
+    status, A, y, solution = solve_large_model(demands=child_sticks, parent_width=parent_width, iterAccuracy=iterAccuracy, progress=progress, cancel=cancel, metrics=metrics, time_limit=time_limit, stocks=None if single_stock else parent_sticks)
 
-  numSticksUsed = len(consumed_big_sticks)
+  numSticksUsed = len(solution)
 
   STATUS_NAME = ['OPTIMAL',
     'FEASIBLE',
@@ -471,15 +975,15 @@ def StockCutter1D(child_sticks, parent_sticks, output_json=True, large_model=Tru
       "numSolutions": '1',
       "numUniqueSolutions": '1',
       "numSticksUsed": numSticksUsed,
-      "solutions": consumed_big_sticks
+      "solutions": list(solution.sticks())
   }
 
-  print('numSticksUsed', numSticksUsed)
-  print('Status:', output['statusName'])
-  print('Solutions found :', output['numSolutions'])
-  print('Unique solutions: ', output['numUniqueSolutions'])
+  logger.info('numSticksUsed %s', numSticksUsed)
+  logger.info('Status: %s', output['statusName'])
+  logger.debug('Solutions found : %s', output['numSolutions'])
+  logger.debug('Unique solutions: %s', output['numUniqueSolutions'])
 
   if output_json:
     return json.dumps(output)        
   else:
-    return consumed_big_sticks
\ No newline at end of file
+    return solution
\ No newline at end of file
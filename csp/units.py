@@ -0,0 +1,74 @@
+"""Conversions between user measurements and the integer thousandths of an inch used everywhere else.
+
+Measurements are converted once on the way in with :func:`toThou`, stay integers through the solvers and the BROBO
+program files (which are written in thousandths), and are converted back once for display with :func:`fromThou`.
+Rounding is half up at the thousandth, using the decimal value the user typed rather than its binary float.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+THOU = 1000
+
+# Below this many values a plain loop is faster than converting to a NumPy array
+_VECTORIZE_MIN = 64
+
+
+def toThou(measurement):
+    """Converts a measurement in inches to integer thousandths of an inch.
+
+    :param measurement: Measurement in inches.
+    :type measurement: int, float or str
+    :raises ValueError: If the measurement is not a number.
+    :return: Thousandths of an inch
+    :rtype: int
+    """
+    try:
+        value = Decimal(str(measurement).strip())
+    except ArithmeticError:
+        raise ValueError(f"Invalid measurement: {measurement!r}")
+    if not value.is_finite():
+        raise ValueError(f"Invalid measurement: {measurement!r}")
+    return int((value * THOU).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def toThouArray(measurements):
+    """Converts many measurements in inches to integer thousandths of an inch, giving the same result as
+    :func:`toThou` on each value. Large inputs are converted with NumPy when it is installed.
+
+    :param measurements: Measurements in inches.
+    :type measurements: iterable of int, float or str
+    :raises ValueError: If a measurement is not a number.
+    :return: Thousandths of an inch
+    :rtype: list of int
+    """
+    measurements = list(measurements)
+    if len(measurements) < _VECTORIZE_MIN:
+        return [toThou(measurement) for measurement in measurements]
+    try:
+        import numpy as np
+    except ImportError:
+        return [toThou(measurement) for measurement in measurements]
+    try:
+        values = np.asarray(measurements, dtype=float)
+    except (TypeError, ValueError):
+        return [toThou(measurement) for measurement in measurements]
+    if not np.all(np.isfinite(values)):
+        raise ValueError("Invalid measurement in list")
+    # Away from a half thousandth the float error cannot change the rounding. Values within a relative 1e-9 of one
+    # may be a typed half that the float stores just below it, or a value just below a half, so toThou decides them.
+    scaled = values * THOU
+    thou = np.rint(scaled)
+    ambiguous = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) <= 1e-9 * np.maximum(np.abs(scaled), 1.0)
+    result = thou.astype(np.int64).tolist()
+    for idx in np.flatnonzero(ambiguous).tolist():
+        result[idx] = toThou(measurements[idx])
+    return result
+
+
+def fromThou(thou):
+    """Converts integer thousandths of an inch back to inches for display.
+
+    :param int thou: Thousandths of an inch.
+    :return: Inches
+    :rtype: float
+    """
+    return thou / THOU